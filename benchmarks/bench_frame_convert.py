@@ -0,0 +1,77 @@
+"""
+BGRA 截图转换基准
+
+对比旧路径（``ScreenShot.rgb`` + ``Image.frombytes``）与 BGRX raw 解码路径
+在 1080p、4K 和三屏虚拟桌面帧上的耗时和 Python 侧内存分配峰值。
+使用随机像素构造的 mss ScreenShot，不需要真实显示器。
+
+Usage:
+    python -m benchmarks.bench_frame_convert [--repeat N]
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+
+import numpy as np
+from mss.screenshot import ScreenShot
+from PIL import Image
+
+from peekapi.screenshot import frame_to_image
+
+RESOLUTIONS = {
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+    "3x1440p": (7680, 1440),
+}
+
+
+def convert_via_rgb(frame: ScreenShot) -> Image.Image:
+    """旧路径：mss 在 Python 侧生成 RGB 副本后再复制进 Pillow"""
+    return Image.frombytes("RGB", frame.size, frame.rgb)
+
+
+def make_frame(width: int, height: int) -> ScreenShot:
+    rng = np.random.default_rng(0)
+    raw = bytearray(rng.integers(0, 256, width * height * 4, dtype=np.uint8).data)
+    return ScreenShot.from_size(raw, width, height)
+
+
+def measure(
+    convert: Callable[[ScreenShot], Image.Image], width: int, height: int, repeat: int
+) -> tuple[float, float]:
+    """返回 (最快耗时 ms, Python 侧分配峰值 MB)"""
+    best = float("inf")
+    for _ in range(repeat):
+        # ScreenShot.rgb 会缓存结果，每轮使用新帧
+        frame = make_frame(width, height)
+        start = time.perf_counter()
+        convert(frame)
+        best = min(best, time.perf_counter() - start)
+
+    frame = make_frame(width, height)
+    tracemalloc.start()
+    convert(frame)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1000, peak / 1024 / 1024
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="BGRA 截图转换基准")
+    parser.add_argument("--repeat", type=int, default=5, help="每项重复次数，默认 5")
+    args = parser.parse_args()
+
+    out = sys.stdout
+    out.write(f"{'分辨率':<10}{'路径':<8}{'耗时(ms)':>12}{'分配峰值(MB)':>16}\n")
+    for name, (width, height) in RESOLUTIONS.items():
+        for label, convert in (("rgb", convert_via_rgb), ("bgrx", frame_to_image)):
+            elapsed, peak = measure(convert, width, height, args.repeat)
+            out.write(f"{name:<10}{label:<8}{elapsed:>12.1f}{peak:>16.1f}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+紧凑拼接基准
+
+对比虚拟屏幕包围盒与 ``pack_layout`` 紧凑拼接在常见多显示器布局下需要
+模糊和编码的像素数，以及对应的渲染耗时（高斯模糊 + JPEG 编码）。
+使用随机像素构造画布，不需要真实显示器。
+
+Usage:
+    python -m benchmarks.bench_pack_layout [--repeat N] [--radius R]
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+from mss.screenshot import ScreenShot
+
+from peekapi.screenshot import pack_layout, render
+
+
+def monitor(left: int, top: int, width: int, height: int) -> dict[str, int]:
+    return {"left": left, "top": top, "width": width, "height": height}
+
+
+LAYOUTS = {
+    # 两块 1080p 左右摆放，右侧下沉半屏
+    "offset": [monitor(0, 0, 1920, 1080), monitor(1920, 540, 1920, 1080)],
+    # 三块 1080p 呈 L 形：上排两块，左下一块
+    "l-shaped": [
+        monitor(0, 0, 1920, 1080),
+        monitor(1920, 0, 1920, 1080),
+        monitor(0, 1080, 1920, 1080),
+    ],
+    # 1440p 主屏右侧接一块底部对齐的 1080p
+    "mixed": [monitor(0, 0, 2560, 1440), monitor(2560, 360, 1920, 1080)],
+    # 笔记本屏幕位于外接显示器右下方，仅对角相接
+    "diagonal": [monitor(0, 0, 2560, 1440), monitor(2560, 1440, 1920, 1080)],
+    # 横屏 + 竖屏，无法通过重排减少面积
+    "portrait": [monitor(0, 480, 2560, 1440), monitor(2560, 0, 1080, 1920)],
+}
+
+
+def bounding_size(monitors: list[dict[str, int]]) -> tuple[int, int]:
+    left = min(m["left"] for m in monitors)
+    top = min(m["top"] for m in monitors)
+    right = max(m["left"] + m["width"] for m in monitors)
+    bottom = max(m["top"] + m["height"] for m in monitors)
+    return right - left, bottom - top
+
+
+def make_frame(width: int, height: int) -> ScreenShot:
+    rng = np.random.default_rng(0)
+    raw = bytearray(rng.integers(0, 256, width * height * 4, dtype=np.uint8).data)
+    return ScreenShot.from_size(raw, width, height)
+
+
+def render_ms(size: tuple[int, int], radius: float, repeat: int) -> float:
+    """返回渲染指定尺寸画布的最快耗时（毫秒）"""
+    frame = make_frame(*size)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render(frame, radius)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="紧凑拼接基准")
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数，默认 3")
+    parser.add_argument("--radius", type=float, default=3, help="模糊半径，默认 3")
+    args = parser.parse_args()
+
+    out = sys.stdout
+    out.write(
+        f"{'布局':<10}{'包围盒(MP)':>12}{'拼接(MP)':>10}{'减少':>8}"
+        f"{'包围盒(ms)':>12}{'拼接(ms)':>10}\n"
+    )
+    for name, monitors in LAYOUTS.items():
+        bbox = bounding_size(monitors)
+        packed, _ = pack_layout(monitors)
+        bbox_px = bbox[0] * bbox[1]
+        packed_px = packed[0] * packed[1]
+        out.write(
+            f"{name:<10}{bbox_px / 1e6:>12.2f}{packed_px / 1e6:>10.2f}"
+            f"{1 - packed_px / bbox_px:>8.0%}"
+            f"{render_ms(bbox, args.radius, args.repeat):>12.0f}"
+            f"{render_ms(packed, args.radius, args.repeat):>10.0f}\n"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+录音快照基准
+
+在 20 秒、60 秒和 300 秒（44.1kHz）的满缓冲上计时 ``/record`` 的各阶段：
+在锁内复制样本快照、与路由相同的快照加流式 WAV 分段输出，以及用 soundfile
+在内存中编码整个 WAV 的 ``get_audio().read()``。同时计时旧路径（``collections.deque`` 保存逐个 numpy 标量，
+``list()`` 后再 ``np.array()``）作为对照。使用随机样本填充缓冲，不需要录音设备。
+
+Usage:
+    python -m benchmarks.bench_record [--repeat N] [--skip-legacy]
+"""
+
+import argparse
+import collections
+import sys
+import time
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+
+from peekapi.logging import logger
+from peekapi.record import AudioRecorder, iter_wav
+
+RATE = 44100
+DURATIONS = [20, 60, 300]
+
+
+def best_ms(fn: Callable[[], Any], repeat: int) -> float:
+    """返回多次运行中的最快耗时（毫秒），先预热一次"""
+    fn()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def filled_recorder(duration: int) -> AudioRecorder:
+    """创建缓冲已写满的录音器，按录音线程的 100ms 块写入并绕回"""
+    recorder = AudioRecorder(rate=RATE, duration=duration)
+    rng = np.random.default_rng(0)
+    block = rng.integers(-32768, 32767, RATE // 10, dtype=np.int16)
+    for _ in range(duration * 10 + 5):
+        recorder.buffer.extend(block)
+    return recorder
+
+
+def legacy_snapshot(buffer: collections.deque[np.int16]) -> np.ndarray:
+    """旧路径：逐个取出 numpy 标量再重新装箱为数组"""
+    return np.array(list(buffer), dtype=np.int16)
+
+
+def stream_record(recorder: AudioRecorder) -> None:
+    """与 ``/record`` 路由相同：复制快照后逐段取出 WAV 数据"""
+    for _ in iter_wav(recorder.snapshot(), recorder.rate):
+        pass
+
+
+def bench_duration(duration: int, repeat: int, legacy: bool) -> dict[str, float]:
+    recorder = filled_recorder(duration)
+    stages = {
+        "snapshot": best_ms(recorder.snapshot, repeat),
+        "record": best_ms(lambda: stream_record(recorder), repeat),
+        "soundfile": best_ms(lambda: recorder.get_audio().read(), repeat),  # type: ignore[union-attr]
+    }
+    if legacy:
+        samples = recorder.snapshot()
+        buffer: collections.deque[np.int16] = collections.deque(
+            samples, maxlen=len(samples)
+        )
+        stages["legacy-snapshot"] = best_ms(lambda: legacy_snapshot(buffer), repeat)
+    return stages
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="录音快照基准")
+    parser.add_argument("--repeat", type=int, default=5, help="每项重复次数，默认 5")
+    parser.add_argument(
+        "--skip-legacy",
+        action="store_true",
+        help="不计时旧路径（300 秒时旧缓冲约占用 500MB 内存）",
+    )
+    args = parser.parse_args()
+    logger.disable("peekapi")  # get_audio 每次调用都写调试日志
+
+    out = sys.stdout
+    out.write(f"{'缓冲(秒)':<10}{'阶段':<18}{'耗时(ms)':>12}\n")
+    for duration in DURATIONS:
+        stages = bench_duration(duration, args.repeat, not args.skip_legacy)
+        for stage, elapsed in stages.items():
+            out.write(f"{duration:<10}{stage:<18}{elapsed:>12.2f}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
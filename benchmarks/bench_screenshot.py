@@ -0,0 +1,259 @@
+"""
+截图流水线分阶段基准
+
+在合成采集后端生成的 1080p、4K 和三屏虚拟桌面上分别计时 ``screenshot()``
+的各阶段：截图、BGRA 转换、不同半径的模糊、不同格式和质量的编码，以及
+经过采集线程的端到端耗时。不需要真实显示器。
+
+结果写成 JSON 报告，并与仓库中的基线 ``benchmarks/baseline.json`` 比较，
+任一阶段比基线慢超过容差（且绝对差值超过 ``--min-delta-ms``）时以退出码 1
+结束，便于在改动 ``/screen`` 前后验证性能变化。超出容差的桌面会重新测量一次，
+两次都慢才算回归，以排除偶发的调度抖动。基线记录的是生成它的机器上的耗时，
+换机器比较前应先在同一台机器上用 ``--update-baseline`` 重新生成；生成基线时
+完整测量两轮，每个阶段记录较慢一轮的结果，使基线代表该机器稳定能达到的水平。
+
+Usage:
+    python -m benchmarks.bench_screenshot [--repeat N] [--output report.json]
+        [--baseline PATH] [--tolerance 0.25] [--min-delta-ms 5]
+        [--update-baseline]
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+from PIL import Image
+
+import peekapi.screenshot
+from peekapi.backend import SyntheticBackend, create_backend_factory, parse_geometry
+from peekapi.capture import CaptureWorker
+from peekapi.screenshot import (
+    VIRTUAL_SCREEN,
+    BlurMode,
+    EncodeOptions,
+    blur,
+    encode_image,
+    frame_to_image,
+    screenshot,
+)
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+
+DESKTOPS = {
+    "1080p": ["1920x1080"],
+    "4k": ["3840x2160"],
+    "3x1440p": ["2560x1440", "2560x1440+2560+0", "2560x1440+5120+0"],
+}
+
+BLURS: list[tuple[BlurMode, float]] = [
+    ("gaussian", 1),
+    ("gaussian", 3),
+    ("gaussian", 10),
+    ("fast", 10),
+]
+
+ENCODINGS = [
+    EncodeOptions(format="jpeg", quality=75),
+    EncodeOptions(format="jpeg", quality=95),
+    EncodeOptions(format="webp", quality=80),
+    EncodeOptions(format="png"),
+]
+
+END_TO_END_RADIUS = 3
+
+
+def best_ms(fn: Callable[[], Any], repeat: int) -> float:
+    """返回多次运行中的最快耗时（毫秒），先预热一次"""
+    fn()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 3)
+
+
+def encoding_name(options: EncodeOptions) -> str:
+    if options.format == "png":
+        return "encode-png"
+    return f"encode-{options.format}-q{options.quality}"
+
+
+def bench_desktop(specs: list[str], repeat: int) -> dict[str, float]:
+    """计时单个桌面布局的各阶段"""
+    layout = [parse_geometry(spec) for spec in specs]
+    backend = SyntheticBackend(layout)
+    monitor = backend.monitors[VIRTUAL_SCREEN]
+    frame = backend.grab(monitor)
+    img = frame_to_image(frame)
+
+    stages = {
+        "grab": best_ms(lambda: backend.grab(monitor), repeat),
+        "convert": best_ms(lambda: frame_to_image(frame), repeat),
+    }
+    for mode, radius in BLURS:
+        stages[f"blur-{mode}-r{radius:g}"] = best_ms(
+            lambda mode=mode, radius=radius: blur(img, radius, mode), repeat
+        )
+    for options in ENCODINGS:
+        stages[encoding_name(options)] = best_ms(
+            lambda options=options: encode_image(img, options), repeat
+        )
+    stages[f"screenshot-r{END_TO_END_RADIUS}"] = bench_end_to_end(specs, repeat)
+    return stages
+
+
+def bench_end_to_end(specs: list[str], repeat: int) -> float:
+    """经过采集线程计时完整的 ``screenshot()``"""
+    worker = CaptureWorker(backend_factory=create_backend_factory("synthetic", specs))
+    try:
+        with patch.object(peekapi.screenshot, "capture_worker", worker):
+            return best_ms(
+                lambda: screenshot(END_TO_END_RADIUS, main_screen_only=False),
+                repeat,
+            )
+    finally:
+        worker.stop()
+
+
+def run(repeat: int) -> dict[str, Any]:
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "pillow": Image.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+        },
+        "results": {
+            name: bench_desktop(specs, repeat) for name, specs in DESKTOPS.items()
+        },
+    }
+
+
+def compare(
+    report: dict[str, Any],
+    baseline: dict[str, Any],
+    tolerance: float,
+    min_delta_ms: float = 0.0,
+) -> dict[str, list[str]]:
+    """
+    比较报告与基线。
+
+    Returns:
+        dict[str, list[str]]: 按桌面分组的超出容差的阶段，基线中没有的阶段
+        不参与比较
+    """
+    regressions: dict[str, list[str]] = {}
+    for desktop, stages in report["results"].items():
+        for stage, elapsed in stages.items():
+            expected = baseline["results"].get(desktop, {}).get(stage)
+            if expected is None or elapsed <= expected * (1 + tolerance):
+                continue
+            if elapsed - expected <= min_delta_ms:
+                continue
+            regressions.setdefault(desktop, []).append(stage)
+    return regressions
+
+
+def recheck(report: dict[str, Any], desktops: list[str], repeat: int) -> None:
+    """重新测量指定桌面，各阶段取两次测量中的较快值"""
+    for desktop in desktops:
+        again = bench_desktop(DESKTOPS[desktop], repeat)
+        stages = report["results"][desktop]
+        for stage, elapsed in again.items():
+            stages[stage] = min(stages.get(stage, elapsed), elapsed)
+
+
+def write_table(report: dict[str, Any], baseline: dict[str, Any] | None) -> None:
+    out = sys.stdout
+    out.write(f"{'桌面':<10}{'阶段':<22}{'耗时(ms)':>12}{'基线(ms)':>12}{'变化':>8}\n")
+    for desktop, stages in report["results"].items():
+        for stage, elapsed in stages.items():
+            expected = (baseline or {}).get("results", {}).get(desktop, {}).get(stage)
+            if expected:
+                change = f"{elapsed / expected - 1:>+8.0%}"
+                out.write(
+                    f"{desktop:<10}{stage:<22}{elapsed:>12.1f}{expected:>12.1f}{change}\n"
+                )
+            else:
+                out.write(
+                    f"{desktop:<10}{stage:<22}{elapsed:>12.1f}{'-':>12}{'-':>8}\n"
+                )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="截图流水线分阶段基准")
+    parser.add_argument("--repeat", type=int, default=5, help="每项重复次数，默认 5")
+    parser.add_argument("--output", type=Path, help="JSON 报告输出路径")
+    parser.add_argument(
+        "--baseline", type=Path, default=BASELINE_PATH, help="比较用的基线 JSON"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="允许比基线慢的比例，默认 0.25（即 25%%）",
+    )
+    parser.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=5.0,
+        help="比基线慢不超过该毫秒数时不算回归，默认 5",
+    )
+    parser.add_argument(
+        "--update-baseline", action="store_true", help="用本次结果覆盖基线"
+    )
+    args = parser.parse_args()
+
+    report = run(args.repeat)
+    if args.update_baseline:
+        again = run(args.repeat)
+        for desktop, stages in again["results"].items():
+            for stage, elapsed in stages.items():
+                slower = max(report["results"][desktop][stage], elapsed)
+                report["results"][desktop][stage] = slower
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        write_table(report, None)
+        return 0
+
+    baseline = None
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    regressions: dict[str, list[str]] = {}
+    if baseline is not None:
+        regressions = compare(report, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            recheck(report, list(regressions), args.repeat)
+            regressions = compare(report, baseline, args.tolerance, args.min_delta_ms)
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    write_table(report, baseline)
+    if baseline is None:
+        sys.stdout.write(f"\n未找到基线 {args.baseline}，跳过比较\n")
+        return 0
+    if regressions:
+        count = sum(len(stages) for stages in regressions.values())
+        sys.stdout.write(f"\n{count} 个阶段超出容差 {args.tolerance:.0%}:\n")
+        for desktop, stages in regressions.items():
+            for stage in stages:
+                elapsed = report["results"][desktop][stage]
+                expected = baseline["results"][desktop][stage]
+                sys.stdout.write(
+                    f"  {desktop}/{stage}: {elapsed:.1f}ms，基线 {expected:.1f}ms"
+                    f"（{elapsed / expected - 1:+.0%}）\n"
+                )
+        return 1
+    sys.stdout.write(f"\n全部阶段在基线容差 {args.tolerance:.0%} 以内\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""屏幕采集后端模块
+
+采集线程通过后端枚举显示器并截图。默认使用 mss 截取真实屏幕；合成后端
+按固定随机种子生成类似桌面的画面（渐变壁纸、任务栏、带文字的窗口和照片），
+不需要显示器，可以在无头环境中测试和基准测试整条截图流水线。
+"""
+
+import re
+from collections.abc import Callable, Sequence
+from typing import Literal, Protocol
+
+import mss
+import numpy as np
+from mss.models import Monitor, Monitors, Size
+from mss.screenshot import ScreenShot
+from PIL import Image, ImageDraw
+
+from .constants import GEOMETRY_PATTERN
+
+BackendName = Literal["mss", "synthetic"]
+
+# (left, top, width, height)
+Geometry = tuple[int, int, int, int]
+
+TASKBAR_HEIGHT = 40
+TITLE_BAR_HEIGHT = 28
+LINE_HEIGHT = 14
+
+_WORDS = (
+    "the quick brown fox jumps over lazy dog screen capture blur encode "
+    "frame window desktop monitor pixel buffer request cache stream peek "
+    "def return import class self config record audio json http 200 404"
+).split()
+
+
+class CaptureBackend(Protocol):
+    """采集后端接口，与 mss 实例的用法一致"""
+
+    @property
+    def monitors(self) -> Monitors:
+        """显示器列表，索引 0 为全部显示器组成的虚拟屏幕"""
+        ...
+
+    def grab(self, monitor: Monitor, /) -> ScreenShot:
+        """截取指定区域，返回 BGRA 原始像素"""
+        ...
+
+    def close(self) -> None: ...
+
+
+def parse_geometry(spec: str) -> Geometry:
+    """
+    解析 ``宽x高[+左+上]`` 格式的显示器几何，如 ``1920x1080+2560-360``。
+
+    Raises:
+        ValueError: 格式错误或尺寸为 0
+    """
+    match = re.match(GEOMETRY_PATTERN, spec.strip())
+    if match is None:
+        raise ValueError(f"无效的显示器几何: {spec!r}")
+    width, height, left, top = match.groups()
+    if int(width) == 0 or int(height) == 0:
+        raise ValueError(f"显示器尺寸不能为 0: {spec!r}")
+    return int(left or 0), int(top or 0), int(width), int(height)
+
+
+def _bounding_box(layout: Sequence[Geometry]) -> Geometry:
+    left = min(g[0] for g in layout)
+    top = min(g[1] for g in layout)
+    right = max(g[0] + g[2] for g in layout)
+    bottom = max(g[1] + g[3] for g in layout)
+    return left, top, right - left, bottom - top
+
+
+def _monitor(geometry: Geometry) -> Monitor:
+    left, top, width, height = geometry
+    return {"left": left, "top": top, "width": width, "height": height}
+
+
+def _gradient(
+    size: tuple[int, int], top: np.ndarray, bottom: np.ndarray
+) -> Image.Image:
+    """生成自上而下的线性渐变"""
+    width, height = size
+    t = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None]
+    rows = (top * (1 - t) + bottom * t).astype(np.uint8)
+    pixels = np.broadcast_to(rows[:, None, :], (height, width, 3))
+    return Image.fromarray(np.ascontiguousarray(pixels), "RGB")
+
+
+def _photo(size: tuple[int, int], rng: np.random.Generator) -> Image.Image:
+    """生成类似照片的平滑色块加细颗粒噪声"""
+    width, height = size
+    coarse = rng.integers(0, 256, (6, 8, 3), dtype=np.uint8)
+    img = Image.fromarray(coarse, "RGB").resize(size, Image.Resampling.BICUBIC)
+    grain = rng.normal(0, 6, (height, width, 3))
+    pixels = np.clip(np.asarray(img, dtype=np.float32) + grain, 0, 255)
+    return Image.fromarray(pixels.astype(np.uint8), "RGB")
+
+
+def _render_monitor(size: tuple[int, int], rng: np.random.Generator) -> Image.Image:
+    """生成单个显示器的桌面画面"""
+    width, height = size
+    img = _gradient(
+        size,
+        rng.integers(0, 256, 3).astype(np.float32),
+        rng.integers(0, 256, 3).astype(np.float32),
+    )
+    draw = ImageDraw.Draw(img)
+
+    # 窗口：标题栏 + 白底文字，其中第一个窗口嵌一张照片
+    for index in range(int(rng.integers(2, 5))):
+        win_w = int(rng.integers(width // 4, max(width // 4 + 1, width * 3 // 4)))
+        win_h = int(rng.integers(height // 4, max(height // 4 + 1, height * 3 // 4)))
+        x0 = int(rng.integers(0, max(1, width - win_w)))
+        y0 = int(rng.integers(0, max(1, height - TASKBAR_HEIGHT - win_h)))
+        x1, y1 = x0 + win_w, y0 + win_h
+        title = tuple(int(c) for c in rng.integers(0, 200, 3))
+        draw.rectangle((x0, y0, x1, y1), fill=(250, 250, 250), outline=(90, 90, 90))
+        draw.rectangle((x0, y0, x1, y0 + TITLE_BAR_HEIGHT), fill=title)
+        draw.text((x0 + 8, y0 + 8), f"Window {index}", fill=(255, 255, 255))
+
+        body_top = y0 + TITLE_BAR_HEIGHT + 6
+        for y in range(body_top, y1 - LINE_HEIGHT, LINE_HEIGHT):
+            words = rng.choice(_WORDS, size=int(rng.integers(3, 12)))
+            draw.text((x0 + 8, y), " ".join(words), fill=(30, 30, 30))
+        if index == 0 and win_w > 80 and win_h > 80:
+            # 照片覆盖在文字右侧
+            photo_w, photo_h = win_w // 2, (win_h - TITLE_BAR_HEIGHT) // 2
+            img.paste(_photo((photo_w, photo_h), rng), (x1 - photo_w - 6, body_top))
+
+    # 任务栏
+    draw.rectangle((0, height - TASKBAR_HEIGHT, width, height), fill=(32, 32, 36))
+    for x in range(8, min(width - 120, 8 + 48 * 12), 48):
+        icon = tuple(int(c) for c in rng.integers(60, 256, 3))
+        draw.rectangle((x, height - 34, x + 28, height - 6), fill=icon)
+    return img
+
+
+class SyntheticBackend:
+    """
+    合成采集后端，生成确定性的类桌面画面。
+
+    Attributes:
+        layout: 各显示器的 (left, top, width, height)，第一个为主显示器
+        seed: 随机种子，相同种子和布局生成完全相同的画面
+        animate: 为 True 时每次截图更新各显示器右下角的时钟区域，
+            模拟持续变化的屏幕
+    """
+
+    def __init__(
+        self, layout: Sequence[Geometry], seed: int = 0, animate: bool = False
+    ) -> None:
+        if not layout:
+            raise ValueError("至少需要一个显示器")
+        self.layout = list(layout)
+        self.seed = seed
+        self.animate = animate
+        self.grabs = 0
+        self._bbox = _bounding_box(self.layout)
+        self._desktop: Image.Image | None = None
+
+    @property
+    def monitors(self) -> Monitors:
+        return [_monitor(self._bbox)] + [_monitor(g) for g in self.layout]
+
+    def grab(self, monitor: Monitor, /) -> ScreenShot:
+        left, top = monitor["left"] - self._bbox[0], monitor["top"] - self._bbox[1]
+        width, height = monitor["width"], monitor["height"]
+        region = self._render().crop((left, top, left + width, top + height))
+        self.grabs += 1
+        if self.animate:
+            self._draw_clocks(region, left, top)
+        raw = bytearray(region.tobytes("raw", "BGRX"))
+        return ScreenShot(raw, dict(monitor), size=Size(*region.size))
+
+    def close(self) -> None:
+        self._desktop = None
+
+    def _render(self) -> Image.Image:
+        if self._desktop is None:
+            _, _, width, height = self._bbox
+            desktop = Image.new("RGB", (width, height))
+            for index, (left, top, w, h) in enumerate(self.layout):
+                rng = np.random.default_rng((self.seed, index))
+                desktop.paste(
+                    _render_monitor((w, h), rng),
+                    (left - self._bbox[0], top - self._bbox[1]),
+                )
+            self._desktop = desktop
+        return self._desktop
+
+    def _draw_clocks(self, region: Image.Image, left: int, top: int) -> None:
+        """在截图区域内各显示器的任务栏右端写入截图序号"""
+        draw = ImageDraw.Draw(region)
+        for m_left, m_top, m_width, m_height in self.layout:
+            x = m_left - self._bbox[0] - left + m_width - 100
+            y = m_top - self._bbox[1] - top + m_height - 28
+            draw.rectangle((x, y, x + 90, y + 20), fill=(32, 32, 36))
+            draw.text((x + 4, y + 4), f"{self.grabs:08d}", fill=(230, 230, 230))
+
+
+def create_backend_factory(
+    name: BackendName, monitors: Sequence[str] = ("1920x1080",), seed: int = 0
+) -> Callable[[], CaptureBackend]:
+    """
+    根据配置创建采集后端工厂，采集线程在需要时调用它创建或重建后端。
+
+    Args:
+        name: 后端名称
+        monitors: 合成后端的显示器几何列表，见 ``parse_geometry``
+        seed: 合成后端的随机种子
+    """
+    if name == "synthetic":
+        layout = [parse_geometry(spec) for spec in monitors]
+        return lambda: SyntheticBackend(layout, seed=seed, animate=True)
+    return lambda: mss.mss()
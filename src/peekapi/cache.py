@@ -0,0 +1,138 @@
+"""编码结果缓存模块
+
+按调用方给定的键缓存最近编码好的数据，总容量按字节数限制并按 LRU 淘汰。
+截图（``screen_cache``，键为渲染参数）与压缩录音（``record.audio_cache``）
+各自持有一个实例；``screen_cache`` 在切换私密模式或系统休眠时整体清空。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from dataclasses import dataclass
+from typing import Generic, TypeVar
+
+from .config import config
+from .privacy import register_purge_callback
+
+K = TypeVar("K", bound=Hashable)
+
+
+@dataclass(frozen=True)
+class CachedFrame:
+    """一份已编码的数据"""
+
+    data: bytes
+    captured_at: float  # 数据采集开始时的 time.monotonic()
+    etag: str = ""  # 内容的实体标签，无需时为空
+
+    @property
+    def age(self) -> float:
+        """距数据采集开始经过的秒数"""
+        return time.monotonic() - self.captured_at
+
+
+class FrameCache(Generic[K]):
+    """
+    字节数受限的 LRU 编码数据缓存。
+
+    Attributes:
+        max_bytes: 缓存数据总字节数上限，为 0 时不缓存
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[K, CachedFrame] = OrderedDict()
+        self._size = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        """缓存代数，每次清空后递增"""
+        with self._lock:
+            return self._generation
+
+    @property
+    def size_bytes(self) -> int:
+        """当前缓存数据总字节数"""
+        with self._lock:
+            return self._size
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key: K, max_age: float) -> CachedFrame | None:
+        """
+        获取不早于 ``max_age`` 秒前采集的缓存条目。
+
+        Args:
+            key: 缓存键
+            max_age: 可接受的最大数据龄（秒）
+
+        Returns:
+            CachedFrame: 命中的缓存条目，未命中或已过期返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.age > max_age:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(
+        self,
+        key: K,
+        data: bytes,
+        captured_at: float,
+        generation: int | None = None,
+        etag: str = "",
+    ) -> None:
+        """
+        写入缓存条目，超出容量时淘汰最久未使用的条目。
+
+        Args:
+            key: 缓存键
+            data: 编码后的数据
+            captured_at: 数据采集开始时的 time.monotonic()
+            generation: 采集开始时读取的 ``generation``；采集期间缓存被清空
+                时丢弃本次写入，防止清空前的内容重新进入缓存
+            etag: 内容的实体标签
+        """
+        size = len(data)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if size > self.max_bytes:
+                return
+
+            old = self._entries.pop(key, None)
+            if old is not None:
+                if old.captured_at > captured_at:
+                    # 已有更新的数据，放回原条目
+                    self._entries[key] = old
+                    return
+                self._size -= len(old.data)
+
+            self._entries[key] = CachedFrame(
+                data=data, captured_at=captured_at, etag=etag
+            )
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.data)
+
+    def clear(self) -> None:
+        """清空缓存并使进行中的写入失效"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self._generation += 1
+
+
+# 截图缓存，键为渲染参数
+screen_cache: FrameCache[Hashable] = FrameCache(
+    max_bytes=config.screenshot.cache_size_mb * 1024 * 1024
+)
+register_purge_callback(screen_cache.clear)
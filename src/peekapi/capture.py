@@ -0,0 +1,305 @@
+"""屏幕采集模块
+
+由专用采集线程持有长生命周期的采集后端（默认为 mss 实例），通过队列串行
+处理截图请求，避免每次请求都重新创建设备上下文和枚举显示器。
+显示器布局变化或采集出错时丢弃旧实例并重建。
+"""
+
+import ctypes
+import queue
+import sys
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+from typing import Any, TypeVar
+from typing_extensions import TypedDict
+
+from mss.models import Monitor
+from mss.screenshot import ScreenShot
+
+from .backend import CaptureBackend, create_backend_factory
+from .config import config
+from .logging import logger
+
+# region Windows 系统指标常量
+SM_XVIRTUALSCREEN = 76
+SM_YVIRTUALSCREEN = 77
+SM_CXVIRTUALSCREEN = 78
+SM_CYVIRTUALSCREEN = 79
+SM_CMONITORS = 80
+# endregion
+
+GRAB_TIMEOUT_SECONDS = 10.0  # 等待采集线程返回的最长时间
+
+T = TypeVar("T")
+
+# 虚拟桌面上的矩形区域：(left, top, width, height)
+Region = tuple[int, int, int, int]
+
+
+class CaptureStats(TypedDict):
+    """采集线程耗时统计（毫秒）"""
+
+    setup_ms: float  # 最近一次创建 mss 实例的耗时
+    last_grab_ms: float  # 最近一次截图耗时
+    avg_grab_ms: float  # 平均截图耗时
+    grabs: int  # 成功截图次数
+    rebuilds: int  # mss 实例创建次数（含首次）
+
+
+def _layout_signature() -> tuple[int, ...] | None:
+    """读取虚拟桌面位置、尺寸和显示器数量，作为布局变化的廉价指纹。
+
+    Returns:
+        Windows 下返回系统指标元组，其他平台返回 None（仅依赖出错重建）
+    """
+    if sys.platform != "win32":
+        return None
+    get_metric = ctypes.windll.user32.GetSystemMetrics
+    return tuple(
+        get_metric(index)
+        for index in (
+            SM_XVIRTUALSCREEN,
+            SM_YVIRTUALSCREEN,
+            SM_CXVIRTUALSCREEN,
+            SM_CYVIRTUALSCREEN,
+            SM_CMONITORS,
+        )
+    )
+
+
+class CaptureWorker:
+    """
+    屏幕采集线程，独占一个 mss 实例并串行处理截图请求。
+
+    mss 在 Windows 下持有的设备上下文与创建线程绑定，因此实例的创建、
+    使用和关闭都只在采集线程内进行，调用方通过队列提交请求并等待结果。
+
+    Attributes:
+        timeout: 调用方等待单次截图的最长时间（秒）
+        backend_factory: 在采集线程内创建采集后端，默认创建 mss 实例
+    """
+
+    def __init__(
+        self,
+        timeout: float = GRAB_TIMEOUT_SECONDS,
+        backend_factory: Callable[[], CaptureBackend] | None = None,
+    ) -> None:
+        self.timeout = timeout
+        self.backend_factory = backend_factory or create_backend_factory("mss")
+
+        self._requests: queue.SimpleQueue[
+            tuple[Callable[[], Any], Future[Any]] | None
+        ] = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._thread_lock = threading.Lock()
+
+        # 以下状态只在采集线程内访问
+        self._sct: CaptureBackend | None = None
+        self._layout: tuple[int, ...] | None = None
+
+        self._stats_lock = threading.Lock()
+        self._setup_ms = 0.0
+        self._last_grab_ms = 0.0
+        self._total_grab_ms = 0.0
+        self._grabs = 0
+        self._rebuilds = 0
+
+    def grab(self, monitor_index: int) -> ScreenShot:
+        """
+        在采集线程中截取指定显示器。
+
+        Args:
+            monitor_index: mss 显示器索引，0 为全部显示器组成的虚拟屏幕
+
+        Returns:
+            ScreenShot: 包含 BGRA 原始像素的截图
+
+        Raises:
+            TimeoutError: 采集线程未在 ``timeout`` 秒内返回
+            IndexError: 显示器索引不存在
+        """
+        return self._submit(
+            lambda: self._grab_with_retry(lambda sct: sct.monitors[monitor_index])
+        )
+
+    def grab_region(self, region: Region) -> ScreenShot:
+        """
+        在采集线程中截取虚拟桌面上的矩形区域，只截取区域内的像素。
+
+        Args:
+            region: (left, top, width, height)，虚拟桌面坐标；超出桌面的部分
+                被裁掉
+
+        Raises:
+            TimeoutError: 采集线程未在 ``timeout`` 秒内返回
+            IndexError: 区域与虚拟桌面没有交集
+        """
+        return self._submit(
+            lambda: self._grab_with_retry(
+                lambda sct: clip_region(region, sct.monitors[0])
+            )
+        )
+
+    def monitors(self) -> list[dict[str, int]]:
+        """
+        获取当前显示器布局。
+
+        Returns:
+            mss 显示器列表的副本，索引 0 为全部显示器组成的虚拟屏幕，
+            每项包含 left、top、width、height
+        """
+        return self._submit(lambda: [dict(m) for m in self._session().monitors])
+
+    def stats(self) -> CaptureStats:
+        """获取采集耗时统计"""
+        with self._stats_lock:
+            return {
+                "setup_ms": round(self._setup_ms, 3),
+                "last_grab_ms": round(self._last_grab_ms, 3),
+                "avg_grab_ms": round(self._total_grab_ms / self._grabs, 3)
+                if self._grabs
+                else 0.0,
+                "grabs": self._grabs,
+                "rebuilds": self._rebuilds,
+            }
+
+    def stop(self) -> None:
+        """停止采集线程并释放 mss 实例"""
+        with self._thread_lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None:
+            return
+
+        self._requests.put(None)
+        if thread is not threading.current_thread():
+            thread.join(timeout=3.0)
+            if thread.is_alive():
+                logger.warning("截图采集线程未在 3 秒内退出")
+
+    def _submit(self, fn: Callable[[], T]) -> T:
+        """把任务交给采集线程执行并等待结果"""
+        future: Future[T] = Future()
+        self._ensure_started()
+        self._requests.put((fn, future))
+        return future.result(timeout=self.timeout)
+
+    def _ensure_started(self) -> None:
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="peekapi-capture", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        """采集线程主循环"""
+        try:
+            while True:
+                request = self._requests.get()
+                if request is None:
+                    break
+
+                fn, future = request
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(fn())
+                except Exception as e:
+                    future.set_exception(e)
+        finally:
+            self._close_session()
+
+    def _grab_with_retry(
+        self, locate: Callable[[CaptureBackend], Monitor]
+    ) -> ScreenShot:
+        """
+        截图失败时重建实例并重试一次（如休眠唤醒后设备上下文失效）。
+
+        Args:
+            locate: 根据当前显示器布局确定截图区域
+        """
+        try:
+            return self._grab(locate)
+        except IndexError:
+            # 显示器或区域不存在，重建实例也无济于事
+            raise
+        except Exception as e:
+            logger.warning(f"截图失败，重建采集实例后重试: {e}")
+            self._close_session()
+            return self._grab(locate)
+
+    def _session(self) -> CaptureBackend:
+        """返回与当前显示器布局一致的 mss 实例，布局变化时重建"""
+        layout = _layout_signature()
+        if self._sct is not None and layout != self._layout:
+            logger.info("显示器布局已变化，重建采集实例")
+            self._close_session()
+
+        if self._sct is None:
+            self._open_session(layout)
+        assert self._sct is not None
+        return self._sct
+
+    def _grab(self, locate: Callable[[CaptureBackend], Monitor]) -> ScreenShot:
+        sct = self._session()
+        monitor = locate(sct)
+        start = time.perf_counter()
+        shot = sct.grab(monitor)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        with self._stats_lock:
+            self._last_grab_ms = elapsed_ms
+            self._total_grab_ms += elapsed_ms
+            self._grabs += 1
+        return shot
+
+    def _open_session(self, layout: tuple[int, ...] | None) -> None:
+        start = time.perf_counter()
+        sct = self.backend_factory()
+        # 预先枚举显示器，让枚举开销计入 setup 而非首次截图
+        _ = sct.monitors
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        self._sct = sct
+        self._layout = layout
+        with self._stats_lock:
+            self._setup_ms = elapsed_ms
+            self._rebuilds += 1
+        logger.debug(f"截图采集实例已创建，耗时 {elapsed_ms:.1f}ms")
+
+    def _close_session(self) -> None:
+        sct, self._sct = self._sct, None
+        if sct is None:
+            return
+        try:
+            sct.close()
+        except Exception as e:
+            logger.warning(f"关闭截图采集实例失败: {e}")
+
+
+def clip_region(region: Region, desktop: Monitor) -> Monitor:
+    """
+    把区域裁剪到虚拟桌面范围内。
+
+    Raises:
+        IndexError: 区域与虚拟桌面没有交集
+    """
+    left, top, width, height = region
+    right = min(left + width, desktop["left"] + desktop["width"])
+    bottom = min(top + height, desktop["top"] + desktop["height"])
+    left = max(left, desktop["left"])
+    top = max(top, desktop["top"])
+    if right <= left or bottom <= top:
+        raise IndexError("截图区域不在桌面范围内")
+    return {"left": left, "top": top, "width": right - left, "height": bottom - top}
+
+
+capture_worker = CaptureWorker(
+    backend_factory=create_backend_factory(
+        config.screenshot.backend, config.screenshot.synthetic_monitors
+    )
+)
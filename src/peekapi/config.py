@@ -1,8 +1,10 @@
 """配置管理模块"""
 
-from msgspec import Struct, field, toml
+from typing import Annotated, Literal
 
-from .constants import CONFIG_PATH
+from msgspec import Meta, Struct, field, toml
+
+from .constants import CONFIG_PATH, GEOMETRY_PATTERN
 
 
 class BasicConfig(Struct):
@@ -19,7 +21,27 @@ class ScreenshotConfig(Struct):
     """截图配置"""
 
     radius_threshold: int = 3
+    radius_step: Annotated[float, Meta(ge=0)] = 0  # 模糊半径向上取整的步长，0 为不量化
     main_screen_only: bool = False
+    pack_screens: bool = False  # 截取全部显示器时紧凑拼接，去除显示器之间的空白区域
+    cache_size_mb: int = 32  # 截图结果缓存上限（MB），为 0 时不缓存
+    blur_mode: Literal["gaussian", "fast"] = "gaussian"  # fast 为缩小-模糊-放大近似
+    format: Literal["jpeg", "webp", "png"] = (
+        "jpeg"  # 未指定 fmt 且 Accept 未协商时的格式
+    )
+    quality: Annotated[int, Meta(ge=1, le=100)] = 95  # JPEG/WebP 默认质量
+    subsampling: Literal["444", "422", "420"] = "420"  # JPEG 默认色度抽样
+    max_bytes: Annotated[int, Meta(ge=0)] = 0  # /screen 默认输出字节数上限，0 为不限制
+    stream_max_fps: Annotated[float, Meta(gt=0)] = 5.0  # /screen/stream 最高帧率
+    history_interval: Annotated[float, Meta(ge=0)] = 0  # 后台采样间隔（秒），0 为关闭
+    history_size_mb: Annotated[int, Meta(ge=0)] = 64  # 截图历史内存上限（MB）
+    delta_cache_mb: Annotated[int, Meta(ge=0)] = (
+        128  # /screen/delta 原始帧内存上限（MB）
+    )
+    backend: Literal["mss", "synthetic"] = "mss"  # synthetic 生成合成桌面，无需显示器
+    synthetic_monitors: list[Annotated[str, Meta(pattern=GEOMETRY_PATTERN)]] = field(
+        default_factory=lambda: ["1920x1080"]
+    )  # 合成后端的显示器布局，如 "2560x1440"、"1920x1080+2560+0"
 
 
 class RecordConfig(Struct):
@@ -27,6 +49,11 @@ class RecordConfig(Struct):
 
     duration: int = 20
     gain: float = 20.0
+    format: Literal["wav", "flac", "ogg", "opus"] = "wav"  # 未指定 fmt 时的格式
+    compression_level: Annotated[float, Meta(ge=0, le=1)] = (
+        0.5  # FLAC/Ogg/Opus 压缩级别，越大体积越小
+    )
+    cache_size_mb: Annotated[int, Meta(ge=0)] = 8  # 压缩录音缓存上限（MB）
 
 
 class Config(Struct):
@@ -29,6 +29,10 @@ LOG_DIR = BASE_DIR / "logs"
 RECONNECT_DELAY_SECONDS = 2.0  # 设备重连延迟（秒）
 MAX_CONSECUTIVE_ERRORS = 5  # 最大连续错误次数
 
+# 截图相关常量
+GEOMETRY_PATTERN = r"^(\d+)x(\d+)(?:([+-]\d+)([+-]\d+))?$"  # 宽x高[+左+上]
+MAX_BLUR_RADIUS = 10000.0  # 模糊半径上限，更大的半径与之效果相同且会让 Pillow 溢出
+
 # 应用信息
 APP_ID = "PeekAPI"
 
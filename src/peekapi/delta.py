@@ -0,0 +1,283 @@
+"""增量截图模块
+
+保存最近截取的原始帧并分配帧号。客户端携带已持有的帧号请求时，用 numpy
+逐像素比较两帧的 BGRA 缓冲，找出发生变化的图块，只模糊和编码这些区域，
+客户端把它们贴回已有画面即可得到新帧。切换私密模式或系统休眠时清空。
+"""
+
+import itertools
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+from mss.screenshot import ScreenShot
+
+from .capture import Region
+from .config import config
+from .privacy import register_purge_callback
+from .screenshot import (
+    BlurMode,
+    EncodeOptions,
+    ScreenTarget,
+    blur,
+    encode_image,
+    frame_to_image,
+)
+
+TILE_SIZE = 64  # 变化检测的图块边长（像素）
+BLUR_REACH = 3  # 模糊影响范围约为半径的倍数
+
+
+@dataclass(frozen=True)
+class DeltaFrame:
+    """
+    一帧保存的原始截图。
+
+    Attributes:
+        frame_id: 帧号，进程内单调递增
+        target: 截图对象（显示器索引或区域）
+        frame: 原始 BGRA 截图
+        fingerprint: 原始像素指纹
+    """
+
+    frame_id: int
+    target: ScreenTarget
+    frame: ScreenShot
+    fingerprint: int
+
+
+@dataclass(frozen=True)
+class Tile:
+    """一个编码后的变化区域，坐标相对于截图左上角"""
+
+    region: Region
+    data: bytes
+
+
+class DeltaStore:
+    """
+    字节数受限的原始帧存储，按帧号查找，超出容量时淘汰最早的帧。
+
+    Attributes:
+        max_bytes: 原始帧总字节数上限，为 0 时不保存
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._frames: OrderedDict[int, DeltaFrame] = OrderedDict()
+        self._latest: dict[ScreenTarget, int] = {}
+        self._ids = itertools.count(1)
+        self._size = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        """存储代数，每次清空后递增"""
+        with self._lock:
+            return self._generation
+
+    @property
+    def size_bytes(self) -> int:
+        """当前原始帧总字节数"""
+        with self._lock:
+            return self._size
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._frames)
+
+    def get(self, frame_id: int) -> DeltaFrame | None:
+        """按帧号获取保存的帧，已淘汰或不存在时返回 None"""
+        with self._lock:
+            return self._frames.get(frame_id)
+
+    def add(
+        self,
+        target: ScreenTarget,
+        frame: ScreenShot,
+        fingerprint: int,
+        generation: int,
+    ) -> DeltaFrame:
+        """
+        保存新截取的帧并分配帧号。
+
+        画面与该截图对象最近保存的帧相同时复用其帧号，不重复保存。
+
+        Args:
+            generation: 截图开始时读取的 ``generation``；截图期间存储被清空
+                时不保存本帧，返回的帧号之后查不到
+        """
+        size = len(frame.raw)
+        with self._lock:
+            latest = self._frames.get(self._latest.get(target, 0))
+            if (
+                latest is not None
+                and latest.fingerprint == fingerprint
+                and latest.frame.size == frame.size
+            ):
+                return latest
+
+            entry = DeltaFrame(next(self._ids), target, frame, fingerprint)
+            if generation != self._generation or size > self.max_bytes:
+                return entry
+            self._frames[entry.frame_id] = entry
+            self._latest[target] = entry.frame_id
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._frames.popitem(last=False)
+                self._size -= len(evicted.frame.raw)
+            return entry
+
+    def clear(self) -> None:
+        """清空存储并使进行中的写入失效"""
+        with self._lock:
+            self._frames.clear()
+            self._latest.clear()
+            self._size = 0
+            self._generation += 1
+
+
+def changed_tiles(
+    previous: ScreenShot, current: ScreenShot, tile: int = TILE_SIZE
+) -> np.ndarray:
+    """
+    比较两帧尺寸相同的截图，返回发生变化的图块。
+
+    每个 BGRA 像素按一个 uint32 比较，再把逐像素结果按图块归约。
+
+    Returns:
+        np.ndarray: 形状为 (图块行数, 图块列数) 的布尔数组
+    """
+    width, height = current.size
+    before = np.frombuffer(previous.raw, dtype=np.uint32).reshape(height, width)
+    after = np.frombuffer(current.raw, dtype=np.uint32).reshape(height, width)
+    rows, cols = -(-height // tile), -(-width // tile)
+    diff = np.zeros((rows * tile, cols * tile), dtype=bool)
+    np.not_equal(before, after, out=diff[:height, :width])
+    return np.asarray(diff.reshape(rows, tile, cols, tile).any(axis=(1, 3)))
+
+
+def dilate(mask: np.ndarray, steps: int) -> np.ndarray:
+    """把变化图块向周围 8 邻域扩张 ``steps`` 圈"""
+    for _ in range(steps):
+        grown = mask.copy()
+        grown[1:, :] |= mask[:-1, :]
+        grown[:-1, :] |= mask[1:, :]
+        mask = grown.copy()
+        grown[:, 1:] |= mask[:, :-1]
+        grown[:, :-1] |= mask[:, 1:]
+        mask = grown
+    return mask
+
+
+def tile_regions(
+    mask: np.ndarray, size: tuple[int, int], tile: int = TILE_SIZE
+) -> list[Region]:
+    """
+    把变化图块合并为矩形区域。
+
+    同一行中相邻的变化图块合并为一个区域，减少单独编码的次数和每段的
+    编码头开销；区域裁剪到截图范围内。
+    """
+    width, height = size
+    regions: list[Region] = []
+    for row in np.flatnonzero(mask.any(axis=1)):
+        edges = np.diff(mask[row].astype(np.int8), prepend=0, append=0)
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        top = int(row) * tile
+        tile_height = min(tile, height - top)
+        for start, end in zip(starts, ends, strict=True):
+            left = int(start) * tile
+            regions.append((left, top, min(int(end) * tile, width) - left, tile_height))
+    return regions
+
+
+def blur_margin(radius: float, blur_mode: BlurMode = "gaussian") -> int:
+    """
+    模糊后一个像素受周围多远像素影响。
+
+    快速模糊的缩小块和双线性放大各自再扩散至多一个缩小倍数（不超过半径的
+    一半），多留一个半径。
+    """
+    if not math.isfinite(radius) or radius <= 0:
+        return 0
+    if blur_mode == "fast":
+        return math.ceil((BLUR_REACH + 1) * radius) + 1
+    return math.ceil(BLUR_REACH * radius)
+
+
+def delta_regions(
+    previous: ScreenShot,
+    current: ScreenShot,
+    radius: float,
+    blur_mode: BlurMode = "gaussian",
+) -> list[Region]:
+    """
+    计算需要重新发送的区域。
+
+    模糊会把变化扩散到相邻像素，变化图块按模糊范围向外扩张，保证客户端
+    拼接后的画面与整帧模糊一致。
+    """
+    mask = changed_tiles(previous, current)
+    mask = dilate(mask, -(-blur_margin(radius, blur_mode) // TILE_SIZE))
+    return tile_regions(mask, current.size)
+
+
+def render_tiles(
+    frame: ScreenShot,
+    regions: list[Region],
+    radius: float,
+    blur_mode: BlurMode,
+    encoding: EncodeOptions,
+) -> list[Tile]:
+    """
+    分别模糊并编码各区域。
+
+    高斯模糊时每个区域连同模糊范围内的边缘一起裁出后模糊，再去掉边缘编码，
+    结果与整帧模糊后裁出的区域一致，拼接处没有接缝。快速模糊的缩小倍数和
+    缩小网格取决于整幅图像，裁出的区域单独模糊会与整帧结果不同，因此整帧
+    模糊一次后裁出各区域。
+    """
+    img = frame_to_image(frame)
+    if blur_mode == "fast":
+        blurred = blur(img, radius, blur_mode)
+        return [
+            Tile(
+                (left, top, width, height),
+                encode_image(
+                    blurred.crop((left, top, left + width, top + height)), encoding
+                ),
+            )
+            for left, top, width, height in regions
+        ]
+
+    margin = blur_margin(radius)
+    tiles = []
+    for left, top, width, height in regions:
+        box = (
+            max(0, left - margin),
+            max(0, top - margin),
+            min(img.width, left + width + margin),
+            min(img.height, top + height + margin),
+        )
+        blurred = blur(img.crop(box), radius, blur_mode)
+        inner = (
+            left - box[0],
+            top - box[1],
+            left - box[0] + width,
+            top - box[1] + height,
+        )
+        tiles.append(
+            Tile(
+                (left, top, width, height), encode_image(blurred.crop(inner), encoding)
+            )
+        )
+    return tiles
+
+
+delta_store = DeltaStore(max_bytes=config.screenshot.delta_cache_mb * 1024 * 1024)
+register_purge_callback(delta_store.clear)
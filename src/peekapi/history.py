@@ -0,0 +1,265 @@
+"""截图历史模块
+
+可选的后台采样器按固定间隔截图，编码后写入按字节数限制的环形历史，
+供查询“某一时刻屏幕上是什么”。画面未变化时只延长上一帧的持续时间，
+不重复编码和存储。切换私密模式或系统休眠时整体清空。
+
+历史帧以原始清晰度保存，模糊在查询时按请求的半径进行。
+"""
+
+import bisect
+import io
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, replace
+
+from mss.screenshot import ScreenShot
+from PIL import Image
+
+from .config import config
+from .logging import logger
+from .pipeline import Pipeline, StageStats
+from .privacy import register_purge_callback
+from .screenshot import (
+    BlurMode,
+    EncodeOptions,
+    blur,
+    capture,
+    default_monitor,
+    encode_image,
+    frame_fingerprint,
+    render,
+)
+
+
+@dataclass(frozen=True)
+class HistoryFrame:
+    """
+    一帧历史截图，画面在 ``first_seen`` 到 ``last_seen`` 期间保持不变。
+
+    Attributes:
+        data: 编码后的图像数据（未模糊）
+        encoding: 编码参数
+        fingerprint: 原始像素指纹
+        first_seen: 首次截到该画面的 Unix 时间戳
+        last_seen: 最近一次截到该画面的 Unix 时间戳
+    """
+
+    data: bytes
+    encoding: EncodeOptions
+    fingerprint: int
+    first_seen: float
+    last_seen: float
+
+
+def render_history_frame(
+    frame: HistoryFrame, radius: float, blur_mode: BlurMode = "gaussian"
+) -> bytes:
+    """按请求的半径模糊历史帧，半径非正时直接返回原数据"""
+    if not radius > 0:
+        return frame.data
+    with Image.open(io.BytesIO(frame.data)) as img:
+        blurred = blur(img.convert("RGB"), radius, blur_mode)
+    return encode_image(blurred, frame.encoding)
+
+
+class FrameHistory:
+    """
+    字节数受限的截图历史环，按时间顺序保存，超出容量时淘汰最早的帧。
+
+    Attributes:
+        max_bytes: 历史数据总字节数上限，为 0 时不保存
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._frames: deque[HistoryFrame] = deque()
+        self._size = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        """历史代数，每次清空后递增"""
+        with self._lock:
+            return self._generation
+
+    @property
+    def size_bytes(self) -> int:
+        """当前历史数据总字节数"""
+        with self._lock:
+            return self._size
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._frames)
+
+    def frames(self) -> list[HistoryFrame]:
+        """按时间顺序返回全部历史帧"""
+        with self._lock:
+            return list(self._frames)
+
+    def at(self, timestamp: float) -> HistoryFrame | None:
+        """
+        获取指定时刻屏幕上的画面。
+
+        Args:
+            timestamp: Unix 时间戳
+
+        Returns:
+            HistoryFrame: 该时刻之前最近一次截到的帧，早于全部历史时返回 None
+        """
+        with self._lock:
+            index = bisect.bisect_right(
+                self._frames, timestamp, key=lambda frame: frame.first_seen
+            )
+            return self._frames[index - 1] if index else None
+
+    def extend(self, fingerprint: int, timestamp: float, generation: int) -> bool:
+        """
+        画面与最新一帧相同时延长其持续时间。
+
+        Returns:
+            bool: 已延长返回 True，画面不同或历史为空返回 False
+        """
+        with self._lock:
+            if generation != self._generation or not self._frames:
+                return False
+            last = self._frames[-1]
+            if last.fingerprint != fingerprint:
+                return False
+            self._frames[-1] = replace(last, last_seen=max(last.last_seen, timestamp))
+            return True
+
+    def append(self, frame: HistoryFrame, generation: int) -> None:
+        """
+        追加新帧，超出容量时淘汰最早的帧。
+
+        Args:
+            frame: 历史帧，``first_seen`` 不早于已有的最新帧
+            generation: 截图开始时读取的 ``generation``；截图期间历史被清空
+                时丢弃本次写入，防止清空前的画面重新进入历史
+        """
+        size = len(frame.data)
+        with self._lock:
+            if generation != self._generation or size > self.max_bytes:
+                return
+            self._frames.append(frame)
+            self._size += size
+            while self._size > self.max_bytes:
+                self._size -= len(self._frames.popleft().data)
+
+    def clear(self) -> None:
+        """清空历史并使进行中的写入失效"""
+        with self._lock:
+            self._frames.clear()
+            self._size = 0
+            self._generation += 1
+
+
+# 截图阶段的输出：(截图时间戳, 历史代数, 截图, 指纹)
+_Sample = tuple[float, int, ScreenShot, int]
+
+
+class ScreenSampler:
+    """
+    后台截图采样器。
+
+    采样线程按间隔提交采样任务，流水线的截图阶段计算指纹，画面未变化时只
+    延长上一帧；变化时交给编码阶段写入历史。私密模式下不采样。
+
+    Attributes:
+        history: 写入的截图历史
+        interval: 采样间隔（秒），为 0 时不启动
+    """
+
+    def __init__(self, history: FrameHistory, interval: float) -> None:
+        self.history = history
+        self.interval = interval
+        self._thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
+        # 最近一次送入编码阶段的 (历史代数, 指纹)，只在截图阶段线程内访问
+        self._last_sample: tuple[int, int] | None = None
+        self._pipeline = Pipeline(
+            "peekapi-history", [("capture", self._capture), ("encode", self._encode)]
+        )
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None
+
+    def stats(self) -> list[StageStats]:
+        """获取采样流水线各阶段的队列深度和耗时统计"""
+        return self._pipeline.stats()
+
+    def start(self) -> None:
+        """启动后台采样，间隔为 0 或已在运行时不做任何事"""
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._pipeline.start()
+        self._thread = threading.Thread(
+            target=self._run, name="peekapi-history", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"截图历史采样已启动: 间隔 {self.interval}秒")
+
+    def stop(self) -> None:
+        """停止后台采样"""
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stop_event.set()
+        thread.join(timeout=3.0)
+        self._pipeline.stop()
+        logger.info("截图历史采样已停止")
+
+    def _run(self) -> None:
+        while True:
+            if config.basic.is_public:
+                self._pipeline.put(None)
+            if self._stop_event.wait(self.interval):
+                break
+
+    def _capture(self, _: None) -> _Sample | None:
+        """截图阶段：画面未变化时只延长上一帧，不进入编码阶段"""
+        generation = self.history.generation
+        timestamp = time.time()
+        monitor = default_monitor(
+            config.screenshot.main_screen_only, config.screenshot.pack_screens
+        )
+        frame = capture(monitor)
+        fingerprint = frame_fingerprint(frame)
+        if self.history.extend(fingerprint, timestamp, generation):
+            return None
+        if self._last_sample == (generation, fingerprint):
+            # 同一画面仍在编码阶段，尚未写入历史
+            return None
+        self._last_sample = (generation, fingerprint)
+        return timestamp, generation, frame, fingerprint
+
+    def _encode(self, sample: _Sample) -> None:
+        """编码阶段：以原始清晰度编码后写入历史"""
+        timestamp, generation, frame, fingerprint = sample
+        encoding = EncodeOptions(
+            format=config.screenshot.format,
+            quality=config.screenshot.quality,
+            subsampling=config.screenshot.subsampling,
+        )
+        data = render(frame, 0, encoding=encoding)
+        self.history.append(
+            HistoryFrame(
+                data=data,
+                encoding=encoding,
+                fingerprint=fingerprint,
+                first_seen=timestamp,
+                last_seen=timestamp,
+            ),
+            generation,
+        )
+
+
+screen_history = FrameHistory(max_bytes=config.screenshot.history_size_mb * 1024 * 1024)
+screen_sampler = ScreenSampler(screen_history, config.screenshot.history_interval)
+register_purge_callback(screen_history.clear)
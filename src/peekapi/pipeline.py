@@ -0,0 +1,161 @@
+"""分阶段处理流水线模块
+
+每个阶段由独立线程处理，阶段之间通过有界队列衔接：下游处理较慢时上游
+在队列满处阻塞，不会无限积压帧。截图、模糊和编码分别落在不同阶段后，
+下一帧的截图可以与当前帧的模糊编码重叠进行；Pillow 的滤镜和编码器会释放
+GIL，多核上能真正并行。
+"""
+
+import queue
+import threading
+import time
+from collections.abc import Callable, Sequence
+from typing import Any
+from typing_extensions import TypedDict
+
+from .logging import logger
+
+STOP_TIMEOUT_SECONDS = 3.0  # 等待阶段线程退出的最长时间
+
+_STOP = object()  # 通知阶段线程退出的哨兵
+
+
+class StageStats(TypedDict):
+    """单个阶段的队列深度和耗时统计"""
+
+    name: str
+    queue_depth: int  # 输入队列中等待处理的条目数
+    queue_size: int  # 输入队列容量
+    processed: int  # 已处理条目数
+    errors: int  # 处理出错的条目数
+    last_ms: float  # 最近一次处理耗时（毫秒）
+    avg_ms: float  # 平均处理耗时（毫秒）
+
+
+class _Stage:
+    def __init__(self, name: str, fn: Callable[[Any], Any], queue_size: int) -> None:
+        self.name = name
+        self.fn = fn
+        self.inbox: queue.Queue[Any] = queue.Queue(maxsize=queue_size)
+        self.thread: threading.Thread | None = None
+        self.processed = 0
+        self.errors = 0
+        self.last_ms = 0.0
+        self.total_ms = 0.0
+
+
+class Pipeline:
+    """
+    多阶段流水线。
+
+    每个阶段的函数接收上一阶段的输出，返回值交给下一阶段；返回 None 表示
+    丢弃该条目。最后一个阶段的返回值被忽略。阶段函数抛出的异常只记录日志，
+    不会中断流水线。
+
+    Attributes:
+        name: 流水线名称，用作线程名前缀
+    """
+
+    def __init__(
+        self,
+        name: str,
+        stages: Sequence[tuple[str, Callable[[Any], Any]]],
+        queue_size: int = 1,
+    ) -> None:
+        self.name = name
+        self._stages = [_Stage(stage, fn, queue_size) for stage, fn in stages]
+        self._stats_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        with self._lock:
+            return any(stage.thread is not None for stage in self._stages)
+
+    def start(self) -> None:
+        """启动所有阶段线程，已在运行时不做任何事"""
+        with self._lock:
+            for index, stage in enumerate(self._stages):
+                if stage.thread is not None:
+                    continue
+                stage.thread = threading.Thread(
+                    target=self._run_stage,
+                    args=(index,),
+                    name=f"{self.name}-{stage.name}",
+                    daemon=True,
+                )
+                stage.thread.start()
+
+    def put(self, item: Any, timeout: float | None = None) -> None:
+        """
+        向第一个阶段提交条目，队列已满时阻塞。
+
+        Raises:
+            queue.Full: ``timeout`` 秒内未能提交
+        """
+        self._stages[0].inbox.put(item, timeout=timeout)
+
+    def stop(self) -> None:
+        """依次停止各阶段，已提交的条目处理完后线程退出"""
+        with self._lock:
+            threads = [stage.thread for stage in self._stages]
+        if threads[0] is None:
+            return
+
+        self._stages[0].inbox.put(_STOP)
+        for thread in threads:
+            if thread is None or thread is threading.current_thread():
+                continue
+            thread.join(timeout=STOP_TIMEOUT_SECONDS)
+            if thread.is_alive():
+                logger.warning(f"流水线阶段 {thread.name} 未在 3 秒内退出")
+        with self._lock:
+            for stage in self._stages:
+                stage.thread = None
+
+    def stats(self) -> list[StageStats]:
+        """获取各阶段的队列深度和耗时统计"""
+        with self._stats_lock:
+            return [
+                {
+                    "name": stage.name,
+                    "queue_depth": stage.inbox.qsize(),
+                    "queue_size": stage.inbox.maxsize,
+                    "processed": stage.processed,
+                    "errors": stage.errors,
+                    "last_ms": round(stage.last_ms, 3),
+                    "avg_ms": round(stage.total_ms / stage.processed, 3)
+                    if stage.processed
+                    else 0.0,
+                }
+                for stage in self._stages
+            ]
+
+    def _run_stage(self, index: int) -> None:
+        stage = self._stages[index]
+        downstream = (
+            self._stages[index + 1].inbox if index + 1 < len(self._stages) else None
+        )
+        while True:
+            item = stage.inbox.get()
+            if item is _STOP:
+                if downstream is not None:
+                    downstream.put(_STOP)
+                break
+
+            start = time.perf_counter()
+            try:
+                result = stage.fn(item)
+            except Exception as e:
+                logger.warning(f"流水线阶段 {self.name}-{stage.name} 处理失败: {e}")
+                with self._stats_lock:
+                    stage.errors += 1
+                continue
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._stats_lock:
+                stage.processed += 1
+                stage.last_ms = elapsed_ms
+                stage.total_ms += elapsed_ms
+
+            if downstream is not None and result is not None:
+                downstream.put(result)
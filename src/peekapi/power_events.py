@@ -18,6 +18,7 @@ import ctypes.wintypes
 import threading
 
 from .logging import logger
+from .privacy import purge_screen_data
 
 # region Windows 电源事件常量
 WM_POWERBROADCAST = 0x0218
@@ -88,6 +89,7 @@ def _on_power_event(context, event_type, setting):
                 if not _suspended:
                     logger.info("系统即将休眠/待机，正在停止录音设备...")
                     _suspended = True
+                    purge_screen_data("系统即将休眠")
                     try:
                         recorder.stop_recording(wait=False)
                     except Exception as e:
@@ -0,0 +1,42 @@
+"""隐私数据清理模块
+
+切换到私密模式或系统即将休眠时，丢弃内存中缓存的屏幕数据，
+保证之后恢复公开也不会返回私密期间之前的画面。
+持有屏幕数据的模块在导入时注册清理回调。
+"""
+
+import threading
+from collections.abc import Callable
+
+from .logging import logger
+
+_callbacks: list[Callable[[], None]] = []
+_lock = threading.Lock()
+
+
+def register_purge_callback(callback: Callable[[], None]) -> None:
+    """注册屏幕数据清理回调"""
+    with _lock:
+        if callback not in _callbacks:
+            _callbacks.append(callback)
+
+
+def purge_screen_data(reason: str) -> None:
+    """
+    调用全部已注册的清理回调。
+
+    单个回调失败不影响其他回调执行。
+
+    Args:
+        reason: 清理原因，用于日志
+    """
+    with _lock:
+        callbacks = list(_callbacks)
+
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"清理屏幕数据失败: {e}")
+
+    logger.info(f"已清空内存中的屏幕数据: {reason}")
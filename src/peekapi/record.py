@@ -1,15 +1,192 @@
 import collections
 import io
+import math
+import struct
 import threading
+import time
+from collections.abc import Hashable, Iterator
+from dataclasses import dataclass
+from typing import Literal
 
 import numpy as np
 import soundcard as sc
 import soundfile as sf
 
+from .cache import FrameCache
 from .config import config
 from .constants import MAX_CONSECUTIVE_ERRORS, RECONNECT_DELAY_SECONDS
 from .logging import logger
 
+WAV_HEADER_SIZE = 44  # 单声道 PCM_16 WAV 文件头字节数
+WAV_CHUNK_BYTES = 64 * 1024  # 流式输出时每段的字节数
+
+AudioFormat = Literal["wav", "flac", "ogg", "opus"]
+
+AUDIO_MEDIA_TYPES: dict[AudioFormat, str] = {
+    "wav": "audio/wav",
+    "flac": "audio/flac",
+    "ogg": "audio/ogg",
+    "opus": "audio/ogg; codecs=opus",
+}
+
+# soundfile 的 (容器格式, 编码)
+_SOUNDFILE_FORMATS: dict[AudioFormat, tuple[str, str]] = {
+    "wav": ("WAV", "PCM_16"),
+    "flac": ("FLAC", "PCM_16"),
+    "ogg": ("OGG", "VORBIS"),
+    "opus": ("OGG", "OPUS"),
+}
+
+OPUS_RATES = (8000, 12000, 16000, 24000, 48000)  # libsndfile 的 Opus 只支持这些采样率
+
+
+def wav_header(sample_count: int, rate: int) -> bytes:
+    """生成单声道 16 位 PCM WAV 的 44 字节文件头"""
+    data_size = sample_count * 2
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        WAV_HEADER_SIZE - 8 + data_size,
+        b"WAVE",
+        b"fmt ",
+        16,  # fmt 块长度
+        1,  # PCM
+        1,  # 声道数
+        rate,
+        rate * 2,  # 每秒字节数
+        2,  # 每帧字节数
+        16,  # 位深
+        b"data",
+        data_size,
+    )
+
+
+def iter_wav(samples: np.ndarray, rate: int) -> Iterator[bytes | memoryview]:
+    """
+    按 WAV 格式分段输出样本，先输出文件头，再输出样本内存的切片视图。
+
+    Args:
+        samples: 单声道 int16 样本，输出期间不能被修改
+        rate: 采样率 (Hz)
+    """
+    yield wav_header(len(samples), rate)
+    data = samples.astype("<i2", copy=False).data.cast("B")
+    for offset in range(0, len(data), WAV_CHUNK_BYTES):
+        yield data[offset : offset + WAV_CHUNK_BYTES]
+
+
+def resample(samples: np.ndarray, rate: int, target_rate: int) -> np.ndarray:
+    """线性插值重采样，用于把采样率转换到编码器支持的值"""
+    if rate == target_rate or len(samples) == 0:
+        return samples
+    count = round(len(samples) * target_rate / rate)
+    positions = np.arange(count) * (rate / target_rate)
+    resampled = np.interp(positions, np.arange(len(samples)), samples)
+    return np.round(resampled).astype(np.int16)
+
+
+def encode_audio(
+    samples: np.ndarray, rate: int, fmt: AudioFormat, compression_level: float
+) -> bytes:
+    """
+    用 soundfile 把单声道 int16 样本编码为指定格式。
+
+    Opus 不支持的采样率先重采样到 48kHz。没有样本时 libsndfile 写不出可解码的
+    FLAC/Opus 流，统一返回只有文件头的空 WAV。
+
+    Args:
+        compression_level: 0 到 1，对 FLAC 为压缩级别，对 Vorbis/Opus 为码率
+            由高到低，WAV 忽略
+    """
+    if len(samples) == 0:
+        return wav_header(0, rate)
+    if fmt == "opus" and rate not in OPUS_RATES:
+        samples = resample(samples, rate, 48000)
+        rate = 48000
+    container, subtype = _SOUNDFILE_FORMATS[fmt]
+    output = io.BytesIO()
+    sf.write(
+        output,
+        samples,
+        rate,
+        format=container,
+        subtype=subtype,
+        compression_level=None if fmt == "wav" else compression_level,
+    )
+    return output.getvalue()
+
+
+@dataclass(frozen=True)
+class AudioClip:
+    """
+    录音缓冲中一段连续样本的副本。
+
+    Attributes:
+        samples: 单声道 int16 样本
+        start: 首个样本在本代缓冲中的序号
+        generation: 缓冲代数，录音线程重建缓冲时递增；与 ``start``、样本数
+            一起唯一确定这段录音
+    """
+
+    samples: np.ndarray
+    start: int
+    generation: int
+
+
+class RingBuffer:
+    """
+    预分配的 int16 环形缓冲区，只保留最近 ``capacity`` 个样本。
+
+    写入和读取都是整段切片复制，不为每个样本创建 Python 对象。本身不加锁，
+    由调用方保证并发安全。
+
+    Attributes:
+        capacity: 最多保存的样本数
+        total: 累计写入的样本数，可作为样本的绝对序号
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.total = 0
+        self._data = np.zeros(capacity, dtype=np.int16)
+        self._end = 0  # 下一个样本的写入位置
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def extend(self, samples: np.ndarray) -> None:
+        """追加样本，超出容量时覆盖最早的样本"""
+        samples = np.asarray(samples, dtype=np.int16).ravel()
+        count = len(samples)
+        self.total += count
+        if self.capacity == 0 or count == 0:
+            return
+        if count >= self.capacity:
+            self._data[:] = samples[-self.capacity :]
+            self._end = 0
+            self._size = self.capacity
+            return
+
+        head = min(count, self.capacity - self._end)
+        self._data[self._end : self._end + head] = samples[:head]
+        self._data[: count - head] = samples[head:]
+        self._end = (self._end + count) % self.capacity
+        self._size = min(self.capacity, self._size + count)
+
+    def snapshot(self, count: int | None = None) -> np.ndarray:
+        """
+        按时间顺序复制出最近的样本，只复制需要的部分。
+
+        Args:
+            count: 样本数，为 None 或超过已保存的样本数时复制全部
+        """
+        size = self._size if count is None else max(0, min(count, self._size))
+        start = self._end - size
+        if start >= 0:
+            return self._data[start : self._end].copy()
+        return np.concatenate((self._data[start:], self._data[: self._end]))
+
 
 class AudioRecorder:
     """
@@ -30,9 +207,10 @@ class AudioRecorder:
         self.gain = gain
 
         self.buffer_size = int(self.rate * self.duration)
-        self.buffer: collections.deque[np.int16] = collections.deque(
-            maxlen=self.buffer_size
-        )
+        self.buffer = RingBuffer(self.buffer_size)
+        # 每个音频块的 (采集完成时的 Unix 时间, 起始样本序号, 结束样本序号)
+        self._blocks: collections.deque[tuple[float, int, int]] = collections.deque()
+        self.generation = 0
 
         self.is_recording = False
         self.is_healthy = False  # 标记录音线程是否正常工作
@@ -75,7 +253,9 @@ class AudioRecorder:
         """
         with self._lock:
             self.buffer_size = int(self.rate * self.duration)
-            self.buffer = collections.deque(maxlen=self.buffer_size)
+            self.buffer = RingBuffer(self.buffer_size)
+            self._blocks.clear()
+            self.generation += 1
 
         stop_event = threading.Event()
         thread = threading.Thread(
@@ -157,9 +337,7 @@ class AudioRecorder:
                                 amplified = data[:, 0] * self.gain * 32767.0
                                 amplified = np.clip(amplified, -32768, 32767)
                                 audio_int16 = amplified.astype(np.int16)
-
-                                with self._lock:
-                                    self.buffer.extend(audio_int16.flatten())
+                                self._write(audio_int16, time.time())
 
                             except Exception as e:
                                 if stop_event.is_set():
@@ -219,41 +397,98 @@ class AudioRecorder:
         else:
             logger.info("录音线程停止")
 
-    def get_audio(self) -> io.BytesIO | None:
+    def _write(self, samples: np.ndarray, captured_at: float) -> None:
+        """写入一个音频块并记录其采集时间，丢弃已被覆盖的块"""
+        with self._lock:
+            start = self.buffer.total
+            self.buffer.extend(samples)
+            self._blocks.append((captured_at, start, self.buffer.total))
+            oldest = self.buffer.total - len(self.buffer)
+            while self._blocks and self._blocks[0][2] <= oldest:
+                self._blocks.popleft()
+
+    def _samples_since(self, since: float) -> int:
+        """
+        计算 Unix 时间 ``since`` 之后采集的样本数。
+
+        在记录的音频块中找到包含该时刻的块，按采样率换算到块内的样本位置。
+        早于缓冲中最旧样本的时刻直接返回全部样本，避免极早的 ``since`` 在换算时
+        溢出。调用方必须持有 ``_lock``。
+        """
+        saved = len(self.buffer)
+        if not self._blocks or since < self._blocks[0][0] - saved / self.rate:
+            return saved if self._blocks else 0
+        total = self.buffer.total
+        for captured_at, start, end in self._blocks:
+            if captured_at <= since:
+                continue
+            # 块内最后一个样本在 captured_at 采集，之前的样本按采样率向前推
+            offset = math.floor(end - 1 - (captured_at - since) * self.rate) + 1
+            return total - max(start, offset)
+        return 0
+
+    def clip(
+        self, seconds: float | None = None, since: float | None = None
+    ) -> AudioClip:
+        """
+        复制最近的样本，只复制请求的时间窗口。
+
+        锁内只做至多两段切片复制，不逐个处理样本。
+
+        Args:
+            seconds: 只返回最近多少秒，为 None 时不限制
+            since: 只返回该 Unix 时间之后采集的样本，为 None 时不限制；
+                同时指定时取两者中较短的窗口
+        """
+        with self._lock:
+            count: int | None = None
+            if seconds is not None:
+                # 先截到缓冲时长，避免极大的秒数换算样本数时溢出
+                count = round(min(seconds, self.duration) * self.rate)
+            if since is not None:
+                after = self._samples_since(since)
+                count = after if count is None else min(count, after)
+            samples = self.buffer.snapshot(count)
+            start = self.buffer.total - len(samples)
+            return AudioClip(samples, start, self.generation)
+
+    def snapshot(
+        self, seconds: float | None = None, since: float | None = None
+    ) -> np.ndarray:
+        """
+        复制最近的样本，参数同 :meth:`clip`。
+
+        Returns:
+            np.ndarray: 按时间顺序排列的连续 int16 数组
+        """
+        return self.clip(seconds, since).samples
+
+    def get_audio(
+        self, seconds: float | None = None, since: float | None = None
+    ) -> io.BytesIO | None:
         """
         获取最近 `duration` 秒的音频数据。
 
+        Args:
+            seconds: 同 :meth:`snapshot`
+            since: 同 :meth:`snapshot`
+
         Returns:
             BytesIO: WAV 格式的音频数据，失败返回 None
         """
-        with self._lock:
-            if not self.buffer:
-                logger.debug("缓冲区为空，返回空WAV")
-                empty_audio = io.BytesIO()
-                empty_audio.name = "audio.wav"  # soundfile 需要通过 name 属性推断格式
-                sf.write(
-                    empty_audio,
-                    np.array([], dtype=np.int16),
-                    self.rate,
-                    subtype="PCM_16",
-                )
-                empty_audio.seek(0)
-                return empty_audio
-
-            current_buffer = list(self.buffer)
-
-        logger.debug(f"当前缓冲区大小: {len(current_buffer)} 样本")
+        audio_data = self.snapshot(seconds, since)
+        if len(audio_data) == 0:
+            logger.debug("缓冲区为空，返回空WAV")
+        else:
+            logger.debug(f"当前缓冲区大小: {len(audio_data)} 样本")
 
         try:
-            audio_data = np.array(current_buffer, dtype=np.int16)
-
             wav_io = io.BytesIO()
             wav_io.name = "audio.wav"  # soundfile 需要通过 name 属性推断格式
             sf.write(wav_io, audio_data, self.rate, subtype="PCM_16")
 
+            logger.debug(f"生成音频文件大小: {wav_io.tell()} 字节")
             wav_io.seek(0)
-            size = len(wav_io.getvalue())
-            logger.debug(f"生成音频文件大小: {size} 字节")
             return wav_io
 
         except Exception as e:
@@ -297,3 +532,8 @@ class AudioRecorder:
 
 
 recorder = AudioRecorder(duration=config.record.duration, gain=config.record.gain)
+
+# 压缩后的录音，键为 (缓冲代数, 首个样本序号, 样本数, 格式, 压缩级别)
+audio_cache: FrameCache[Hashable] = FrameCache(
+    max_bytes=config.record.cache_size_mb * 1024 * 1024
+)
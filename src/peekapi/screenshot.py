@@ -1,27 +1,495 @@
 import io
 import math
+import threading
+import zlib
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, replace
+from typing import Literal, cast
 
-import mss
+from mss.screenshot import ScreenShot
 from PIL import Image, ImageFilter
 
+from .capture import Region, capture_worker
+from .constants import MAX_BLUR_RADIUS
 
-def screenshot(radius: float, main_screen_only: bool) -> bytes:
-    with mss.mss() as sct:
-        if main_screen_only:
-            monitor = sct.monitors[1]
+BlurMode = Literal["gaussian", "fast"]
+ImageFormat = Literal["jpeg", "webp", "png"]
+Subsampling = Literal["444", "422", "420"]
+
+MEDIA_TYPES: dict[ImageFormat, str] = {
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+    "png": "image/png",
+}
+
+# mss 显示器索引
+VIRTUAL_SCREEN = 0  # 全部显示器组成的虚拟屏幕
+PRIMARY_MONITOR = 1  # 主显示器
+PACKED_SCREEN = -1  # 全部显示器紧凑拼接，不含显示器之间的空白区域
+
+FAST_BLUR_SMALL_RADIUS = 2.0  # 快速模糊在缩小图上实际使用的目标半径
+FAST_BLUR_MIN_SIDE = 32  # 缩小图短边下限，过小时边缘误差明显
+
+BUDGET_PROBE_FACTOR = 4  # 字节预算探测图的缩小倍数（每边）
+BUDGET_PROBE_MIN_SIDE = 64  # 探测图短边下限，原图过小时直接用原图探测
+BUDGET_MAX_ENCODES = 3  # 字节预算下完整分辨率编码的最多次数
+BUDGET_MODEL_ENTRIES = 64  # 体积模型按画面缓存的条目数
+
+
+def fast_blur(img: Image.Image, radius: float) -> Image.Image:
+    """
+    缩小-模糊-放大的近似高斯模糊。
+
+    按 ``radius / FAST_BLUR_SMALL_RADIUS`` 的整数倍缩小图像后做小半径高斯模糊，
+    再双线性放大回原尺寸，耗时基本只取决于缩小后的像素数。
+    缩小图短边不低于 ``FAST_BLUR_MIN_SIDE``，避免小图边缘误差放大。
+    缩小（盒式平均）和放大（双线性）本身带来的模糊会从小图半径中扣除，
+    使整体效果接近原半径的高斯模糊。
+
+    Args:
+        img: 原图
+        radius: 等效高斯模糊半径（标准差，像素）
+
+    Returns:
+        与原图尺寸相同的模糊结果
+    """
+    factor = min(
+        int(radius / FAST_BLUR_SMALL_RADIUS),
+        min(img.size) // FAST_BLUR_MIN_SIDE,
+    )
+    if factor < 2:
+        return img.filter(ImageFilter.GaussianBlur(radius=radius))
+
+    small = img.reduce(factor)
+    # 盒式缩小方差约 factor²/12，双线性放大方差约 factor²/6
+    residual = radius**2 - factor**2 * (1 / 12 + 1 / 6)
+    small_radius = math.sqrt(max(residual, 0.25)) / factor
+    small = small.filter(ImageFilter.GaussianBlur(radius=small_radius))
+    return small.resize(
+        img.size,
+        Image.Resampling.BILINEAR,
+        box=(0, 0, img.width / factor, img.height / factor),
+    )
+
+
+@dataclass(frozen=True)
+class OutputSize:
+    """
+    输出尺寸约束，所有约束同时生效且只缩小不放大，保持宽高比。
+
+    Attributes:
+        max_side: 长边上限（像素）
+        width: 宽度上限（像素）
+        height: 高度上限（像素）
+    """
+
+    max_side: int | None = None
+    width: int | None = None
+    height: int | None = None
+
+    def scale_for(self, size: tuple[int, int]) -> float:
+        """计算满足全部约束的缩放比例（不大于 1）"""
+        src_w, src_h = size
+        scale = 1.0
+        if self.max_side is not None:
+            scale = min(scale, self.max_side / max(src_w, src_h))
+        if self.width is not None:
+            scale = min(scale, self.width / src_w)
+        if self.height is not None:
+            scale = min(scale, self.height / src_h)
+        return scale
+
+
+@dataclass(frozen=True)
+class EncodeOptions:
+    """
+    图像编码参数。
+
+    Attributes:
+        format: 输出格式
+        quality: JPEG/WebP 质量（1-100），PNG 无损忽略此项
+        subsampling: JPEG 色度抽样，WebP 有损固定为 4:2:0、PNG 不抽样
+        max_bytes: 输出字节数上限，指定时在不超过 ``quality`` 的范围内选择
+            能满足上限的最高质量；PNG 无损忽略此项
+    """
+
+    format: ImageFormat = "jpeg"
+    quality: int = 95
+    subsampling: Subsampling = "420"
+    max_bytes: int | None = None
+
+    @property
+    def media_type(self) -> str:
+        return MEDIA_TYPES[self.format]
+
+
+def encode_image(img: Image.Image, options: EncodeOptions) -> bytes:
+    """按编码参数把图像编码为字节，指定 ``max_bytes`` 时按字节预算选择质量"""
+    if options.max_bytes is not None and options.format != "png":
+        return encode_within_budget(img, options, options.max_bytes)
+    return _encode(img, options)
+
+
+def _encode(img: Image.Image, options: EncodeOptions) -> bytes:
+    buffer = io.BytesIO()
+    if options.format == "jpeg":
+        subsampling = f"4:{options.subsampling[1]}:{options.subsampling[2]}"
+        img.save(
+            buffer, format="JPEG", quality=options.quality, subsampling=subsampling
+        )
+    elif options.format == "webp":
+        img.save(buffer, format="WEBP", quality=options.quality)
+    else:
+        img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+# 体积模型的画面键：(探测图像素指纹, 原图尺寸, 格式, 色度抽样)
+_ContentKey = tuple[int, tuple[int, int], ImageFormat, Subsampling]
+
+
+class SizeModel:
+    """
+    有损编码体积模型：记录完整分辨率编码与缩小探测图编码在同一质量下的
+    体积比例。
+
+    比例按画面内容缓存，同一画面换一个预算时通常只需一次完整编码；
+    没见过的画面使用同格式最近一次学到的比例作为初始估计。
+    """
+
+    def __init__(self, max_entries: int = BUDGET_MODEL_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._ratios: OrderedDict[_ContentKey, float] = OrderedDict()
+        self._recent: dict[tuple[ImageFormat, Subsampling], float] = {}
+        self._lock = threading.Lock()
+
+    def ratio(self, key: _ContentKey) -> float | None:
+        """获取画面的体积比例，未知时返回同格式最近的比例"""
+        with self._lock:
+            ratio = self._ratios.get(key)
+            if ratio is not None:
+                self._ratios.move_to_end(key)
+                return ratio
+            return self._recent.get((key[2], key[3]))
+
+    def learn(self, key: _ContentKey, ratio: float) -> None:
+        with self._lock:
+            self._ratios[key] = ratio
+            self._ratios.move_to_end(key)
+            self._recent[(key[2], key[3])] = ratio
+            while len(self._ratios) > self.max_entries:
+                self._ratios.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ratios.clear()
+            self._recent.clear()
+
+
+size_model = SizeModel()
+
+
+def encode_within_budget(
+    img: Image.Image, options: EncodeOptions, max_bytes: int
+) -> bytes:
+    """
+    在 ``options.quality`` 以内选择输出不超过 ``max_bytes`` 的最高质量并编码。
+
+    质量搜索在缩小 ``BUDGET_PROBE_FACTOR`` 倍的探测图上进行，探测体积乘以
+    体积模型的比例作为完整编码体积的估计；完整分辨率最多编码
+    ``BUDGET_MAX_ENCODES`` 次，每次编码后用实际体积修正比例。
+
+    Returns:
+        尝试过的满足预算的最高质量编码；最低质量也无法满足时返回尝试过的
+        最小结果
+    """
+    factor = min(BUDGET_PROBE_FACTOR, min(img.size) // BUDGET_PROBE_MIN_SIDE)
+    probe = (
+        downscale(img, (img.width // factor, img.height // factor))
+        if factor >= 2
+        else img
+    )
+    key: _ContentKey = (
+        zlib.crc32(probe.tobytes()),
+        img.size,
+        options.format,
+        options.subsampling,
+    )
+    probe_sizes: dict[int, int] = {}
+
+    def probe_size(quality: int) -> int:
+        if quality not in probe_sizes:
+            probe_sizes[quality] = len(
+                _encode(probe, replace(options, quality=quality))
+            )
+        return probe_sizes[quality]
+
+    ratio = size_model.ratio(key) or (img.width * img.height) / (
+        probe.width * probe.height
+    )
+    low, high = 1, options.quality
+    best: bytes | None = None
+    smallest = b""
+    for _ in range(BUDGET_MAX_ENCODES):
+        if low > high:
+            break
+        # 估计体积随质量单调递增，二分查找估计值不超过预算的最高质量
+        quality = low
+        lo, hi = low, high
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            if probe_size(mid) * ratio <= max_bytes:
+                quality, lo = mid, mid + 1
+            else:
+                hi = mid - 1
+        if best is not None and probe_size(quality) * ratio > max_bytes:
+            # 已有满足预算的结果，估计表明更高质量都会超出
+            break
+
+        data = _encode(img, replace(options, quality=quality))
+        ratio = len(data) / probe_size(quality)
+        size_model.learn(key, ratio)
+        if not smallest or len(data) < len(smallest):
+            smallest = data
+        if len(data) <= max_bytes:
+            best, low = data, quality + 1
         else:
-            monitor = sct.monitors[0]
+            high = quality - 1
+
+    return best or smallest
+
+
+def downscale(img: Image.Image, target: tuple[int, int]) -> Image.Image:
+    """
+    快速缩小到目标尺寸。
+
+    先用 ``Image.reduce`` 按整数倍做盒式缩小，再用双线性插值补足剩余比例，
+    后者只处理已缩小后的像素。
+    """
+    factor = min(img.width // target[0], img.height // target[1])
+    if factor >= 2:
+        img = img.reduce(factor)
+    if img.size != target:
+        img = img.resize(target, Image.Resampling.BILINEAR)
+    return img
+
+
+def frame_to_image(frame: ScreenShot) -> Image.Image:
+    """
+    将 mss 截图转换为 RGB 图像。
+
+    直接把 BGRA 原始缓冲交给 Pillow 的 BGRX raw 解码器，在 C 层一次完成
+    通道重排，不再经过 ``ScreenShot.rgb`` 在 Python 侧生成中间 RGB 副本。
+    """
+    # bytearray 同样支持缓冲协议，Pillow 的类型标注只声明了 bytes
+    raw = cast("bytes", frame.raw)
+    return Image.frombuffer("RGB", frame.size, raw, "raw", "BGRX", 0, 1)
+
+
+def frame_fingerprint(frame: ScreenShot) -> int:
+    """
+    计算截图原始像素的指纹。
+
+    对完整 BGRA 缓冲做 CRC32，任一像素变化都会改变指纹；耗时约为同尺寸
+    JPEG 编码的十分之一，不需要解码或复制像素。
+    """
+    return zlib.crc32(frame.raw, zlib.crc32(repr(frame.size).encode()))
+
+
+# 截图对象：显示器索引，或虚拟桌面上的矩形区域
+ScreenTarget = int | Region
+
+# 截图参数：(模糊半径, 截图对象, 输出尺寸, 编码参数)，用作缓存和请求合并的键
+ScreenKey = tuple[float, ScreenTarget, OutputSize | None, EncodeOptions]
+
+
+def default_monitor(main_screen_only: bool, pack_screens: bool = False) -> int:
+    """按配置选择主显示器、虚拟屏幕或紧凑拼接的全部显示器"""
+    if main_screen_only:
+        return PRIMARY_MONITOR
+    return PACKED_SCREEN if pack_screens else VIRTUAL_SCREEN
+
+
+def pack_layout(
+    monitors: Sequence[Mapping[str, int]],
+) -> tuple[tuple[int, int], list[tuple[int, int]]]:
+    """
+    计算各显示器在拼接画布中的位置。
+
+    在原始布局的包围盒、按从左到右顶端对齐排成一行、按从上到下左端对齐排成
+    一列三种方案中取面积最小者；面积相同时保留原始布局。
+
+    Args:
+        monitors: 各显示器的 left、top、width、height（不含虚拟屏幕）
+
+    Returns:
+        画布尺寸和每个显示器左上角在画布中的坐标（与输入顺序一致）
+    """
+    if not monitors:
+        return (0, 0), []
+
+    left = min(m["left"] for m in monitors)
+    top = min(m["top"] for m in monitors)
+    right = max(m["left"] + m["width"] for m in monitors)
+    bottom = max(m["top"] + m["height"] for m in monitors)
+    candidates = [
+        (
+            (right - left, bottom - top),
+            [(m["left"] - left, m["top"] - top) for m in monitors],
+        )
+    ]
+
+    order = sorted(range(len(monitors)), key=lambda i: (monitors[i]["left"], i))
+    offsets = [(0, 0)] * len(monitors)
+    x = 0
+    for i in order:
+        offsets[i] = (x, 0)
+        x += monitors[i]["width"]
+    candidates.append(((x, max(m["height"] for m in monitors)), offsets))
+
+    order = sorted(range(len(monitors)), key=lambda i: (monitors[i]["top"], i))
+    offsets = [(0, 0)] * len(monitors)
+    y = 0
+    for i in order:
+        offsets[i] = (0, y)
+        y += monitors[i]["height"]
+    candidates.append(((max(m["width"] for m in monitors), y), offsets))
+
+    return min(candidates, key=lambda c: c[0][0] * c[0][1])
+
+
+def capture_packed() -> ScreenShot:
+    """
+    逐个截取显示器并紧凑拼接。
+
+    拼接在 BGRA 原始字节上进行，结果仍是 ``ScreenShot``，后续的指纹、
+    模糊和编码与普通截图完全相同。
+    """
+    monitors = capture_worker.monitors()[1:]
+    size, offsets = pack_layout(monitors)
+    # 按 RGBA 处理 BGRA 字节只是整像素复制，不涉及通道含义
+    canvas = Image.new("RGBA", size)
+    for index, offset in enumerate(offsets, start=PRIMARY_MONITOR):
+        frame = capture_worker.grab(index)
+        raw = cast("bytes", frame.raw)
+        canvas.paste(
+            Image.frombuffer("RGBA", frame.size, raw, "raw", "RGBA", 0, 1), offset
+        )
+    return ScreenShot.from_size(bytearray(canvas.tobytes()), *size)
+
+
+def capture(monitor: ScreenTarget) -> ScreenShot:
+    """
+    截取指定显示器或区域。
+
+    Args:
+        monitor: mss 显示器索引，``VIRTUAL_SCREEN`` 为全部显示器组成的虚拟屏幕，
+            ``PACKED_SCREEN`` 为紧凑拼接的全部显示器；也可以是虚拟桌面坐标下的
+            ``(left, top, width, height)`` 区域，只截取该区域的像素
+
+    Raises:
+        IndexError: 显示器不存在或区域不在桌面范围内
+    """
+    if isinstance(monitor, tuple):
+        return capture_worker.grab_region(monitor)
+    if monitor == PACKED_SCREEN:
+        return capture_packed()
+    return capture_worker.grab(monitor)
+
+
+def quantize_radius(radius: float, step: float) -> float:
+    """
+    把模糊半径向上取整到 ``step`` 的整数倍。
+
+    向上取整保证模糊程度不低于请求值；相近的半径落到同一档位后可以共享缓存
+    和合并请求。半径先截到 ``MAX_BLUR_RADIUS``；``step`` 为 0 或档位数溢出为无穷
+    时不再取整，非正半径统一为 0。
+    """
+    if radius <= 0:
+        return 0.0
+    radius = min(radius, MAX_BLUR_RADIUS)
+    if step <= 0:
+        return radius
+    buckets = radius / step
+    if not math.isfinite(buckets):
+        return radius
+    # 先舍去浮点误差，避免 0.3 / 0.1 之类恰好整除的值多进一档
+    return math.ceil(round(buckets, 9)) * step
+
+
+def blur(
+    img: Image.Image, radius: float, blur_mode: BlurMode = "gaussian"
+) -> Image.Image:
+    """按模糊方式模糊图像，半径非正或非有限时原样返回"""
+    if not math.isfinite(radius) or radius <= 0:
+        return img
+    if blur_mode == "fast":
+        return fast_blur(img, radius)
+    return img.filter(ImageFilter.GaussianBlur(radius=radius))
+
+
+def prepare(
+    frame: ScreenShot,
+    radius: float,
+    blur_mode: BlurMode = "gaussian",
+    size: OutputSize | None = None,
+) -> Image.Image:
+    """
+    将截图转换为 RGB 图像并按需缩小、模糊。
+
+    Args:
+        frame: mss 截图
+        radius: 高斯模糊半径，以原始分辨率像素计；缩小输出时按比例换算，
+            保证模糊效果相对画面内容不变
+        blur_mode: 模糊方式
+        size: 输出尺寸约束，缩小发生在模糊之前
+    """
+    img_pil = frame_to_image(frame)
+
+    if size is not None:
+        scale = size.scale_for(img_pil.size)
+        if scale < 1:
+            target = (
+                max(1, round(img_pil.width * scale)),
+                max(1, round(img_pil.height * scale)),
+            )
+            img_pil = downscale(img_pil, target)
+            radius *= scale
+
+    return blur(img_pil, radius, blur_mode)
+
+
+def render(
+    frame: ScreenShot,
+    radius: float,
+    blur_mode: BlurMode = "gaussian",
+    size: OutputSize | None = None,
+    encoding: EncodeOptions | None = None,
+) -> bytes:
+    """
+    将截图按需缩小、模糊后编码，参数含义见 ``prepare``。
 
-        img = sct.grab(monitor)
+    Args:
+        encoding: 编码参数，默认 JPEG quality 95
 
-    img_pil = Image.frombytes("RGB", img.size, img.rgb)
+    Returns:
+        编码后的图像数据
+    """
+    img_pil = prepare(frame, radius, blur_mode, size)
+    return encode_image(img_pil, encoding or EncodeOptions())
 
-    if math.isfinite(radius) and radius > 0:
-        img_pil = img_pil.filter(ImageFilter.GaussianBlur(radius=radius))
 
-    img_byte = io.BytesIO()
-    img_pil.save(img_byte, format="JPEG", quality=95)
-    return img_byte.getvalue()
+def screenshot(
+    radius: float,
+    main_screen_only: bool,
+    blur_mode: BlurMode = "gaussian",
+    size: OutputSize | None = None,
+    encoding: EncodeOptions | None = None,
+) -> bytes:
+    """截图并渲染，参数含义见 ``capture`` 和 ``render``"""
+    frame = capture(default_monitor(main_screen_only))
+    return render(frame, radius, blur_mode, size, encoding)
 
 
 if __name__ == "__main__":
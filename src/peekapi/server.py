@@ -1,20 +1,66 @@
+import asyncio
 import math
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from threading import Thread
+from typing import TypeVar
 from typing_extensions import TypedDict
 
 import uvicorn
-from fastapi import FastAPI, HTTPException, Query, Request
-from fastapi.responses import PlainTextResponse, Response
+from fastapi import (
+    FastAPI,
+    HTTPException,
+    Query,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+    WebSocketException,
+    status,
+)
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 
 from . import __version__
+from .cache import screen_cache
+from .capture import CaptureStats, Region, capture_worker
 from .config import config
+from .delta import delta_regions, delta_store, render_tiles
 from .foreground import get_foreground_application
+from .history import render_history_frame, screen_history, screen_sampler
 from .idle import get_idle_info
 from .logging import logger, setup_logging
+from .pipeline import StageStats
 from .power_events import register_power_notification
-from .record import recorder
-from .screenshot import screenshot
+from .record import (
+    AUDIO_MEDIA_TYPES,
+    WAV_HEADER_SIZE,
+    AudioClip,
+    AudioFormat,
+    audio_cache,
+    encode_audio,
+    iter_wav,
+    recorder,
+)
+from .screenshot import (
+    MEDIA_TYPES,
+    PACKED_SCREEN,
+    PRIMARY_MONITOR,
+    EncodeOptions,
+    ImageFormat,
+    OutputSize,
+    ScreenKey,
+    ScreenTarget,
+    Subsampling,
+    capture,
+    default_monitor,
+    frame_fingerprint,
+    quantize_radius,
+    render,
+)
+from .singleflight import SingleFlight
+from .stream import Subscription, screen_broadcaster
 from .system_info import get_system_info
 from .system_tray import start_system_tray
 
@@ -23,6 +69,277 @@ class ForegroundResponse(TypedDict):
     application: str | None
 
 
+class MonitorInfo(TypedDict):
+    index: int  # /screen 的 m 参数，0 为全部显示器组成的虚拟屏幕
+    left: int
+    top: int
+    width: int
+    height: int
+    primary: bool
+
+
+class MonitorsResponse(TypedDict):
+    monitors: list[MonitorInfo]
+
+
+class ScreenStatsResponse(TypedDict):
+    capture: CaptureStats
+    stream: list[StageStats]
+    history: list[StageStats]
+
+
+class HistoryEntry(TypedDict):
+    first_seen: float  # 首次截到该画面的 Unix 时间戳
+    last_seen: float  # 最近一次截到该画面的 Unix 时间戳
+    size: int  # 编码后字节数
+
+
+class HistoryIndexResponse(TypedDict):
+    interval: float
+    size_bytes: int
+    max_bytes: int
+    frames: list[HistoryEntry]
+
+
+MAX_OUTPUT_SIDE = 16384  # 输出尺寸参数上限（像素）
+MULTIPART_BOUNDARY = "peekapi-frame"
+F = TypeVar("F", bound=str)
+
+# Accept 中可协商的录音媒体类型
+AUDIO_ACCEPT_TYPES: dict[str, AudioFormat] = {
+    "audio/wav": "wav",
+    "audio/x-wav": "wav",
+    "audio/flac": "flac",
+    "audio/ogg": "ogg",
+    "audio/opus": "opus",
+}
+
+ROI_PATTERN = r"^-?\d+,-?\d+,\d+,\d+$"  # x,y,w,h
+
+
+@dataclass(frozen=True)
+class RenderedScreen:
+    """
+    一次截图的结果。
+
+    Attributes:
+        etag: 画面与渲染参数的实体标签
+        data: 编码后的图像数据；画面未变化且命中 If-None-Match 时为 None
+    """
+
+    etag: str
+    data: bytes | None
+
+
+# 参数相同的并发截图请求共享同一次截图和编码
+screen_flight: SingleFlight[ScreenKey, RenderedScreen] = SingleFlight()
+
+# 同一段录音按相同参数的并发压缩请求共享同一次编码
+AudioKey = tuple[int, int, int, AudioFormat, float]
+audio_flight: SingleFlight[AudioKey, bytes] = SingleFlight()
+
+
+def _screen_etag(fingerprint: int, key: ScreenKey) -> str:
+    """由画面指纹和渲染参数生成强 ETag"""
+    params = zlib.crc32(repr((key, config.screenshot.blur_mode)).encode())
+    return f'"{fingerprint:08x}-{params:08x}"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """判断 If-None-Match 请求头是否包含给定 ETag（弱比较）"""
+    if not if_none_match or not etag:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def _render_screen(key: ScreenKey, if_none_match: str | None) -> RenderedScreen:
+    """
+    截图并计算 ETag，画面变化时才模糊和编码，结果写入缓存。
+
+    ETag 命中 ``if_none_match`` 时不编码直接返回；画面与缓存帧相同时复用
+    缓存中的编码结果。
+    """
+    radius, monitor, size, encoding = key
+    generation = screen_cache.generation
+    captured_at = time.monotonic()
+    frame = capture(monitor)
+    etag = _screen_etag(frame_fingerprint(frame), key)
+    if _etag_matches(if_none_match, etag):
+        return RenderedScreen(etag=etag, data=None)
+
+    cached = screen_cache.get(key, max_age=math.inf)
+    if cached is not None and cached.etag == etag:
+        img_data = cached.data
+    else:
+        img_data = render(frame, radius, config.screenshot.blur_mode, size, encoding)
+    if img_data:
+        screen_cache.put(key, img_data, captured_at, generation, etag)
+    return RenderedScreen(etag=etag, data=img_data)
+
+
+def _authorize_screen(client_ip: str, r: float, k: str, action: str) -> None:
+    """
+    校验屏幕类请求的模糊半径、私密模式和高清图密钥。
+
+    Raises:
+        HTTPException: 半径非法或密钥错误返回 401，私密模式返回 403
+    """
+    # 拒绝 NaN / Inf 等非有限浮点数，防止绕过鉴权和模糊
+    if not math.isfinite(r):
+        logger.info(f"[{client_ip}] {action}被拒绝: 非法半径值 (r={r})")
+        raise HTTPException(status_code=401, detail="模糊半径必须为有限数值")
+
+    if not config.basic.is_public:
+        logger.info(f"[{client_ip}] {action}被拒绝: 私密模式")
+        raise HTTPException(status_code=403, detail="瑟瑟中")
+
+    # 如果配置了 api_key 且不匹配，则拒绝访问
+    if (
+        r < config.screenshot.radius_threshold
+        and config.basic.api_key
+        and k != config.basic.api_key
+    ):
+        logger.info(f"[{client_ip}] {action}被拒绝: 无权限查看高清图 (r={r})")
+        raise HTTPException(status_code=401, detail="没有权限查看高清图")
+
+
+def _output_size(
+    max_side: int | None, w: int | None, h: int | None
+) -> OutputSize | None:
+    """由尺寸参数构造输出尺寸约束，均未指定时返回 None"""
+    if max_side is None and w is None and h is None:
+        return None
+    return OutputSize(max_side=max_side, width=w, height=h)
+
+
+def _parse_roi(roi: str) -> Region:
+    """
+    解析 ``x,y,w,h`` 格式的截图区域。
+
+    Raises:
+        HTTPException: 宽或高为 0 时返回 422
+    """
+    x, y, width, height = (int(part) for part in roi.split(","))
+    if width <= 0 or height <= 0:
+        raise HTTPException(status_code=422, detail="截图区域的宽和高必须为正数")
+    return x, y, width, height
+
+
+def _multipart_part(data: bytes, media_type: str, extra_headers: str = "") -> bytes:
+    """生成一个 multipart 分段（含起始分隔行）"""
+    head = (
+        f"--{MULTIPART_BOUNDARY}\r\n"
+        f"Content-Type: {media_type}\r\n"
+        f"{extra_headers}"
+        f"Content-Length: {len(data)}\r\n\r\n"
+    )
+    return head.encode() + data + b"\r\n"
+
+
+def _screen_part(key: ScreenKey, max_age_ms: int | None) -> bytes | None:
+    """获取单个显示器的截图，优先使用缓存"""
+    if max_age_ms is not None:
+        cached = screen_cache.get(key, max_age_ms / 1000)
+        if cached is not None:
+            return cached.data
+    return screen_flight.do(key, lambda: _render_screen(key, None)).data
+
+
+def _screen_all_monitors(
+    client_ip: str,
+    r: float,
+    size: OutputSize | None,
+    encoding: EncodeOptions,
+    max_age_ms: int | None,
+) -> Response:
+    """
+    逐个显示器截图并在线程池中并行模糊编码，以 multipart/mixed 返回。
+
+    截图在采集线程中依次完成，模糊和编码在 Pillow 中释放 GIL 并行执行，
+    总耗时取决于最大的显示器。
+    """
+    monitor_count = len(capture_worker.monitors()) - 1
+    keys: list[ScreenKey] = [
+        (r, monitor, size, encoding) for monitor in range(1, monitor_count + 1)
+    ]
+    with ThreadPoolExecutor(
+        max_workers=max(1, len(keys)), thread_name_prefix="peekapi-encode"
+    ) as pool:
+        images = list(pool.map(lambda key: _screen_part(key, max_age_ms), keys))
+
+    if not images or not all(images):
+        logger.info(f"[{client_ip}] 截图请求失败")
+        raise HTTPException(status_code=500, detail="截图失败")
+
+    body = b"".join(
+        _multipart_part(
+            data,
+            encoding.media_type,
+            f'Content-Disposition: inline; name="monitor-{key[1]}"; '
+            f'filename="monitor-{key[1]}.{encoding.format}"\r\n',
+        )
+        for key, data in zip(keys, images, strict=True)
+        if data is not None
+    )
+    body += f"--{MULTIPART_BOUNDARY}--\r\n".encode()
+    logger.info(
+        f"[{client_ip}] 截图请求成功 "
+        f"(r={r}, m=all, monitors={len(keys)}, size={len(body)} bytes)"
+    )
+    return Response(
+        content=body,
+        media_type=f"multipart/mixed; boundary={MULTIPART_BOUNDARY}",
+        headers={"Vary": "Accept"},
+    )
+
+
+def _negotiate_image_format(accept: str | None) -> ImageFormat | None:
+    """
+    根据 Accept 请求头选择输出格式。
+
+    只考虑明确列出的 image/jpeg、image/webp、image/png，按 q 值取最高者，
+    q 值相同时按 Accept 中的顺序；通配符或未列出支持的类型时返回 None。
+    """
+    formats: dict[str, ImageFormat] = {
+        media_type: fmt for fmt, media_type in MEDIA_TYPES.items()
+    }
+    return _negotiate_format(accept, formats)
+
+
+def _negotiate_audio_format(accept: str | None) -> AudioFormat | None:
+    """根据 Accept 请求头选择录音格式，规则同 :func:`_negotiate_image_format`"""
+    return _negotiate_format(accept, AUDIO_ACCEPT_TYPES)
+
+
+def _negotiate_format(accept: str | None, formats: dict[str, F]) -> F | None:
+    """在 Accept 中明确列出的媒体类型里按 q 值选择格式"""
+    if not accept:
+        return None
+
+    best: F | None = None
+    best_q = 0.0
+    for item in accept.split(","):
+        media_type, *params = (part.strip() for part in item.split(";"))
+        fmt = formats.get(media_type.lower())
+        if fmt is None:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > best_q:
+            best, best_q = fmt, q
+    return best
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
@@ -33,6 +350,9 @@ async def lifespan(app: FastAPI):
     # 启动录音
     recorder.start_recording()
 
+    # 启动截图历史采样（history_interval 为 0 时不启动）
+    screen_sampler.start()
+
     # 注册电源事件回调（内核级，不依赖窗口消息循环）
     register_power_notification(recorder)
 
@@ -44,6 +364,9 @@ async def lifespan(app: FastAPI):
 
     # 关闭时
     recorder.stop_recording()
+    screen_broadcaster.close_all()
+    screen_sampler.stop()
+    capture_worker.stop()
     logger.info("PeekAPI 已关闭")
 
 
@@ -62,54 +385,526 @@ def screen_route(
         default=config.screenshot.radius_threshold, description="模糊半径"
     ),
     k: str = Query(default="", description="API 密钥"),
+    m: str | None = Query(
+        default=None,
+        pattern=r"^(all|packed|\d+)$",
+        description=(
+            "显示器序号（0 为全部显示器组成的虚拟屏幕）、"
+            "packed（全部显示器紧凑拼接）或 all（各显示器分别返回）"
+        ),
+    ),
+    roi: str | None = Query(
+        default=None,
+        pattern=ROI_PATTERN,
+        description="截图区域 x,y,w,h（虚拟桌面坐标），只截取、模糊和编码该区域",
+    ),
+    max_age_ms: int | None = Query(
+        default=None, ge=0, description="可接受的缓存截图最大时长（毫秒）"
+    ),
+    max_side: int | None = Query(
+        default=None, ge=1, le=MAX_OUTPUT_SIDE, description="输出长边上限（像素）"
+    ),
+    w: int | None = Query(
+        default=None, ge=1, le=MAX_OUTPUT_SIDE, description="输出宽度上限（像素）"
+    ),
+    h: int | None = Query(
+        default=None, ge=1, le=MAX_OUTPUT_SIDE, description="输出高度上限（像素）"
+    ),
+    fmt: ImageFormat | None = Query(
+        default=None, description="输出格式，优先于 Accept 请求头"
+    ),
+    q: int | None = Query(default=None, ge=1, le=100, description="JPEG/WebP 质量"),
+    subsampling: Subsampling | None = Query(default=None, description="JPEG 色度抽样"),
+    max_bytes: int | None = Query(
+        default=None,
+        ge=1,
+        description="输出字节数上限，在 q 以内选择满足上限的最高质量（PNG 忽略）",
+    ),
 ):
     """获取屏幕截图"""
     client_ip = request.client.host if request.client else "unknown"
+    _authorize_screen(client_ip, r, k, "截图请求")
+    r = quantize_radius(r, config.screenshot.radius_step)
+
+    size = _output_size(max_side, w, h)
+    encoding = EncodeOptions(
+        format=fmt
+        or _negotiate_image_format(request.headers.get("accept"))
+        or config.screenshot.format,
+        quality=q if q is not None else config.screenshot.quality,
+        subsampling=subsampling or config.screenshot.subsampling,
+        max_bytes=max_bytes or config.screenshot.max_bytes or None,
+    )
+    if roi is not None and m is not None:
+        raise HTTPException(status_code=422, detail="roi 与 m 不能同时指定")
+    if m == "all":
+        return _screen_all_monitors(client_ip, r, size, encoding, max_age_ms)
+
+    monitor: ScreenTarget
+    if roi is not None:
+        monitor = _parse_roi(roi)
+    elif m is None:
+        monitor = default_monitor(
+            config.screenshot.main_screen_only, config.screenshot.pack_screens
+        )
+    else:
+        monitor = PACKED_SCREEN if m == "packed" else int(m)
+    key = (r, monitor, size, encoding)
+    if_none_match = request.headers.get("if-none-match")
+
+    if max_age_ms is not None:
+        cached = screen_cache.get(key, max_age_ms / 1000)
+        if cached is not None:
+            logger.info(
+                f"[{client_ip}] 截图请求命中缓存 (r={r}, age={cached.age * 1000:.0f}ms)"
+            )
+            headers = {"Vary": "Accept", "ETag": cached.etag}
+            if _etag_matches(if_none_match, cached.etag):
+                return Response(status_code=304, headers=headers)
+            return Response(
+                content=cached.data, media_type=encoding.media_type, headers=headers
+            )
+
+    try:
+        result = screen_flight.do(key, lambda: _render_screen(key, if_none_match))
+        if result.data is None and not _etag_matches(if_none_match, result.etag):
+            # 合并到的请求因其 If-None-Match 命中而跳过了编码，重新截图
+            result = screen_flight.do(key, lambda: _render_screen(key, None))
+    except IndexError:
+        if roi is not None:
+            logger.info(f"[{client_ip}] 截图请求失败: 区域不在桌面范围内 (roi={roi})")
+            raise HTTPException(
+                status_code=404, detail="截图区域不在桌面范围内"
+            ) from None
+        logger.info(f"[{client_ip}] 截图请求失败: 显示器不存在 (m={m})")
+        raise HTTPException(status_code=404, detail="显示器不存在") from None
+
+    headers = {"Vary": "Accept", "ETag": result.etag}
+    if _etag_matches(if_none_match, result.etag):
+        logger.info(f"[{client_ip}] 截图请求画面未变化 (r={r})")
+        return Response(status_code=304, headers=headers)
+
+    if not result.data:
+        logger.info(f"[{client_ip}] 截图请求失败")
+        raise HTTPException(status_code=500, detail="截图失败")
+
+    logger.info(
+        f"[{client_ip}] 截图请求成功 "
+        f"(r={r}, fmt={encoding.format}, size={len(result.data)} bytes)"
+    )
+    return Response(
+        content=result.data, media_type=encoding.media_type, headers=headers
+    )
+
+
+async def _mjpeg_frames(subscription: Subscription):
+    """按 multipart/x-mixed-replace 格式输出推流帧，订阅关闭时结束"""
+    try:
+        while True:
+            frame = await subscription.next_frame()
+            if frame is None or not config.basic.is_public:
+                break
+            yield _multipart_part(frame, "image/jpeg")
+    finally:
+        screen_broadcaster.unsubscribe(subscription)
 
-    # 拒绝 NaN / Inf 等非有限浮点数，防止绕过鉴权和模糊
-    if not math.isfinite(r):
-        logger.info(f"[{client_ip}] 截图请求被拒绝: 非法半径值 (r={r})")
-        raise HTTPException(status_code=401, detail="模糊半径必须为有限数值")
+
+@app.get("/screen/stream")
+async def screen_stream_route(
+    request: Request,
+    r: float = Query(
+        default=config.screenshot.radius_threshold, description="模糊半径"
+    ),
+    k: str = Query(default="", description="API 密钥"),
+    max_side: int | None = Query(
+        default=None, ge=1, le=MAX_OUTPUT_SIDE, description="输出长边上限（像素）"
+    ),
+    w: int | None = Query(
+        default=None, ge=1, le=MAX_OUTPUT_SIDE, description="输出宽度上限（像素）"
+    ),
+    h: int | None = Query(
+        default=None, ge=1, le=MAX_OUTPUT_SIDE, description="输出高度上限（像素）"
+    ),
+    q: int | None = Query(default=None, ge=1, le=100, description="JPEG 质量"),
+    subsampling: Subsampling | None = Query(default=None, description="JPEG 色度抽样"),
+):
+    """MJPEG 屏幕实时推流"""
+    client_ip = request.client.host if request.client else "unknown"
+    _authorize_screen(client_ip, r, k, "推流请求")
+    r = quantize_radius(r, config.screenshot.radius_step)
+
+    encoding = EncodeOptions(
+        format="jpeg",
+        quality=q if q is not None else config.screenshot.quality,
+        subsampling=subsampling or config.screenshot.subsampling,
+    )
+    key = (
+        r,
+        default_monitor(
+            config.screenshot.main_screen_only, config.screenshot.pack_screens
+        ),
+        _output_size(max_side, w, h),
+        encoding,
+    )
+    subscription = screen_broadcaster.subscribe(key)
+    logger.info(
+        f"[{client_ip}] 推流请求成功 (r={r}, viewers={screen_broadcaster.viewers})"
+    )
+    return StreamingResponse(
+        _mjpeg_frames(subscription),
+        media_type=f"multipart/x-mixed-replace; boundary={MULTIPART_BOUNDARY}",
+        headers={"Cache-Control": "no-store"},
+    )
+
+
+@app.websocket("/screen/ws")
+async def screen_ws_route(
+    websocket: WebSocket,
+    r: float = Query(
+        default=config.screenshot.radius_threshold, description="模糊半径"
+    ),
+    k: str = Query(default="", description="API 密钥"),
+    max_side: int | None = Query(
+        default=None, ge=1, le=MAX_OUTPUT_SIDE, description="输出长边上限（像素）"
+    ),
+    w: int | None = Query(
+        default=None, ge=1, le=MAX_OUTPUT_SIDE, description="输出宽度上限（像素）"
+    ),
+    h: int | None = Query(
+        default=None, ge=1, le=MAX_OUTPUT_SIDE, description="输出高度上限（像素）"
+    ),
+    fmt: ImageFormat | None = Query(default=None, description="输出格式"),
+    q: int | None = Query(default=None, ge=1, le=100, description="JPEG/WebP 质量"),
+    subsampling: Subsampling | None = Query(default=None, description="JPEG 色度抽样"),
+    fps: float | None = Query(
+        default=None, gt=0, description="最高帧率，不超过 stream_max_fps"
+    ),
+):
+    """
+    画面变化时通过 WebSocket 推送新帧。
+
+    每条二进制消息是一帧完整的编码图像，画面不变时不发送。所有连接共享
+    ``/screen/stream`` 的采集循环，客户端接收过慢时跳过中间帧。
+    """
+    client_ip = websocket.client.host if websocket.client else "unknown"
+    try:
+        _authorize_screen(client_ip, r, k, "WebSocket 推流请求")
+    except HTTPException as e:
+        raise WebSocketException(
+            code=status.WS_1008_POLICY_VIOLATION, reason=str(e.detail)
+        ) from None
+    r = quantize_radius(r, config.screenshot.radius_step)
+
+    encoding = EncodeOptions(
+        format=fmt or config.screenshot.format,
+        quality=q if q is not None else config.screenshot.quality,
+        subsampling=subsampling or config.screenshot.subsampling,
+    )
+    key = (
+        r,
+        default_monitor(
+            config.screenshot.main_screen_only, config.screenshot.pack_screens
+        ),
+        _output_size(max_side, w, h),
+        encoding,
+    )
+    await websocket.accept()
+    subscription = screen_broadcaster.subscribe(key, on_change=True, max_fps=fps)
+    logger.info(
+        f"[{client_ip}] WebSocket 推流请求成功 "
+        f"(r={r}, fps={fps}, viewers={screen_broadcaster.viewers})"
+    )
+    # 客户端发来的消息被忽略，接收任务只用于及时发现断开
+    receiver = asyncio.create_task(websocket.receive())
+    next_frame = asyncio.create_task(subscription.next_frame())
+    try:
+        while True:
+            await asyncio.wait(
+                {next_frame, receiver}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if receiver.done():
+                if receiver.result()["type"] == "websocket.disconnect":
+                    return
+                receiver = asyncio.create_task(websocket.receive())
+                continue
+            frame = next_frame.result()
+            next_frame = asyncio.create_task(subscription.next_frame())
+            if frame is None or not config.basic.is_public:
+                await websocket.close()
+                return
+            await websocket.send_bytes(frame)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        next_frame.cancel()
+        screen_broadcaster.unsubscribe(subscription)
+        logger.info(f"[{client_ip}] WebSocket 推流结束")
+
+
+@app.get("/screen/delta")
+def screen_delta_route(
+    request: Request,
+    since: int | None = Query(
+        default=None, ge=0, description="客户端已持有的帧号，未指定时返回完整画面"
+    ),
+    r: float = Query(
+        default=config.screenshot.radius_threshold, description="模糊半径"
+    ),
+    k: str = Query(default="", description="API 密钥"),
+    m: str | None = Query(
+        default=None,
+        pattern=r"^(packed|\d+)$",
+        description="显示器序号（0 为全部显示器组成的虚拟屏幕）或 packed",
+    ),
+    fmt: ImageFormat | None = Query(default=None, description="图块输出格式"),
+    q: int | None = Query(default=None, ge=1, le=100, description="JPEG/WebP 质量"),
+    subsampling: Subsampling | None = Query(default=None, description="JPEG 色度抽样"),
+):
+    """
+    获取相对客户端已持有帧的增量截图。
+
+    只返回变化的区域，每个区域单独编码并在 ``X-Tile`` 头中给出坐标；
+    ``since`` 未知、已淘汰或显示器尺寸变化时返回覆盖整个画面的单个区域。
+    """
+    client_ip = request.client.host if request.client else "unknown"
+    _authorize_screen(client_ip, r, k, "增量截图请求")
+    r = quantize_radius(r, config.screenshot.radius_step)
+
+    encoding = EncodeOptions(
+        format=fmt or config.screenshot.format,
+        quality=q if q is not None else config.screenshot.quality,
+        subsampling=subsampling or config.screenshot.subsampling,
+    )
+    if m is None:
+        monitor = default_monitor(
+            config.screenshot.main_screen_only, config.screenshot.pack_screens
+        )
+    else:
+        monitor = PACKED_SCREEN if m == "packed" else int(m)
+
+    generation = delta_store.generation
+    try:
+        frame = capture(monitor)
+    except IndexError:
+        logger.info(f"[{client_ip}] 增量截图请求失败: 显示器不存在 (m={m})")
+        raise HTTPException(status_code=404, detail="显示器不存在") from None
+    fingerprint = frame_fingerprint(frame)
+    base = delta_store.get(since) if since is not None else None
+    current = delta_store.add(monitor, frame, fingerprint, generation)
+
+    width, height = frame.size
+    headers = {
+        "X-Frame-Id": str(current.frame_id),
+        "X-Frame-Size": f"{width}x{height}",
+        "Cache-Control": "no-store",
+    }
+    if base is not None and base.target == monitor and base.frame.size == frame.size:
+        if base.fingerprint == fingerprint:
+            return Response(status_code=304, headers=headers)
+        regions = delta_regions(base.frame, frame, r, config.screenshot.blur_mode)
+        headers["X-Delta-Base"] = str(base.frame_id)
+    else:
+        regions = [(0, 0, width, height)]
+
+    tiles = render_tiles(frame, regions, r, config.screenshot.blur_mode, encoding)
+    body = b"".join(
+        _multipart_part(
+            tile.data,
+            encoding.media_type,
+            "X-Tile: {},{},{},{}\r\n".format(*tile.region),
+        )
+        for tile in tiles
+    )
+    body += f"--{MULTIPART_BOUNDARY}--\r\n".encode()
+    logger.info(
+        f"[{client_ip}] 增量截图请求成功 (r={r}, since={since}, "
+        f"frame={current.frame_id}, tiles={len(tiles)}, size={len(body)} bytes)"
+    )
+    return Response(
+        content=body,
+        media_type=f"multipart/mixed; boundary={MULTIPART_BOUNDARY}",
+        headers=headers,
+    )
+
+
+@app.get("/screen/monitors")
+def screen_monitors_route(request: Request) -> MonitorsResponse:
+    """获取显示器布局"""
+    client_ip = request.client.host if request.client else "unknown"
 
     if not config.basic.is_public:
-        logger.info(f"[{client_ip}] 截图请求被拒绝: 私密模式")
+        logger.info(f"[{client_ip}] 显示器布局请求被拒绝: 私密模式")
         raise HTTPException(status_code=403, detail="瑟瑟中")
 
-    # 如果配置了 api_key 且不匹配，则拒绝访问
-    if (
-        r < config.screenshot.radius_threshold
-        and config.basic.api_key
-        and k != config.basic.api_key
-    ):
-        logger.info(f"[{client_ip}] 截图请求被拒绝: 无权限查看高清图 (r={r})")
-        raise HTTPException(status_code=401, detail="没有权限查看高清图")
+    monitors: list[MonitorInfo] = [
+        {
+            "index": index,
+            "left": monitor["left"],
+            "top": monitor["top"],
+            "width": monitor["width"],
+            "height": monitor["height"],
+            "primary": index == PRIMARY_MONITOR,
+        }
+        for index, monitor in enumerate(capture_worker.monitors())
+    ]
+    logger.info(f"[{client_ip}] 显示器布局请求成功 (monitors={len(monitors) - 1})")
+    return {"monitors": monitors}
+
+
+@app.get("/screen/stats")
+def screen_stats_route(request: Request) -> ScreenStatsResponse:
+    """获取截图采集和推流流水线的耗时统计"""
+    client_ip = request.client.host if request.client else "unknown"
 
-    img_data = screenshot(r, config.screenshot.main_screen_only)
-    if not img_data:
-        logger.info(f"[{client_ip}] 截图请求失败")
-        raise HTTPException(status_code=500, detail="截图失败")
+    if not config.basic.is_public:
+        logger.info(f"[{client_ip}] 截图统计请求被拒绝: 私密模式")
+        raise HTTPException(status_code=403, detail="瑟瑟中")
 
-    logger.info(f"[{client_ip}] 截图请求成功 (r={r}, size={len(img_data)} bytes)")
-    return Response(content=img_data, media_type="image/jpeg")
+    logger.info(f"[{client_ip}] 截图统计请求成功")
+    return {
+        "capture": capture_worker.stats(),
+        "stream": screen_broadcaster.stats(),
+        "history": screen_sampler.stats(),
+    }
+
+
+@app.get("/screen/history")
+def screen_history_route(
+    request: Request,
+    t: float = Query(description="Unix 时间戳（秒）"),
+    r: float = Query(
+        default=config.screenshot.radius_threshold, description="模糊半径"
+    ),
+    k: str = Query(default="", description="API 密钥"),
+):
+    """获取指定时刻的历史截图"""
+    client_ip = request.client.host if request.client else "unknown"
+    _authorize_screen(client_ip, r, k, "历史截图请求")
+    r = quantize_radius(r, config.screenshot.radius_step)
+
+    frame = screen_history.at(t)
+    if frame is None:
+        logger.info(f"[{client_ip}] 历史截图请求失败: 没有该时刻的截图 (t={t})")
+        raise HTTPException(status_code=404, detail="没有该时刻的截图")
+
+    img_data = render_history_frame(frame, r, config.screenshot.blur_mode)
+    logger.info(
+        f"[{client_ip}] 历史截图请求成功 "
+        f"(t={t}, r={r}, age={time.time() - frame.first_seen:.1f}s)"
+    )
+    return Response(
+        content=img_data,
+        media_type=frame.encoding.media_type,
+        headers={
+            "X-Frame-First-Seen": f"{frame.first_seen:.3f}",
+            "X-Frame-Last-Seen": f"{frame.last_seen:.3f}",
+        },
+    )
+
+
+@app.get("/screen/history/index")
+def screen_history_index_route(request: Request) -> HistoryIndexResponse:
+    """获取截图历史索引"""
+    client_ip = request.client.host if request.client else "unknown"
+
+    if not config.basic.is_public:
+        logger.info(f"[{client_ip}] 历史索引请求被拒绝: 私密模式")
+        raise HTTPException(status_code=403, detail="瑟瑟中")
+
+    frames: list[HistoryEntry] = [
+        {
+            "first_seen": round(frame.first_seen, 3),
+            "last_seen": round(frame.last_seen, 3),
+            "size": len(frame.data),
+        }
+        for frame in screen_history.frames()
+    ]
+    logger.info(f"[{client_ip}] 历史索引请求成功 (frames={len(frames)})")
+    return {
+        "interval": screen_sampler.interval,
+        "size_bytes": screen_history.size_bytes,
+        "max_bytes": screen_history.max_bytes,
+        "frames": frames,
+    }
 
 
 @app.get("/record")
-def record_route(request: Request):
-    """获取录音数据"""
+def record_route(
+    request: Request,
+    seconds: float | None = Query(
+        default=None, gt=0, allow_inf_nan=False, description="只返回最近多少秒"
+    ),
+    since: float | None = Query(
+        default=None,
+        allow_inf_nan=False,
+        description="只返回该 Unix 时间戳（秒）之后采集的录音",
+    ),
+    fmt: AudioFormat | None = Query(
+        default=None, description="输出格式，优先于 Accept 请求头"
+    ),
+):
+    """
+    获取录音数据。
+
+    WAV 直接从录音快照流式输出；FLAC/Ogg/Opus 在线程池中编码，结果按录音
+    片段缓存，重复拉取同一片段时不再编码。
+    """
     client_ip = request.client.host if request.client else "unknown"
 
     if not config.basic.is_public:
         logger.info(f"[{client_ip}] 录音请求被拒绝: 私密模式")
         raise HTTPException(status_code=403, detail="瑟瑟中")
 
-    audio_data = recorder.get_audio()
-    if audio_data is None:
-        logger.info(f"[{client_ip}] 录音请求失败")
-        raise HTTPException(status_code=500, detail="录音获取失败")
+    audio_format = (
+        fmt
+        or _negotiate_audio_format(request.headers.get("accept"))
+        or config.record.format
+    )
+    clip = recorder.clip(seconds, since)
+    samples = clip.samples
+    headers = {"Vary": "Accept"}
+    # 空窗口无法生成有效的压缩流，与 encode_audio 一致返回空 WAV
+    if audio_format == "wav" or len(samples) == 0:
+        logger.info(
+            f"[{client_ip}] 录音请求成功 "
+            f"(seconds={seconds}, since={since}, samples={len(samples)})"
+        )
+        headers["Content-Length"] = str(WAV_HEADER_SIZE + samples.nbytes)
+        return StreamingResponse(
+            iter_wav(samples, recorder.rate), media_type="audio/wav", headers=headers
+        )
+
+    data = _encode_clip(clip, audio_format, config.record.compression_level)
+    logger.info(
+        f"[{client_ip}] 录音请求成功 (seconds={seconds}, since={since}, "
+        f"samples={len(samples)}, fmt={audio_format}, size={len(data)} bytes)"
+    )
+    return Response(
+        content=data, media_type=AUDIO_MEDIA_TYPES[audio_format], headers=headers
+    )
+
+
+def _encode_clip(clip: AudioClip, fmt: AudioFormat, compression_level: float) -> bytes:
+    """压缩一段录音，同一代缓冲中的同一段录音只编码一次"""
+    key: AudioKey = (
+        clip.generation,
+        clip.start,
+        len(clip.samples),
+        fmt,
+        compression_level,
+    )
+    cached = audio_cache.get(key, math.inf)
+    if cached is not None:
+        return cached.data
+
+    def encode() -> bytes:
+        generation = audio_cache.generation
+        data = encode_audio(clip.samples, recorder.rate, fmt, compression_level)
+        audio_cache.put(key, data, time.monotonic(), generation)
+        return data
 
-    audio_bytes = audio_data.read()
-    logger.info(f"[{client_ip}] 录音请求成功")
-    return Response(content=audio_bytes, media_type="audio/wav")
+    return audio_flight.do(key, encode)
 
 
 @app.get("/idle")
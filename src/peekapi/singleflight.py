@@ -0,0 +1,80 @@
+"""并发请求合并模块
+
+相同键的并发调用只执行一次，其余调用方等待并共享同一结果。
+"""
+
+import threading
+from collections.abc import Callable, Hashable
+from concurrent.futures import Future
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class _Call(Generic[V]):
+    """一次正在执行的调用"""
+
+    def __init__(self) -> None:
+        self.future: Future[V] = Future()
+        self.waiters = 0  # 合并到本次调用的等待者数量
+
+
+class SingleFlight(Generic[K, V]):
+    """
+    单飞（single-flight）调用合并器。
+
+    同一时刻每个键最多只有一个调用在执行；执行期间到达的相同键调用
+    不会重复执行，而是等待首个调用完成后拿到相同的返回值或异常。
+    调用结束后键即被释放，之后的调用会重新执行。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[K, _Call[V]] = {}
+
+    def do(self, key: K, fn: Callable[[], V]) -> V:
+        """
+        执行或加入键为 ``key`` 的调用。
+
+        Args:
+            key: 调用键，参数相同的请求应产生相同的键
+            fn: 实际执行的函数，仅由首个调用方执行
+
+        Returns:
+            fn 的返回值（所有合并的调用方共享同一对象）
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        future = call.future
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self) -> int:
+        """当前正在执行的调用数量"""
+        with self._lock:
+            return len(self._calls)
+
+    def waiters(self, key: K) -> int:
+        """键为 ``key`` 的调用上正在等待的调用方数量"""
+        with self._lock:
+            call = self._calls.get(key)
+            return call.waiters if call is not None else 0
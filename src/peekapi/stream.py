@@ -0,0 +1,279 @@
+"""屏幕实时推流模块
+
+所有观看者共享同一个采集循环：每个周期只截图一次，再按观看者的渲染参数
+各编码一次后推送给订阅者。截图、模糊、编码分属流水线的三个阶段，下一帧的
+截图与当前帧的模糊编码重叠进行。订阅者只保留最新一帧，处理慢的观看者直接
+跳过中间帧而不会积压内存。最后一个观看者离开后采集循环退出。
+
+“仅变化时推送”的订阅者只在画面指纹变化时收到新帧；同一渲染参数的订阅者
+都已收到当前画面时，该组不再模糊和编码。
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import defaultdict
+
+from mss.screenshot import ScreenShot
+from PIL import Image
+
+from .config import config
+from .logging import logger
+from .pipeline import Pipeline, StageStats
+from .privacy import register_purge_callback
+from .screenshot import (
+    EncodeOptions,
+    ScreenKey,
+    ScreenTarget,
+    capture,
+    encode_image,
+    frame_fingerprint,
+    prepare,
+)
+
+
+class Subscription:
+    """
+    一个观看者的订阅。
+
+    帧由采集线程推送、在事件循环中消费；只保留尚未取走的最新一帧。
+
+    Attributes:
+        key: 渲染参数
+        on_change: 为 True 时只推送画面指纹与上一次推送不同的帧
+        max_fps: 该观看者的最高帧率，取帧过快时等待并只取最新一帧
+        closed: 订阅是否已被关闭（如切换到私密模式）
+        fingerprint: 最近一次推送的画面指纹，只在采集流水线中读写
+    """
+
+    def __init__(
+        self,
+        key: ScreenKey,
+        loop: asyncio.AbstractEventLoop,
+        on_change: bool = False,
+        max_fps: float | None = None,
+    ) -> None:
+        self.key = key
+        self.on_change = on_change
+        self.max_fps = max_fps
+        self.closed = False
+        self.fingerprint: int | None = None
+        self._loop = loop
+        self._event = asyncio.Event()
+        self._frame: bytes | None = None
+        self._last_delivered = -math.inf
+
+    async def next_frame(self) -> bytes | None:
+        """等待下一帧，订阅被关闭时返回 None"""
+        await self._event.wait()
+        if self.max_fps is not None:
+            # 等待期间到达的新帧覆盖旧帧，慢速观看者只拿到最新画面
+            delay = self._last_delivered + 1 / self.max_fps - self._loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        self._event.clear()
+        if self.closed:
+            return None
+        frame, self._frame = self._frame, None
+        self._last_delivered = self._loop.time()
+        return frame
+
+    def publish(self, frame: bytes, fingerprint: int | None = None) -> None:
+        """
+        线程安全地推送新帧，覆盖尚未取走的旧帧。
+
+        Args:
+            fingerprint: 画面指纹；``on_change`` 的订阅在指纹与上一次相同时
+                忽略本帧
+        """
+        if self.on_change and fingerprint is not None:
+            if fingerprint == self.fingerprint:
+                return
+            self.fingerprint = fingerprint
+        self._call_soon(self._set_frame, frame)
+
+    def is_current(self, fingerprint: int | None) -> bool:
+        """是否为仅变化时推送的订阅且已收到该画面"""
+        return (
+            self.on_change
+            and fingerprint is not None
+            and (fingerprint == self.fingerprint)
+        )
+
+    def close(self) -> None:
+        """线程安全地关闭订阅，唤醒等待中的 ``next_frame``"""
+        self._call_soon(self._set_closed)
+
+    def _call_soon(self, callback, *args) -> None:
+        try:
+            self._loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            # 事件循环已关闭，观看者已不存在
+            pass
+
+    def _set_frame(self, frame: bytes) -> None:
+        if not self.closed:
+            self._frame = frame
+            self._event.set()
+
+    def _set_closed(self) -> None:
+        self.closed = True
+        self._frame = None
+        self._event.set()
+
+
+# 一个周期内的订阅分组：渲染参数 -> 订阅者
+Groups = dict[ScreenKey, list[Subscription]]
+
+# 截图阶段的输出：(订阅分组, 截图, 画面指纹)；没有仅变化时推送的订阅者时不计算指纹
+Captured = tuple[Groups, dict[ScreenTarget, ScreenShot], dict[ScreenTarget, int]]
+
+# 模糊阶段的输出：(图像, 编码参数, 订阅者, 画面指纹)
+Prepared = list[tuple[Image.Image, EncodeOptions, list[Subscription], int | None]]
+
+
+class ScreenBroadcaster:
+    """
+    共享采集循环的屏幕推流器。
+
+    采集循环按帧率把当前订阅分组提交给流水线，流水线依次完成截图、模糊和
+    编码推送；流水线队列已满时提交阻塞，帧率自动降到最慢阶段的速度。
+
+    Attributes:
+        max_fps: 采集循环的最高帧率
+    """
+
+    def __init__(self, max_fps: float) -> None:
+        self.max_fps = max_fps
+        self._subscribers: set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._pipeline = Pipeline(
+            "peekapi-stream",
+            [
+                ("capture", self._capture),
+                ("blur", self._blur),
+                ("encode", self._encode),
+            ],
+        )
+
+    @property
+    def viewers(self) -> int:
+        """当前观看者数量"""
+        with self._lock:
+            return len(self._subscribers)
+
+    @property
+    def is_running(self) -> bool:
+        """采集循环是否在运行"""
+        with self._lock:
+            return self._thread is not None
+
+    def stats(self) -> list[StageStats]:
+        """获取流水线各阶段的队列深度和耗时统计"""
+        return self._pipeline.stats()
+
+    def subscribe(
+        self, key: ScreenKey, on_change: bool = False, max_fps: float | None = None
+    ) -> Subscription:
+        """
+        在当前事件循环中订阅推流，必要时启动采集循环。
+
+        Args:
+            key: 渲染参数，参数相同的观看者共享同一次编码
+            on_change: 只在画面变化时推送
+            max_fps: 该观看者的最高帧率，不超过采集循环的 ``max_fps``
+        """
+        subscription = Subscription(
+            key, asyncio.get_running_loop(), on_change=on_change, max_fps=max_fps
+        )
+        with self._lock:
+            self._subscribers.add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="peekapi-stream", daemon=True
+                )
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """取消订阅；最后一个观看者离开后采集循环在下个周期退出"""
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def close_all(self) -> None:
+        """关闭全部订阅，用于切换私密模式、休眠和服务关闭"""
+        with self._lock:
+            subscriptions = list(self._subscribers)
+            self._subscribers.clear()
+        for subscription in subscriptions:
+            subscription.close()
+        if subscriptions:
+            logger.info(f"已关闭 {len(subscriptions)} 个屏幕推流")
+
+    def _run(self) -> None:
+        """采集循环：启动流水线并按帧率提交，没有观看者时停止"""
+        logger.info("屏幕推流采集循环已启动")
+        while True:
+            self._pipeline.start()
+            self._pump()
+            self._pipeline.stop()
+            with self._lock:
+                # 停止流水线期间可能有新的观看者加入
+                if not self._subscribers:
+                    self._thread = None
+                    break
+        logger.info("屏幕推流采集循环已停止")
+
+    def _pump(self) -> None:
+        while True:
+            started = time.monotonic()
+            with self._lock:
+                if not self._subscribers:
+                    return
+                groups: defaultdict[ScreenKey, list[Subscription]] = defaultdict(list)
+                for subscription in self._subscribers:
+                    groups[subscription.key].append(subscription)
+
+            if not config.basic.is_public:
+                self.close_all()
+                continue
+
+            self._pipeline.put(dict(groups))
+            elapsed = time.monotonic() - started
+            time.sleep(max(0.0, 1 / self.max_fps - elapsed))
+
+    def _capture(self, groups: Groups) -> Captured:
+        """截图阶段：每个显示器或区域只截一次，有需要时计算画面指纹"""
+        frames: dict[ScreenTarget, ScreenShot] = {}
+        fingerprints: dict[ScreenTarget, int] = {}
+        for (_, monitor, _, _), subscriptions in groups.items():
+            if monitor not in frames:
+                frames[monitor] = capture(monitor)
+            if monitor not in fingerprints and any(s.on_change for s in subscriptions):
+                fingerprints[monitor] = frame_fingerprint(frames[monitor])
+        return groups, frames, fingerprints
+
+    def _blur(self, item: Captured) -> Prepared:
+        """模糊阶段：按渲染参数缩小和模糊，跳过所有订阅者都已收到当前画面的组"""
+        groups, frames, fingerprints = item
+        prepared: Prepared = []
+        for (radius, monitor, size, encoding), subscriptions in groups.items():
+            fingerprint = fingerprints.get(monitor)
+            if all(s.is_current(fingerprint) for s in subscriptions):
+                continue
+            img = prepare(frames[monitor], radius, config.screenshot.blur_mode, size)
+            prepared.append((img, encoding, subscriptions, fingerprint))
+        return prepared
+
+    def _encode(self, items: Prepared) -> None:
+        """编码阶段：编码并推送给订阅者"""
+        for img, encoding, subscriptions, fingerprint in items:
+            data = encode_image(img, encoding)
+            for subscription in subscriptions:
+                subscription.publish(data, fingerprint)
+
+
+screen_broadcaster = ScreenBroadcaster(max_fps=config.screenshot.stream_max_fps)
+register_purge_callback(screen_broadcaster.close_all)
@@ -16,6 +16,7 @@ from .config import config
 from .constants import ICON_PATH, LOG_DIR
 from .logging import logger
 from .power_events import setup_power_event_handler
+from .privacy import purge_screen_data
 from .record import recorder
 
 
@@ -41,6 +42,7 @@ def set_private(_icon, _item):
     if config.basic.is_public:
         config.basic.is_public = False
         logger.info("模式已切换: 私密")
+        purge_screen_data("切换到私密模式")
 
 
 def restart_recording(_icon, _item):
@@ -0,0 +1,121 @@
+"""采集后端测试"""
+
+from unittest.mock import patch
+
+import pytest
+
+
+class TestParseGeometry:
+    """parse_geometry 测试"""
+
+    def test_size_only(self):
+        from peekapi.backend import parse_geometry
+
+        assert parse_geometry("1920x1080") == (0, 0, 1920, 1080)
+
+    def test_with_offsets(self):
+        from peekapi.backend import parse_geometry
+
+        assert parse_geometry("1280x1024+1920-200") == (1920, -200, 1280, 1024)
+
+    @pytest.mark.parametrize("spec", ["", "1920", "1920x", "0x1080", "1920x1080+5"])
+    def test_invalid(self, spec):
+        from peekapi.backend import parse_geometry
+
+        with pytest.raises(ValueError, match="显示器"):
+            parse_geometry(spec)
+
+
+class TestSyntheticBackend:
+    """SyntheticBackend 测试"""
+
+    LAYOUT = ((0, 0, 320, 200), (320, -40, 160, 120))
+
+    def test_monitors_include_bounding_box(self):
+        """验证显示器列表与 mss 一致，索引 0 为虚拟屏幕"""
+        from peekapi.backend import SyntheticBackend
+
+        backend = SyntheticBackend(self.LAYOUT)
+        assert backend.monitors == [
+            {"left": 0, "top": -40, "width": 480, "height": 240},
+            {"left": 0, "top": 0, "width": 320, "height": 200},
+            {"left": 320, "top": -40, "width": 160, "height": 120},
+        ]
+
+    def test_grab_returns_region(self):
+        """验证截图尺寸与请求区域一致，像素为 BGRA"""
+        from peekapi.backend import SyntheticBackend
+
+        backend = SyntheticBackend(self.LAYOUT)
+        for monitor in backend.monitors:
+            shot = backend.grab(monitor)
+            assert shot.size == (monitor["width"], monitor["height"])
+            assert len(shot.raw) == monitor["width"] * monitor["height"] * 4
+        assert backend.grabs == 3
+
+    def test_same_seed_is_deterministic(self):
+        """验证相同种子生成相同画面，不同种子画面不同"""
+        from peekapi.backend import SyntheticBackend
+
+        monitor = {"left": 0, "top": 0, "width": 320, "height": 200}
+        first = SyntheticBackend(self.LAYOUT, seed=1).grab(monitor).raw
+        second = SyntheticBackend(self.LAYOUT, seed=1).grab(monitor).raw
+        other = SyntheticBackend(self.LAYOUT, seed=2).grab(monitor).raw
+        assert first == second
+        assert first != other
+
+    def test_animate_changes_every_grab(self):
+        """验证开启动画后每次截图画面都不同"""
+        from peekapi.backend import SyntheticBackend
+
+        monitor = {"left": 0, "top": 0, "width": 320, "height": 200}
+        static = SyntheticBackend(self.LAYOUT)
+        assert static.grab(monitor).raw == static.grab(monitor).raw
+        animated = SyntheticBackend(self.LAYOUT, animate=True)
+        assert animated.grab(monitor).raw != animated.grab(monitor).raw
+
+    def test_empty_layout_rejected(self):
+        from peekapi.backend import SyntheticBackend
+
+        with pytest.raises(ValueError, match="至少需要一个显示器"):
+            SyntheticBackend([])
+
+
+class TestCreateBackendFactory:
+    """create_backend_factory 测试"""
+
+    def test_synthetic(self):
+        from peekapi.backend import SyntheticBackend, create_backend_factory
+
+        factory = create_backend_factory("synthetic", ["640x480", "320x240+640+0"])
+        backend = factory()
+        assert isinstance(backend, SyntheticBackend)
+        assert backend.layout == [(0, 0, 640, 480), (640, 0, 320, 240)]
+        assert factory() is not backend
+
+    def test_mss_created_lazily(self):
+        """验证 mss 实例在调用工厂时才创建"""
+        from peekapi.backend import create_backend_factory
+
+        with patch("peekapi.backend.mss.mss") as mock_mss:
+            factory = create_backend_factory("mss")
+            mock_mss.assert_not_called()
+            assert factory() is mock_mss.return_value
+
+    def test_capture_worker_end_to_end(self):
+        """验证合成后端可以驱动完整的截图流程"""
+        from peekapi.backend import create_backend_factory
+        from peekapi.capture import CaptureWorker
+        from peekapi.screenshot import screenshot
+
+        worker = CaptureWorker(
+            timeout=5.0,
+            backend_factory=create_backend_factory("synthetic", ["320x200"]),
+        )
+        try:
+            with patch("peekapi.screenshot.capture_worker", worker):
+                data = screenshot(radius=0, main_screen_only=True)
+            assert data[:2] == b"\xff\xd8"
+            assert worker.stats()["grabs"] == 1
+        finally:
+            worker.stop()
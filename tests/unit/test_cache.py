@@ -0,0 +1,128 @@
+"""截图结果缓存模块测试"""
+
+import time
+from unittest.mock import patch
+
+from peekapi.cache import FrameCache
+
+
+class TestFrameCache:
+    """FrameCache 测试"""
+
+    def test_get_returns_fresh_entry(self):
+        """未过期的条目可以命中"""
+        cache = FrameCache(max_bytes=1024)
+        cache.put("k", b"frame", time.monotonic())
+
+        entry = cache.get("k", max_age=1.0)
+
+        assert entry is not None
+        assert entry.data == b"frame"
+
+    def test_entry_keeps_etag(self):
+        """条目保留写入时的 ETag"""
+        cache = FrameCache(max_bytes=1024)
+        cache.put("k", b"frame", time.monotonic(), etag='"abc"')
+
+        entry = cache.get("k", max_age=1.0)
+
+        assert entry is not None
+        assert entry.etag == '"abc"'
+
+    def test_get_rejects_stale_entry(self):
+        """超过 max_age 的条目不命中"""
+        cache = FrameCache(max_bytes=1024)
+        cache.put("k", b"frame", time.monotonic() - 2.0)
+
+        assert cache.get("k", max_age=1.0) is None
+
+    def test_get_missing_key(self):
+        """未缓存的键返回 None"""
+        cache = FrameCache(max_bytes=1024)
+
+        assert cache.get("missing", max_age=1.0) is None
+
+    def test_size_bounded_by_bytes_with_lru_eviction(self):
+        """超出字节上限时淘汰最久未使用的条目"""
+        cache = FrameCache(max_bytes=10)
+        now = time.monotonic()
+        cache.put("a", b"aaaa", now)
+        cache.put("b", b"bbbb", now)
+        # 访问 a，使 b 成为最久未使用
+        cache.get("a", max_age=1.0)
+        cache.put("c", b"cccc", now)
+
+        assert cache.get("a", max_age=1.0) is not None
+        assert cache.get("b", max_age=1.0) is None
+        assert cache.get("c", max_age=1.0) is not None
+        assert cache.size_bytes == 8
+
+    def test_oversized_entry_not_stored(self):
+        """单个条目超过上限时不缓存"""
+        cache = FrameCache(max_bytes=4)
+        cache.put("k", b"too large", time.monotonic())
+
+        assert len(cache) == 0
+        assert cache.size_bytes == 0
+
+    def test_zero_capacity_disables_cache(self):
+        """容量为 0 时不缓存"""
+        cache = FrameCache(max_bytes=0)
+        cache.put("k", b"x", time.monotonic())
+
+        assert cache.get("k", max_age=1.0) is None
+
+    def test_replace_entry_updates_size(self):
+        """同键写入替换旧条目并更新字节数"""
+        cache = FrameCache(max_bytes=1024)
+        now = time.monotonic()
+        cache.put("k", b"old-frame", now)
+        cache.put("k", b"new", now + 0.1)
+
+        entry = cache.get("k", max_age=1.0)
+        assert entry is not None
+        assert entry.data == b"new"
+        assert cache.size_bytes == 3
+
+    def test_older_frame_does_not_replace_newer(self):
+        """较早开始的截图不会覆盖较新的缓存帧"""
+        cache = FrameCache(max_bytes=1024)
+        now = time.monotonic()
+        cache.put("k", b"newer", now)
+        cache.put("k", b"older", now - 0.5)
+
+        entry = cache.get("k", max_age=1.0)
+        assert entry is not None
+        assert entry.data == b"newer"
+
+    def test_clear_drops_entries_and_bumps_generation(self):
+        """清空缓存并递增代数"""
+        cache = FrameCache(max_bytes=1024)
+        cache.put("k", b"frame", time.monotonic())
+        generation = cache.generation
+
+        cache.clear()
+
+        assert len(cache) == 0
+        assert cache.size_bytes == 0
+        assert cache.generation == generation + 1
+
+    def test_put_from_previous_generation_ignored(self):
+        """截图期间发生清空时，本次结果不再写入缓存"""
+        cache = FrameCache(max_bytes=1024)
+        generation = cache.generation
+        cache.clear()
+
+        cache.put("k", b"frame", time.monotonic(), generation)
+
+        assert cache.get("k", max_age=1.0) is None
+
+    def test_entry_age(self):
+        """帧龄按截图开始时间计算"""
+        cache = FrameCache(max_bytes=1024)
+        with patch("peekapi.cache.time.monotonic", return_value=100.0):
+            cache.put("k", b"frame", 99.5)
+            entry = cache.get("k", max_age=1.0)
+
+            assert entry is not None
+            assert entry.age == 0.5
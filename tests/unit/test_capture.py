@@ -0,0 +1,215 @@
+"""屏幕采集线程测试"""
+
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+
+class TestCaptureWorker:
+    """CaptureWorker 测试"""
+
+    @pytest.fixture
+    def mock_mss(self):
+        """模拟 mss，每次创建返回新的实例"""
+        instances = []
+
+        def make_sct():
+            sct = MagicMock()
+            sct.monitors = [
+                {"top": 0, "left": 0, "width": 200, "height": 100},
+                {"top": 0, "left": 0, "width": 100, "height": 100},
+            ]
+            sct.grab.side_effect = lambda monitor: MagicMock(
+                size=(monitor["width"], monitor["height"]),
+                thread=threading.current_thread(),
+            )
+            instances.append(sct)
+            return sct
+
+        with patch("peekapi.backend.mss.mss", side_effect=make_sct):
+            yield instances
+
+    @pytest.fixture
+    def worker(self):
+        from peekapi.capture import CaptureWorker
+
+        worker = CaptureWorker(timeout=5.0)
+        yield worker
+        worker.stop()
+
+    def test_grab_returns_requested_monitor(self, worker, mock_mss):
+        """验证按索引截取对应显示器"""
+        shot = worker.grab(1)
+
+        assert shot.size == (100, 100)
+        mock_mss[0].grab.assert_called_once_with(mock_mss[0].monitors[1])
+
+    def test_grab_runs_on_capture_thread(self, worker, mock_mss):
+        """验证截图在专用采集线程中执行"""
+        shot = worker.grab(0)
+
+        assert shot.thread is not threading.current_thread()
+        assert shot.thread.name == "peekapi-capture"
+
+    def test_session_reused_across_grabs(self, worker, mock_mss):
+        """验证多次截图复用同一个 mss 实例"""
+        for _ in range(5):
+            worker.grab(0)
+
+        assert len(mock_mss) == 1
+        assert mock_mss[0].grab.call_count == 5
+
+    def test_monitors_returns_layout_copy(self, worker, mock_mss):
+        """验证显示器布局在采集线程中读取并返回副本"""
+        monitors = worker.monitors()
+
+        assert monitors == mock_mss[0].monitors
+        monitors[0]["width"] = 1
+        assert mock_mss[0].monitors[0]["width"] == 200
+
+    def test_monitors_share_session_with_grab(self, worker, mock_mss):
+        """验证读取布局与截图复用同一个 mss 实例"""
+        worker.monitors()
+        worker.grab(1)
+
+        assert len(mock_mss) == 1
+
+    def test_invalid_monitor_index_not_retried(self, worker, mock_mss):
+        """验证不存在的显示器索引直接报错，不重建实例"""
+        with pytest.raises(IndexError):
+            worker.grab(5)
+
+        assert len(mock_mss) == 1
+        mock_mss[0].close.assert_not_called()
+
+    def test_grab_region_grabs_only_region(self, worker, mock_mss):
+        """验证区域截图只截取区域内的像素"""
+        shot = worker.grab_region((10, 20, 50, 30))
+
+        assert shot.size == (50, 30)
+        mock_mss[0].grab.assert_called_once_with(
+            {"left": 10, "top": 20, "width": 50, "height": 30}
+        )
+
+    def test_grab_region_clipped_to_desktop(self, worker, mock_mss):
+        """验证超出虚拟桌面的部分被裁掉"""
+        shot = worker.grab_region((-10, 50, 300, 300))
+
+        assert shot.size == (200, 50)
+
+    def test_grab_region_outside_desktop_not_retried(self, worker, mock_mss):
+        """验证与桌面没有交集的区域直接报错，不重建实例"""
+        with pytest.raises(IndexError):
+            worker.grab_region((500, 0, 10, 10))
+
+        assert len(mock_mss) == 1
+        mock_mss[0].grab.assert_not_called()
+
+    def test_grab_region_with_synthetic_backend(self):
+        """验证区域截图的像素与整屏截图中的对应区域一致"""
+        from peekapi.backend import SyntheticBackend
+        from peekapi.capture import CaptureWorker
+
+        layout = [(0, 0, 320, 200), (320, 40, 160, 120)]
+        worker = CaptureWorker(
+            timeout=5.0, backend_factory=lambda: SyntheticBackend(layout)
+        )
+        try:
+            region = worker.grab_region((300, 50, 40, 20))
+        finally:
+            worker.stop()
+
+        backend = SyntheticBackend(layout)
+        full = backend.grab(backend.monitors[0])
+        row = 4 * full.width
+        expected = b"".join(
+            full.raw[(50 + y) * row + 300 * 4 : (50 + y) * row + 340 * 4]
+            for y in range(20)
+        )
+        assert region.size == (40, 20)
+        assert bytes(region.raw) == expected
+
+    def test_grab_error_rebuilds_and_retries(self, worker, mock_mss):
+        """验证截图出错时重建实例并重试一次"""
+        worker.grab(0)
+        mock_mss[0].grab.side_effect = OSError("device context lost")
+
+        shot = worker.grab(0)
+
+        assert shot.size == (200, 100)
+        assert len(mock_mss) == 2
+        mock_mss[0].close.assert_called_once()
+
+    def test_grab_error_propagates_after_retry(self, worker, mock_mss):
+        """验证重试仍失败时异常传递给调用方"""
+        with patch(
+            "peekapi.backend.mss.mss",
+            return_value=MagicMock(
+                monitors=[{}],
+                grab=MagicMock(side_effect=OSError("boom")),
+            ),
+        ):
+            with pytest.raises(OSError, match="boom"):
+                worker.grab(0)
+
+    def test_layout_change_rebuilds_session(self, worker, mock_mss):
+        """验证显示器布局变化时重建实例"""
+        with patch("peekapi.capture._layout_signature", return_value=(0, 0, 1, 1)):
+            worker.grab(0)
+        with patch("peekapi.capture._layout_signature", return_value=(0, 0, 2, 1)):
+            worker.grab(0)
+            worker.grab(0)
+
+        assert len(mock_mss) == 2
+        mock_mss[0].close.assert_called_once()
+
+    def test_stats_report_timings(self, worker, mock_mss):
+        """验证统计信息记录截图次数和重建次数"""
+        worker.grab(0)
+        worker.grab(1)
+
+        stats = worker.stats()
+
+        assert stats["grabs"] == 2
+        assert stats["rebuilds"] == 1
+        assert stats["setup_ms"] >= 0
+        assert stats["avg_grab_ms"] >= 0
+
+    def test_stats_empty_before_first_grab(self, worker):
+        """验证首次截图前统计为零"""
+        assert worker.stats() == {
+            "setup_ms": 0.0,
+            "last_grab_ms": 0.0,
+            "avg_grab_ms": 0.0,
+            "grabs": 0,
+            "rebuilds": 0,
+        }
+
+    def test_stop_closes_session(self, worker, mock_mss):
+        """验证停止时关闭 mss 实例"""
+        worker.grab(0)
+        thread = worker._thread
+
+        worker.stop()
+
+        assert thread is not None
+        assert not thread.is_alive()
+        mock_mss[0].close.assert_called_once()
+
+    def test_grab_after_stop_restarts_thread(self, worker, mock_mss):
+        """验证停止后再次截图会重新启动采集线程"""
+        worker.grab(0)
+        worker.stop()
+
+        shot = worker.grab(1)
+
+        assert shot.size == (100, 100)
+        assert len(mock_mss) == 2
+
+    def test_layout_signature_none_off_windows(self):
+        """验证非 Windows 平台不读取布局指纹"""
+        from peekapi.capture import _layout_signature
+
+        with patch("peekapi.capture.sys.platform", "linux"):
+            assert _layout_signature() is None
@@ -1,6 +1,7 @@
 """配置模块测试"""
 
-from msgspec import toml
+import pytest
+from msgspec import ValidationError, toml
 
 from peekapi.config import BasicConfig, Config, RecordConfig, ScreenshotConfig
 
@@ -44,7 +45,21 @@ class TestScreenshotConfig:
         """测试默认值"""
         config = ScreenshotConfig()
         assert config.radius_threshold == 3
+        assert config.radius_step == 0
         assert config.main_screen_only is False
+        assert config.pack_screens is False
+        assert config.cache_size_mb == 32
+        assert config.blur_mode == "gaussian"
+        assert config.format == "jpeg"
+        assert config.quality == 95
+        assert config.subsampling == "420"
+        assert config.max_bytes == 0
+        assert config.stream_max_fps == 5.0
+        assert config.history_interval == 0
+        assert config.history_size_mb == 64
+        assert config.delta_cache_mb == 128
+        assert config.backend == "mss"
+        assert config.synthetic_monitors == ["1920x1080"]
 
     def test_custom_values(self):
         """测试自定义值"""
@@ -61,6 +76,9 @@ class TestRecordConfig:
         config = RecordConfig()
         assert config.duration == 20
         assert config.gain == 20.0
+        assert config.format == "wav"
+        assert config.compression_level == 0.5
+        assert config.cache_size_mb == 8
 
     def test_custom_values(self):
         """测试自定义值"""
@@ -132,6 +150,37 @@ duration = 60
         assert config.record.duration == 30
         assert config.record.gain == 15.0
 
+    def test_toml_decode_invalid_blur_mode(self):
+        """测试未知模糊方式被拒绝"""
+        content = b"""
+[screenshot]
+blur_mode = "box"
+"""
+        with pytest.raises(ValidationError):
+            toml.decode(content, type=Config)
+
+    def test_toml_decode_invalid_quality(self):
+        """测试超出范围的编码质量被拒绝"""
+        with pytest.raises(ValidationError):
+            toml.decode(b"[screenshot]\nquality = 0\n", type=Config)
+
+    def test_toml_decode_synthetic_monitors(self):
+        """测试合成后端显示器布局的解析与校验"""
+        config = toml.decode(
+            b'[screenshot]\nbackend = "synthetic"\n'
+            b'synthetic_monitors = ["2560x1440", "1920x1080+2560-360"]\n',
+            type=Config,
+        )
+        assert config.screenshot.backend == "synthetic"
+        assert config.screenshot.synthetic_monitors == [
+            "2560x1440",
+            "1920x1080+2560-360",
+        ]
+        with pytest.raises(ValidationError):
+            toml.decode(
+                b'[screenshot]\nsynthetic_monitors = ["1920*1080"]\n', type=Config
+            )
+
     def test_nested_access_pattern(self):
         """测试嵌套访问模式 config.basic.is_public"""
         config = Config()
@@ -0,0 +1,169 @@
+"""增量截图模块测试"""
+
+import io
+
+import numpy as np
+import pytest
+from mss.screenshot import ScreenShot
+from PIL import Image
+
+from peekapi.delta import (
+    TILE_SIZE,
+    DeltaStore,
+    changed_tiles,
+    delta_regions,
+    dilate,
+    render_tiles,
+    tile_regions,
+)
+from peekapi.screenshot import EncodeOptions, blur, frame_to_image
+
+
+def make_frame(width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, (height, width, 4), dtype=np.uint8)
+    return ScreenShot.from_size(bytearray(pixels.tobytes()), width, height)
+
+
+def modified(frame, x, y):
+    """复制截图并修改 (x, y) 处的一个像素"""
+    raw = bytearray(frame.raw)
+    offset = (y * frame.width + x) * 4
+    raw[offset] ^= 0xFF
+    return ScreenShot.from_size(raw, frame.width, frame.height)
+
+
+class TestChangedTiles:
+    """变化图块检测测试"""
+
+    def test_identical_frames_have_no_changes(self):
+        frame = make_frame(200, 130)
+
+        assert not changed_tiles(frame, modified(modified(frame, 5, 5), 5, 5)).any()
+
+    def test_single_pixel_marks_its_tile(self):
+        """单个像素变化只标记所在图块，尺寸不是图块整数倍时向上取整"""
+        frame = make_frame(200, 130)
+
+        mask = changed_tiles(frame, modified(frame, 150, 129))
+
+        assert mask.shape == (3, 4)
+        assert list(zip(*np.nonzero(mask), strict=True)) == [(2, 2)]
+
+
+class TestDilate:
+    def test_grows_to_eight_neighbours(self):
+        mask = np.zeros((5, 5), dtype=bool)
+        mask[2, 2] = True
+
+        grown = dilate(mask, 1)
+
+        assert grown[1:4, 1:4].all()
+        assert grown.sum() == 9
+
+    def test_zero_steps_unchanged(self):
+        mask = np.eye(3, dtype=bool)
+
+        assert (dilate(mask, 0) == mask).all()
+
+
+class TestTileRegions:
+    def test_merges_adjacent_tiles_in_row(self):
+        """同一行相邻图块合并，末尾区域裁剪到截图范围内"""
+        mask = np.array([[True, True, False, True], [False, False, False, False]])
+
+        regions = tile_regions(mask, (200, 100))
+
+        assert regions == [(0, 0, 2 * TILE_SIZE, TILE_SIZE), (192, 0, 8, TILE_SIZE)]
+
+    def test_clips_last_row(self):
+        mask = np.array([[False], [True]])
+
+        assert tile_regions(mask, (50, 100)) == [(0, TILE_SIZE, 50, 100 - TILE_SIZE)]
+
+
+class TestRenderTiles:
+    """区域渲染测试"""
+
+    @pytest.mark.parametrize("blur_mode", ["gaussian", "fast"])
+    @pytest.mark.parametrize("radius", [0, 3, 10, 30])
+    def test_reconstruction_matches_full_frame(self, radius, blur_mode):
+        """把变化区域贴回旧画面后与整帧模糊结果一致"""
+        before = make_frame(640, 400)
+        after = modified(modified(before, 10, 10), 500, 300)
+
+        regions = delta_regions(before, after, radius, blur_mode)
+        tiles = render_tiles(
+            after, regions, radius, blur_mode, EncodeOptions(format="png")
+        )
+
+        canvas = blur(frame_to_image(before), radius, blur_mode).copy()
+        for tile in tiles:
+            canvas.paste(Image.open(io.BytesIO(tile.data)), tile.region[:2])
+        expected = blur(frame_to_image(after), radius, blur_mode)
+        assert canvas.tobytes() == expected.tobytes()
+
+    def test_regions_grow_with_blur_radius(self):
+        before = make_frame(640, 640)
+        after = modified(before, 320, 320)
+
+        sharp = delta_regions(before, after, 0)
+        blurred = delta_regions(before, after, 30)
+
+        assert sum(w * h for _, _, w, h in sharp) == TILE_SIZE * TILE_SIZE
+        assert sum(w * h for _, _, w, h in blurred) > TILE_SIZE * TILE_SIZE
+
+
+class TestDeltaStore:
+    """DeltaStore 测试"""
+
+    def test_add_assigns_increasing_ids(self):
+        store = DeltaStore(max_bytes=1024 * 1024)
+
+        first = store.add(1, make_frame(10, 10), 1, store.generation)
+        second = store.add(1, make_frame(10, 10, seed=1), 2, store.generation)
+
+        assert second.frame_id > first.frame_id
+        assert store.get(first.frame_id) is first
+        assert store.get(second.frame_id) is second
+
+    def test_unchanged_frame_reuses_id(self):
+        """画面与最近一帧相同时复用帧号，不重复保存"""
+        store = DeltaStore(max_bytes=1024 * 1024)
+        first = store.add(1, make_frame(10, 10), 1, store.generation)
+
+        again = store.add(1, make_frame(10, 10), 1, store.generation)
+
+        assert again is first
+        assert len(store) == 1
+
+    def test_targets_tracked_separately(self):
+        store = DeltaStore(max_bytes=1024 * 1024)
+        first = store.add(1, make_frame(10, 10), 1, store.generation)
+
+        other = store.add(2, make_frame(10, 10), 1, store.generation)
+
+        assert other.frame_id != first.frame_id
+
+    def test_evicts_oldest_over_capacity(self):
+        store = DeltaStore(max_bytes=2 * 10 * 10 * 4)
+        ids = [
+            store.add(1, make_frame(10, 10, seed=i), i, store.generation).frame_id
+            for i in range(3)
+        ]
+
+        assert store.get(ids[0]) is None
+        assert store.get(ids[2]) is not None
+        assert store.size_bytes == 2 * 10 * 10 * 4
+
+    def test_clear_discards_frames_and_stale_writes(self):
+        store = DeltaStore(max_bytes=1024 * 1024)
+        generation = store.generation
+        kept = store.add(1, make_frame(10, 10), 1, generation)
+
+        store.clear()
+        stale = store.add(1, make_frame(10, 10, seed=1), 2, generation)
+
+        assert store.get(kept.frame_id) is None
+        assert store.get(stale.frame_id) is None
+        assert len(store) == 0
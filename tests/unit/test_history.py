@@ -0,0 +1,166 @@
+"""截图历史模块测试"""
+
+import io
+import time
+from typing import cast
+from unittest.mock import MagicMock
+
+import pytest
+from PIL import Image
+
+from peekapi import history
+from peekapi.history import FrameHistory, HistoryFrame, render_history_frame
+from peekapi.screenshot import EncodeOptions
+
+
+def make_frame(first_seen, data=b"frame", fingerprint=0, last_seen=None):
+    return HistoryFrame(
+        data=data,
+        encoding=EncodeOptions(),
+        fingerprint=fingerprint,
+        first_seen=first_seen,
+        last_seen=first_seen if last_seen is None else last_seen,
+    )
+
+
+class TestFrameHistory:
+    """FrameHistory 测试"""
+
+    def test_at_returns_latest_frame_before_timestamp(self):
+        ring = FrameHistory(max_bytes=1024)
+        for t in (10.0, 20.0, 30.0):
+            ring.append(make_frame(t, fingerprint=int(t)), ring.generation)
+
+        def first_seen_at(t):
+            frame = ring.at(t)
+            return frame.first_seen if frame is not None else None
+
+        assert first_seen_at(25.0) == 20.0
+        assert first_seen_at(30.0) == 30.0
+        assert first_seen_at(99.0) == 30.0
+        assert first_seen_at(5.0) is None
+
+    def test_bounded_by_bytes_evicts_oldest(self):
+        ring = FrameHistory(max_bytes=10)
+        for t in (1.0, 2.0, 3.0):
+            ring.append(make_frame(t, data=b"aaaa", fingerprint=int(t)), 0)
+
+        assert [frame.first_seen for frame in ring.frames()] == [2.0, 3.0]
+        assert ring.size_bytes == 8
+
+    def test_oversized_frame_not_stored(self):
+        ring = FrameHistory(max_bytes=4)
+        ring.append(make_frame(1.0, data=b"too large"), 0)
+
+        assert len(ring) == 0
+
+    def test_extend_unchanged_frame(self):
+        ring = FrameHistory(max_bytes=1024)
+        ring.append(make_frame(1.0, fingerprint=7), 0)
+
+        assert ring.extend(7, 5.0, 0) is True
+        assert ring.extend(8, 6.0, 0) is False
+
+        (frame,) = ring.frames()
+        assert (frame.first_seen, frame.last_seen) == (1.0, 5.0)
+
+    def test_extend_empty_history(self):
+        ring = FrameHistory(max_bytes=1024)
+
+        assert ring.extend(7, 1.0, 0) is False
+
+    def test_clear_discards_in_flight_writes(self):
+        ring = FrameHistory(max_bytes=1024)
+        generation = ring.generation
+        ring.append(make_frame(1.0, fingerprint=1), generation)
+
+        ring.clear()
+        ring.append(make_frame(2.0, fingerprint=2), generation)
+
+        assert len(ring) == 0
+        assert ring.size_bytes == 0
+        assert ring.extend(1, 3.0, generation) is False
+
+
+class TestRenderHistoryFrame:
+    """历史帧模糊测试"""
+
+    @pytest.fixture
+    def sharp_frame(self):
+        img = Image.new("RGB", (64, 64), "black")
+        img.paste((255, 255, 255), (32, 0, 64, 64))
+        buffer = io.BytesIO()
+        img.save(buffer, format="PNG")
+        return HistoryFrame(
+            data=buffer.getvalue(),
+            encoding=EncodeOptions(format="png"),
+            fingerprint=0,
+            first_seen=1.0,
+            last_seen=1.0,
+        )
+
+    def test_zero_radius_returns_stored_data(self, sharp_frame):
+        assert render_history_frame(sharp_frame, 0) is sharp_frame.data
+
+    def test_positive_radius_blurs(self, sharp_frame):
+        data = render_history_frame(sharp_frame, 4)
+
+        img = Image.open(io.BytesIO(data))
+        assert img.format == "PNG"
+        # 黑白分界处被模糊成中间灰度
+        red, _, _ = cast("tuple[int, int, int]", img.getpixel((32, 32)))
+        assert 0 < red < 255
+
+
+class TestScreenSampler:
+    """ScreenSampler 测试"""
+
+    @pytest.fixture
+    def sampler(self, monkeypatch):
+        monkeypatch.setattr(history.config.basic, "is_public", True)
+        frames = iter([b"a", b"a", b"b"] + [b"b"] * 100)
+        capture = MagicMock(
+            side_effect=lambda monitor: MagicMock(raw=next(frames), size=(1, 1))
+        )
+        render = MagicMock(side_effect=lambda frame, *args, **kwargs: frame.raw)
+        monkeypatch.setattr(history, "capture", capture)
+        monkeypatch.setattr(history, "render", render)
+        monkeypatch.setattr(history, "frame_fingerprint", lambda frame: hash(frame.raw))
+        instance = history.ScreenSampler(FrameHistory(max_bytes=1024), interval=0.01)
+        yield instance, capture, render
+        instance.stop()
+
+    def wait_for_captures(self, capture, count):
+        deadline = time.monotonic() + 5
+        while capture.call_count < count:
+            assert time.monotonic() < deadline, "采样超时"
+            time.sleep(0.005)
+
+    def test_unchanged_frames_extend_instead_of_encoding(self, sampler):
+        instance, capture, render = sampler
+
+        instance.start()
+        self.wait_for_captures(capture, 5)
+        instance.stop()
+
+        frames = instance.history.frames()
+        assert [frame.data for frame in frames] == [b"a", b"b"]
+        assert render.call_count == 2
+        assert frames[0].last_seen > frames[0].first_seen
+
+    def test_private_mode_skips_sampling(self, sampler, monkeypatch):
+        instance, capture, _ = sampler
+        monkeypatch.setattr(history.config.basic, "is_public", False)
+
+        instance.start()
+        time.sleep(0.05)
+        instance.stop()
+
+        capture.assert_not_called()
+
+    def test_zero_interval_disabled(self):
+        instance = history.ScreenSampler(FrameHistory(max_bytes=1024), interval=0)
+
+        instance.start()
+
+        assert not instance.is_running
@@ -0,0 +1,129 @@
+"""分阶段流水线测试"""
+
+import queue
+import threading
+
+import pytest
+
+from peekapi.pipeline import Pipeline
+
+
+@pytest.fixture
+def results():
+    return queue.Queue()
+
+
+def make_pipeline(*stages, queue_size=1):
+    pipeline = Pipeline("test", list(stages), queue_size=queue_size)
+    pipeline.start()
+    return pipeline
+
+
+class TestPipeline:
+    """Pipeline 测试"""
+
+    def test_items_pass_through_stages_in_order(self, results):
+        pipeline = make_pipeline(
+            ("double", lambda x: x * 2),
+            ("inc", lambda x: x + 1),
+            ("sink", results.put),
+        )
+        for item in range(5):
+            pipeline.put(item)
+        pipeline.stop()
+
+        assert [results.get_nowait() for _ in range(5)] == [1, 3, 5, 7, 9]
+
+    def test_none_result_drops_item(self, results):
+        pipeline = make_pipeline(
+            ("filter", lambda x: x if x % 2 else None),
+            ("sink", results.put),
+        )
+        for item in range(4):
+            pipeline.put(item)
+        pipeline.stop()
+
+        assert list(results.queue) == [1, 3]
+
+    def test_stage_error_skips_item_and_keeps_running(self, results):
+        def fail_on_two(x):
+            if x == 2:
+                raise ValueError("boom")
+            return x
+
+        pipeline = make_pipeline(("check", fail_on_two), ("sink", results.put))
+        for item in range(4):
+            pipeline.put(item)
+        pipeline.stop()
+
+        assert list(results.queue) == [0, 1, 3]
+        assert pipeline.stats()[0]["errors"] == 1
+        assert pipeline.stats()[0]["processed"] == 3
+
+    def test_stages_overlap(self):
+        """下游处理上一条目时，上游同时处理下一条目"""
+        first_in_sink = threading.Event()
+        second_in_source = threading.Event()
+
+        def source(x):
+            if x == 2:
+                second_in_source.set()
+            return x
+
+        def sink(x):
+            if x == 1:
+                first_in_sink.set()
+                # 只有上游并行处理下一条目时才能等到
+                assert second_in_source.wait(timeout=5)
+
+        pipeline = make_pipeline(("source", source), ("sink", sink))
+        pipeline.put(1)
+        assert first_in_sink.wait(timeout=5)
+        pipeline.put(2)
+        pipeline.stop()
+
+        assert pipeline.stats()[1]["errors"] == 0
+
+    def test_bounded_queue_applies_backpressure(self):
+        release = threading.Event()
+        pipeline = make_pipeline(("slow", lambda x: release.wait(timeout=5)))
+
+        pipeline.put(1)  # 被阶段线程取走后阻塞
+        pipeline.put(2)  # 占满容量为 1 的输入队列
+        with pytest.raises(queue.Full):
+            pipeline.put(3, timeout=0.2)
+
+        stats = pipeline.stats()[0]
+        assert stats["queue_depth"] == 1
+        assert stats["queue_size"] == 1
+        release.set()
+        pipeline.stop()
+
+    def test_stats_report_timings(self, results):
+        pipeline = make_pipeline(("sink", results.put))
+        pipeline.put(1)
+        pipeline.stop()
+
+        (stats,) = pipeline.stats()
+        assert stats["name"] == "sink"
+        assert stats["processed"] == 1
+        assert stats["avg_ms"] >= 0
+        assert stats["queue_depth"] == 0
+
+    def test_stop_and_restart(self, results):
+        pipeline = make_pipeline(("sink", results.put))
+        pipeline.stop()
+        assert not pipeline.is_running
+
+        pipeline.start()
+        pipeline.put(1)
+        pipeline.stop()
+
+        assert list(results.queue) == [1]
+
+    def test_stop_when_not_started(self):
+        pipeline = Pipeline("test", [("noop", lambda x: x)])
+
+        pipeline.stop()
+
+        assert not pipeline.is_running
@@ -67,3 +67,16 @@ def test_duplicate_suspend_and_resume_notifications_are_ignored(monkeypatch):
     recorder.stop_recording.assert_called_once_with(wait=False)
     recorder.start_recording.assert_called_once_with()
     assert power_events._suspended is False
+
+
+def test_suspend_purges_screen_data(monkeypatch):
+    recorder = MagicMock()
+    purge = MagicMock()
+    monkeypatch.setattr(power_events, "_recorder_ref", recorder)
+    monkeypatch.setattr(power_events, "_suspended", False)
+    monkeypatch.setattr(power_events, "purge_screen_data", purge)
+
+    power_events._on_power_event(None, power_events.PBT_APMSUSPEND, None)
+    power_events._on_power_event(None, power_events.PBT_APMRESUMEAUTOMATIC, None)
+
+    purge.assert_called_once()
@@ -0,0 +1,53 @@
+"""隐私数据清理模块测试"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from peekapi import privacy
+
+
+@pytest.fixture
+def callbacks(monkeypatch):
+    """隔离全局回调列表"""
+    registered = []
+    monkeypatch.setattr(privacy, "_callbacks", registered)
+    return registered
+
+
+def test_purge_calls_registered_callbacks(callbacks):
+    first, second = MagicMock(), MagicMock()
+    privacy.register_purge_callback(first)
+    privacy.register_purge_callback(second)
+
+    privacy.purge_screen_data("测试")
+
+    first.assert_called_once_with()
+    second.assert_called_once_with()
+
+
+def test_register_same_callback_once(callbacks):
+    callback = MagicMock()
+    privacy.register_purge_callback(callback)
+    privacy.register_purge_callback(callback)
+
+    privacy.purge_screen_data("测试")
+
+    callback.assert_called_once_with()
+
+
+def test_failing_callback_does_not_block_others(callbacks):
+    failing = MagicMock(side_effect=RuntimeError("boom"))
+    other = MagicMock()
+    privacy.register_purge_callback(failing)
+    privacy.register_purge_callback(other)
+
+    privacy.purge_screen_data("测试")
+
+    other.assert_called_once_with()
+
+
+def test_screen_cache_registered_on_import():
+    from peekapi.cache import screen_cache
+
+    assert screen_cache.clear in privacy._callbacks
@@ -35,6 +35,165 @@ class _FakeWorker:
             self.target(*self.args, **self.kwargs)
 
 
+class TestRingBuffer:
+    """RingBuffer 测试"""
+
+    def test_keeps_order_across_wraparound(self):
+        from peekapi.record import RingBuffer
+
+        ring = RingBuffer(5)
+        ring.extend(np.array([1, 2, 3]))
+        ring.extend(np.array([4, 5, 6, 7]))
+
+        assert len(ring) == 5
+        assert ring.snapshot().tolist() == [3, 4, 5, 6, 7]
+
+    def test_block_larger_than_capacity_keeps_tail(self):
+        from peekapi.record import RingBuffer
+
+        ring = RingBuffer(4)
+        ring.extend(np.array([1]))
+        ring.extend(np.arange(10))
+
+        assert ring.snapshot().tolist() == [6, 7, 8, 9]
+
+    def test_snapshot_is_independent_copy(self):
+        from peekapi.record import RingBuffer
+
+        ring = RingBuffer(4)
+        ring.extend(np.array([1, 2]))
+        snapshot = ring.snapshot()
+        ring.extend(np.array([3, 4, 5]))
+
+        assert snapshot.dtype == np.int16
+        assert snapshot.tolist() == [1, 2]
+
+    def test_snapshot_count_copies_latest(self):
+        from peekapi.record import RingBuffer
+
+        ring = RingBuffer(5)
+        ring.extend(np.array([1, 2, 3, 4, 5, 6, 7]))
+
+        assert ring.total == 7
+        assert ring.snapshot(2).tolist() == [6, 7]
+        assert ring.snapshot(0).tolist() == []
+        assert ring.snapshot(10).tolist() == [3, 4, 5, 6, 7]
+
+    def test_zero_capacity_stays_empty(self):
+        from peekapi.record import RingBuffer
+
+        ring = RingBuffer(0)
+        ring.extend(np.array([1, 2]))
+
+        assert len(ring) == 0
+        assert ring.snapshot().tolist() == []
+
+
+class TestWavStream:
+    """流式 WAV 输出测试"""
+
+    def test_header_matches_soundfile(self):
+        """手写文件头与 soundfile 生成的 PCM_16 WAV 文件头一致"""
+        import io
+
+        from peekapi.record import WAV_HEADER_SIZE, wav_header
+
+        samples = np.arange(100, dtype=np.int16)
+        expected = io.BytesIO()
+        expected.name = "audio.wav"
+        sf.write(expected, samples, 44100, subtype="PCM_16")
+
+        assert wav_header(len(samples), 44100) == expected.getvalue()[:WAV_HEADER_SIZE]
+
+    def test_chunks_decode_to_samples(self):
+        import io
+
+        from peekapi.record import WAV_CHUNK_BYTES, iter_wav
+
+        samples = np.arange(-50000, 50000, dtype=np.int32).astype(np.int16)
+
+        chunks = list(iter_wav(samples, 48000))
+
+        assert len(chunks) == 1 + -(-samples.nbytes // WAV_CHUNK_BYTES)
+        data, rate = sf.read(io.BytesIO(b"".join(chunks)), dtype="int16")
+        assert rate == 48000
+        assert (data == samples).all()
+
+    def test_empty_samples_produce_valid_wav(self):
+        import io
+
+        from peekapi.record import iter_wav
+
+        wav = b"".join(iter_wav(np.array([], dtype=np.int16), 44100))
+
+        info = sf.info(io.BytesIO(wav))
+        assert info.frames == 0
+        assert info.channels == 1
+
+
+class TestEncodeAudio:
+    """压缩录音编码测试"""
+
+    SAMPLES = (np.sin(np.arange(44100) / 10) * 8000).astype(np.int16)
+
+    def test_flac_is_lossless(self):
+        import io
+
+        from peekapi.record import encode_audio
+
+        data = encode_audio(self.SAMPLES, 44100, "flac", 0.5)
+
+        decoded, rate = sf.read(io.BytesIO(data), dtype="int16")
+        assert rate == 44100
+        assert (decoded == self.SAMPLES).all()
+        assert len(data) < self.SAMPLES.nbytes
+
+    def test_ogg_vorbis(self):
+        import io
+
+        from peekapi.record import encode_audio
+
+        data = encode_audio(self.SAMPLES, 44100, "ogg", 0.5)
+
+        info = sf.info(io.BytesIO(data))
+        assert info.subtype == "VORBIS"
+        assert info.samplerate == 44100
+
+    def test_opus_resamples_unsupported_rate(self):
+        """Opus 不支持 44.1kHz，重采样到 48kHz 后编码"""
+        import io
+
+        from peekapi.record import encode_audio
+
+        data = encode_audio(self.SAMPLES, 44100, "opus", 0.5)
+
+        info = sf.info(io.BytesIO(data))
+        assert info.subtype == "OPUS"
+        assert info.samplerate == 48000
+        assert info.duration == pytest.approx(1.0, abs=0.02)
+
+    @pytest.mark.parametrize("fmt", ["flac", "ogg", "opus"])
+    def test_empty_samples_decode(self, fmt):
+        """没有样本时仍返回可被解码的空音频"""
+        import io
+
+        from peekapi.record import encode_audio
+
+        data = encode_audio(np.array([], np.int16), 44100, fmt, 0.5)
+
+        decoded, rate = sf.read(io.BytesIO(data), dtype="int16")
+        assert len(decoded) == 0
+        assert rate == 44100
+
+    def test_resample_keeps_duration(self):
+        from peekapi.record import resample
+
+        resampled = resample(self.SAMPLES, 44100, 48000)
+
+        assert resampled.dtype == np.int16
+        assert len(resampled) == 48000
+
+
 class TestAudioRecorder:
     """AudioRecorder 类测试"""
 
@@ -100,7 +259,7 @@ class TestAudioRecorder:
 
         expected_size = 44100 * 10  # rate × duration
         assert recorder.buffer_size == expected_size
-        assert recorder.buffer.maxlen == expected_size
+        assert recorder.buffer.capacity == expected_size
 
     def test_recorder_buffer_size_different_rates(self, recorder_class):
         """验证不同采样率下缓冲区大小"""
@@ -331,15 +490,86 @@ class TestAudioRecorder:
         data, _samplerate = sf.read(result, dtype="int16")
         assert list(data) == test_samples
 
+    def test_snapshot_returns_contiguous_int16(self, recorder_class):
+        """验证快照为按时间顺序的连续 int16 数组"""
+        recorder = recorder_class(rate=4, duration=1)
+        recorder.buffer.extend(np.array([1, 2, 3]))
+        recorder.buffer.extend(np.array([4, 5]))
+
+        snapshot = recorder.snapshot()
+
+        assert snapshot.dtype == np.int16
+        assert snapshot.flags.c_contiguous
+        assert snapshot.tolist() == [2, 3, 4, 5]
+
+    def test_snapshot_seconds_window(self, recorder_class):
+        recorder = recorder_class(rate=10, duration=2)
+        recorder._write(np.arange(20), 100.0)
+
+        assert recorder.snapshot(seconds=0.5).tolist() == [15, 16, 17, 18, 19]
+
+    def test_snapshot_since_maps_to_sample_offset(self, recorder_class):
+        """since 按块采集时间换算到精确的样本位置"""
+        recorder = recorder_class(rate=10, duration=3)
+        recorder._write(np.arange(10), 101.0)  # 样本 0-9 在 100.1-101.0 采集
+        recorder._write(np.arange(10, 20), 102.0)
+
+        assert recorder.snapshot(since=101.45).tolist() == list(range(14, 20))
+        assert recorder.snapshot(since=101.5).tolist() == list(range(15, 20))
+        assert recorder.snapshot(since=100.95).tolist() == list(range(9, 20))
+        assert recorder.snapshot(since=102.0).tolist() == []
+        assert recorder.snapshot(since=50).tolist() == list(range(20))
+
+    def test_snapshot_huge_seconds_returns_whole_buffer(self, recorder_class):
+        recorder = recorder_class(rate=10, duration=2)
+        recorder._write(np.arange(20), 100.0)
+
+        assert recorder.snapshot(seconds=1e308).tolist() == list(range(20))
+
+    def test_snapshot_very_old_since_returns_whole_buffer(self, recorder_class):
+        recorder = recorder_class(rate=10, duration=2)
+        recorder._write(np.arange(20), 100.0)
+
+        assert recorder.snapshot(since=-1e308).tolist() == list(range(20))
+
+    def test_snapshot_since_and_seconds_take_shorter(self, recorder_class):
+        recorder = recorder_class(rate=10, duration=3)
+        recorder._write(np.arange(20), 102.0)
+
+        assert len(recorder.snapshot(seconds=0.3, since=101.0)) == 3
+        assert len(recorder.snapshot(seconds=1.5, since=101.65)) == 4
+
+    def test_clip_identifies_window(self, recorder_class):
+        """片段记录首个样本序号和缓冲代数，重建缓冲后代数变化"""
+        recorder = recorder_class(rate=10, duration=1)
+        recorder._write(np.arange(25), 100.0)
+
+        clip = recorder.clip(seconds=0.5)
+
+        assert clip.samples.tolist() == [20, 21, 22, 23, 24]
+        assert clip.start == 20
+        with patch("peekapi.record.threading.Thread", _FakeWorker):
+            recorder.start_recording()
+        assert recorder.clip().generation == clip.generation + 1
+
+    def test_overwritten_blocks_are_dropped(self, recorder_class):
+        recorder = recorder_class(rate=10, duration=1)
+        for i in range(5):
+            recorder._write(np.full(5, i), 100.0 + i)
+
+        assert len(recorder._blocks) == 2
+        assert recorder.snapshot(since=0).tolist() == [3] * 5 + [4] * 5
+
     def test_buffer_thread_safety(self, recorder_class):
-        """验证缓冲区操作的线程安全性"""
+        """验证缓冲区操作的线程安全性（写入方与录音线程一样持有 _lock）"""
         recorder = recorder_class(rate=44100, duration=1)
         errors = []
 
         def writer():
             for i in range(1000):
                 try:
-                    recorder.buffer.extend([i] * 10)
+                    with recorder._lock:
+                        recorder.buffer.extend([i] * 10)
                 except Exception as e:
                     errors.append(e)
 
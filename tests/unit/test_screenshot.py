@@ -1,37 +1,46 @@
 """截图模块测试"""
 
 import io
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, PropertyMock, patch
 
+import numpy as np
 import pytest
-from PIL import Image
+from PIL import Image, ImageDraw, ImageFilter
 
 
-class TestScreenshot:
-    """截图功能测试"""
+@pytest.fixture
+def mock_mss():
+    """模拟 mss 截图库"""
+    # 创建 100x100 的测试图像数据 (BGRA)
+    width, height = 100, 100
+    bgra_data = bytearray(b"\x00\x00\xff\xff" * (width * height))  # 红色像素
 
-    @pytest.fixture
-    def mock_mss(self):
-        """模拟 mss 截图库"""
-        # 创建 100x100 的测试图像数据 (RGB)
-        width, height = 100, 100
-        rgb_data = b"\xff\x00\x00" * (width * height)  # 红色像素
-
-        mock_img = MagicMock()
-        mock_img.size = (width, height)
-        mock_img.rgb = rgb_data
-
-        mock_sct = MagicMock()
-        mock_sct.monitors = [
-            {"top": 0, "left": 0, "width": 200, "height": 100},  # 全部屏幕
-            {"top": 0, "left": 0, "width": 100, "height": 100},  # 主屏幕
-        ]
-        mock_sct.grab.return_value = mock_img
-        mock_sct.__enter__ = MagicMock(return_value=mock_sct)
-        mock_sct.__exit__ = MagicMock(return_value=False)
+    mock_img = MagicMock()
+    mock_img.size = (width, height)
+    mock_img.raw = bgra_data
+
+    mock_sct = MagicMock()
+    mock_sct.monitors = [
+        {"top": 0, "left": 0, "width": 200, "height": 100},  # 全部屏幕
+        {"top": 0, "left": 0, "width": 100, "height": 100},  # 主屏幕
+    ]
+    mock_sct.grab.return_value = mock_img
+    mock_sct.__enter__ = MagicMock(return_value=mock_sct)
+    mock_sct.__exit__ = MagicMock(return_value=False)
 
-        with patch("peekapi.screenshot.mss.mss", return_value=mock_sct):
-            yield mock_sct
+    from peekapi.capture import CaptureWorker
+
+    worker = CaptureWorker()
+    with (
+        patch("peekapi.backend.mss.mss", return_value=mock_sct),
+        patch("peekapi.screenshot.capture_worker", worker),
+    ):
+        yield mock_sct
+    worker.stop()
+
+
+class TestScreenshot:
+    """截图功能测试"""
 
     def test_screenshot_returns_bytes(self, mock_mss):
         """验证截图返回字节数据"""
@@ -138,3 +147,528 @@ class TestScreenshot:
             screenshot(radius=float("inf"), main_screen_only=True)
 
             mock_filter.assert_not_called()
+
+    def test_screenshot_fast_mode_uses_fast_blur(self, mock_mss):
+        """blur_mode=fast 时使用快速模糊"""
+        from peekapi.screenshot import screenshot
+
+        with patch("peekapi.screenshot.fast_blur") as mock_fast_blur:
+            mock_fast_blur.return_value = Image.new("RGB", (100, 100), color="red")
+
+            screenshot(radius=10, main_screen_only=True, blur_mode="fast")
+
+        mock_fast_blur.assert_called_once()
+        assert mock_fast_blur.call_args[0][1] == 10
+
+
+class TestOutputSize:
+    """输出尺寸测试"""
+
+    def test_max_side_limits_longest_side(self):
+        from peekapi.screenshot import OutputSize
+
+        assert OutputSize(max_side=960).scale_for((3840, 2160)) == 0.25
+
+    def test_width_and_height_fit_inside_box(self):
+        from peekapi.screenshot import OutputSize
+
+        size = OutputSize(width=1000, height=200)
+
+        assert size.scale_for((2000, 1000)) == 0.2
+
+    def test_never_upscales(self):
+        from peekapi.screenshot import OutputSize
+
+        assert OutputSize(max_side=4000, width=5000).scale_for((1920, 1080)) == 1.0
+
+    def test_no_constraints_keeps_size(self):
+        from peekapi.screenshot import OutputSize
+
+        assert OutputSize().scale_for((1920, 1080)) == 1.0
+
+    def test_downscale_reduces_then_resamples(self):
+        """先整数倍 reduce 再重采样到目标尺寸"""
+        from peekapi.screenshot import downscale
+
+        img = Image.new("RGB", (1920, 1080), color="red")
+        with patch.object(Image.Image, "reduce", autospec=True) as mock_reduce:
+            mock_reduce.side_effect = lambda im, factor: Image.new(
+                "RGB", (im.width // factor, im.height // factor)
+            )
+            result = downscale(img, (600, 338))
+
+        assert mock_reduce.call_args[0][1] == 3
+        assert result.size == (600, 338)
+
+    def test_downscale_small_ratio_skips_reduce(self):
+        """缩小比例不足 2 倍时只做重采样"""
+        from peekapi.screenshot import downscale
+
+        img = Image.new("RGB", (1920, 1080), color="red")
+        with patch.object(Image.Image, "reduce", autospec=True) as mock_reduce:
+            result = downscale(img, (1280, 720))
+
+        mock_reduce.assert_not_called()
+        assert result.size == (1280, 720)
+
+    def test_screenshot_applies_output_size(self, mock_mss):
+        """截图按输出尺寸缩小"""
+        from peekapi.screenshot import OutputSize, screenshot
+
+        result = screenshot(0, True, size=OutputSize(max_side=25))
+
+        assert Image.open(io.BytesIO(result)).size == (25, 25)
+
+    def test_screenshot_scales_radius_with_output(self, mock_mss):
+        """缩小输出时模糊半径按比例换算"""
+        from peekapi.screenshot import OutputSize, screenshot
+
+        with patch("PIL.Image.Image.filter") as mock_filter:
+            mock_filter.return_value = Image.new("RGB", (50, 50), color="red")
+
+            screenshot(10, True, size=OutputSize(width=50))
+
+        blur = mock_filter.call_args[0][0]
+        assert blur.radius == 5
+
+
+class TestEncodeImage:
+    """图像编码测试"""
+
+    @pytest.fixture
+    def image(self):
+        rng = np.random.default_rng(0)
+        return Image.fromarray(rng.integers(0, 256, (64, 64, 3), dtype=np.uint8))
+
+    @pytest.mark.parametrize(
+        ("fmt", "pil_format"), [("jpeg", "JPEG"), ("webp", "WEBP"), ("png", "PNG")]
+    )
+    def test_encodes_requested_format(self, image, fmt, pil_format):
+        from peekapi.screenshot import EncodeOptions, encode_image
+
+        data = encode_image(image, EncodeOptions(format=fmt))
+
+        assert Image.open(io.BytesIO(data)).format == pil_format
+
+    def test_png_is_lossless(self, image):
+        from peekapi.screenshot import EncodeOptions, encode_image
+
+        data = encode_image(image, EncodeOptions(format="png"))
+
+        assert Image.open(io.BytesIO(data)).tobytes() == image.tobytes()
+
+    def test_quality_affects_size(self, image):
+        from peekapi.screenshot import EncodeOptions, encode_image
+
+        high = encode_image(image, EncodeOptions(quality=95))
+        low = encode_image(image, EncodeOptions(quality=30))
+
+        assert len(low) < len(high)
+
+    @pytest.mark.parametrize(
+        ("subsampling", "expected"), [("444", 0), ("422", 1), ("420", 2)]
+    )
+    def test_jpeg_subsampling(self, image, subsampling, expected):
+        from PIL import JpegImagePlugin
+
+        from peekapi.screenshot import EncodeOptions, encode_image
+
+        data = encode_image(image, EncodeOptions(subsampling=subsampling))
+
+        jpeg = Image.open(io.BytesIO(data))
+        assert isinstance(jpeg, JpegImagePlugin.JpegImageFile)
+        assert JpegImagePlugin.get_sampling(jpeg) == expected
+
+    def test_media_type(self):
+        from peekapi.screenshot import EncodeOptions
+
+        assert EncodeOptions(format="webp").media_type == "image/webp"
+
+    def test_screenshot_uses_encoding(self, mock_mss):
+        from peekapi.screenshot import EncodeOptions, screenshot
+
+        result = screenshot(0, True, encoding=EncodeOptions(format="png"))
+
+        assert result[:4] == b"\x89PNG"
+
+
+class TestEncodeWithinBudget:
+    """字节预算编码测试"""
+
+    @pytest.fixture
+    def image(self):
+        from peekapi.backend import SyntheticBackend
+        from peekapi.screenshot import frame_to_image, size_model
+
+        size_model.clear()
+        backend = SyntheticBackend([(0, 0, 640, 400)])
+        return frame_to_image(backend.grab(backend.monitors[1])).copy()
+
+    @staticmethod
+    def sizes(image, qualities):
+        from peekapi.screenshot import EncodeOptions, encode_image
+
+        return {
+            q: len(encode_image(image, EncodeOptions(quality=q))) for q in qualities
+        }
+
+    def test_fits_budget_closely(self, image):
+        """输出不超过预算，且有限次编码内接近预算"""
+        from peekapi.screenshot import EncodeOptions, encode_image
+
+        sizes = self.sizes(image, [50, 51])
+        budget = (sizes[50] + sizes[51]) // 2
+
+        data = encode_image(image, EncodeOptions(max_bytes=budget))
+
+        assert budget * 0.9 <= len(data) <= budget
+
+    def test_quality_is_upper_bound(self, image):
+        """预算充足时不超过请求的质量"""
+        from peekapi.screenshot import EncodeOptions, encode_image
+
+        data = encode_image(image, EncodeOptions(quality=60, max_bytes=10**9))
+
+        assert len(data) == self.sizes(image, [60])[60]
+
+    @staticmethod
+    def full_encodes(image, options):
+        """编码并返回完整分辨率编码的次数"""
+        from peekapi import screenshot
+        from peekapi.screenshot import encode_image
+
+        count = 0
+        original = screenshot._encode
+
+        def counting(img, encode_options):
+            nonlocal count
+            if img.size == image.size:
+                count += 1
+            return original(img, encode_options)
+
+        with patch("peekapi.screenshot._encode", side_effect=counting):
+            encode_image(image, options)
+        return count
+
+    def test_limits_full_resolution_encodes(self, image):
+        """完整分辨率编码次数不超过上限"""
+        from peekapi.screenshot import BUDGET_MAX_ENCODES, EncodeOptions
+
+        budget = self.sizes(image, [70])[70]
+
+        count = self.full_encodes(image, EncodeOptions(max_bytes=budget))
+
+        assert 1 <= count <= BUDGET_MAX_ENCODES
+
+    def test_same_content_reuses_size_model(self, image):
+        """同一画面再次编码时使用按画面缓存的体积比例，一次完整编码即可"""
+        from peekapi.screenshot import EncodeOptions
+
+        options = EncodeOptions(max_bytes=self.sizes(image, [80])[80])
+        self.full_encodes(image, options)
+
+        assert self.full_encodes(image, options) == 1
+
+    def test_budget_too_small_returns_smallest(self, image):
+        """最低质量也超出预算时返回尝试过的最小结果"""
+        from peekapi.screenshot import EncodeOptions, encode_image
+
+        data = encode_image(image, EncodeOptions(max_bytes=1))
+
+        assert data[:2] == b"\xff\xd8"
+        assert len(data) <= self.sizes(image, [10])[10]
+
+    def test_png_ignores_budget(self, image):
+        """PNG 无损，不受字节预算影响"""
+        from peekapi.screenshot import EncodeOptions, encode_image
+
+        data = encode_image(image, EncodeOptions(format="png", max_bytes=1))
+
+        assert Image.open(io.BytesIO(data)).tobytes() == image.tobytes()
+
+    def test_webp_within_budget(self, image):
+        from peekapi.screenshot import EncodeOptions, encode_image
+
+        full = encode_image(image, EncodeOptions(format="webp", quality=95))
+        data = encode_image(
+            image, EncodeOptions(format="webp", max_bytes=len(full) // 2)
+        )
+
+        assert Image.open(io.BytesIO(data)).format == "WEBP"
+        assert len(data) <= len(full) // 2
+
+
+class TestFrameToImage:
+    """BGRA 截图转换测试"""
+
+    def test_converts_bgra_to_rgb(self):
+        """BGRA 像素按通道重排为 RGB"""
+        from mss.screenshot import ScreenShot
+
+        from peekapi.screenshot import frame_to_image
+
+        # 两个像素：蓝色 (B=255) 和 (R=10, G=20, B=30)
+        raw = bytearray(b"\xff\x00\x00\xff" + b"\x1e\x14\x0a\xff")
+        frame = ScreenShot.from_size(raw, 2, 1)
+
+        img = frame_to_image(frame)
+
+        assert img.mode == "RGB"
+        assert img.size == (2, 1)
+        assert img.getpixel((0, 0)) == (0, 0, 255)
+        assert img.getpixel((1, 0)) == (10, 20, 30)
+
+    def test_matches_mss_rgb(self):
+        """转换结果与 mss 的 rgb 属性一致"""
+        from mss.screenshot import ScreenShot
+
+        from peekapi.screenshot import frame_to_image
+
+        rng = np.random.default_rng(0)
+        raw = bytearray(rng.integers(0, 256, 64 * 48 * 4, dtype=np.uint8).tobytes())
+        frame = ScreenShot.from_size(raw, 64, 48)
+
+        img = frame_to_image(frame)
+
+        assert img.tobytes() == frame.rgb
+
+    def test_does_not_use_rgb_property(self, mock_mss):
+        """截图流程不访问 mss 的 rgb 属性"""
+        from peekapi.screenshot import screenshot
+
+        type(mock_mss.grab.return_value).rgb = PropertyMock(
+            side_effect=AssertionError("不应生成中间 RGB 副本")
+        )
+
+        result = screenshot(radius=0, main_screen_only=True)
+
+        assert result[:3] == b"\xff\xd8\xff"
+
+
+class TestFrameFingerprint:
+    """截图指纹测试"""
+
+    def test_same_pixels_same_fingerprint(self):
+        from mss.screenshot import ScreenShot
+
+        from peekapi.screenshot import frame_fingerprint
+
+        raw = bytes(range(16))
+        first = ScreenShot.from_size(bytearray(raw), 2, 2)
+        second = ScreenShot.from_size(bytearray(raw), 2, 2)
+
+        assert frame_fingerprint(first) == frame_fingerprint(second)
+
+    def test_single_pixel_change_changes_fingerprint(self):
+        from mss.screenshot import ScreenShot
+
+        from peekapi.screenshot import frame_fingerprint
+
+        raw = bytearray(64 * 64 * 4)
+        before = frame_fingerprint(ScreenShot.from_size(bytearray(raw), 64, 64))
+        raw[-2] = 1
+
+        assert frame_fingerprint(ScreenShot.from_size(raw, 64, 64)) != before
+
+    def test_size_is_part_of_fingerprint(self):
+        from mss.screenshot import ScreenShot
+
+        from peekapi.screenshot import frame_fingerprint
+
+        raw = bytearray(16)
+        wide = ScreenShot.from_size(bytearray(raw), 4, 1)
+        tall = ScreenShot.from_size(bytearray(raw), 1, 4)
+
+        assert frame_fingerprint(wide) != frame_fingerprint(tall)
+
+
+def _monitor(left, top, width, height):
+    return {"left": left, "top": top, "width": width, "height": height}
+
+
+class TestPackLayout:
+    """紧凑拼接布局测试"""
+
+    def test_side_by_side_keeps_original_layout(self):
+        from peekapi.screenshot import pack_layout
+
+        monitors = [_monitor(0, 0, 1920, 1080), _monitor(1920, 0, 1920, 1080)]
+
+        assert pack_layout(monitors) == ((3840, 1080), [(0, 0), (1920, 0)])
+
+    def test_offset_layout_aligned_into_row(self):
+        from peekapi.screenshot import pack_layout
+
+        monitors = [_monitor(1920, 540, 1920, 1080), _monitor(0, 0, 1920, 1080)]
+
+        size, offsets = pack_layout(monitors)
+
+        assert size == (3840, 1080)
+        assert offsets == [(1920, 0), (0, 0)]
+
+    def test_l_shaped_layout_drops_empty_quadrant(self):
+        from peekapi.screenshot import pack_layout
+
+        monitors = [
+            _monitor(0, 0, 1920, 1080),
+            _monitor(1920, 0, 1920, 1080),
+            _monitor(0, 1080, 1920, 1080),
+        ]
+
+        size, _ = pack_layout(monitors)
+
+        assert size[0] * size[1] == 3 * 1920 * 1080
+
+    def test_vertical_stack_packed_into_column(self):
+        from peekapi.screenshot import pack_layout
+
+        monitors = [_monitor(0, -1080, 1920, 1080), _monitor(960, 0, 1920, 1440)]
+
+        assert pack_layout(monitors) == ((1920, 2520), [(0, 0), (0, 1080)])
+
+    def test_negative_coordinates_normalised(self):
+        from peekapi.screenshot import pack_layout
+
+        monitors = [_monitor(-1920, 0, 1920, 1080), _monitor(0, 0, 1920, 1080)]
+
+        assert pack_layout(monitors) == ((3840, 1080), [(0, 0), (1920, 0)])
+
+    def test_empty_layout(self):
+        from peekapi.screenshot import pack_layout
+
+        assert pack_layout([]) == ((0, 0), [])
+
+
+class TestCapturePacked:
+    """紧凑拼接截图测试"""
+
+    def test_monitors_pasted_at_packed_offsets(self):
+        from mss.screenshot import ScreenShot
+
+        from peekapi.screenshot import PACKED_SCREEN, capture, frame_to_image
+
+        frames = {
+            1: ScreenShot.from_size(bytearray(b"\x00\x00\xff\xff" * 4), 2, 2),
+            2: ScreenShot.from_size(bytearray(b"\xff\x00\x00\xff" * 2), 1, 2),
+        }
+        worker = MagicMock()
+        worker.monitors.return_value = [
+            _monitor(0, 0, 3, 4),
+            _monitor(0, 0, 2, 2),
+            _monitor(2, 2, 1, 2),
+        ]
+        worker.grab.side_effect = frames.__getitem__
+
+        with patch("peekapi.screenshot.capture_worker", worker):
+            frame = capture(PACKED_SCREEN)
+
+        assert frame.size == (3, 2)
+        img = frame_to_image(frame)
+        assert img.getpixel((0, 0)) == (255, 0, 0)
+        assert img.getpixel((1, 1)) == (255, 0, 0)
+        assert img.getpixel((2, 0)) == (0, 0, 255)
+        assert img.getpixel((2, 1)) == (0, 0, 255)
+
+    def test_default_monitor_pack_screens(self):
+        from peekapi.screenshot import (
+            PACKED_SCREEN,
+            PRIMARY_MONITOR,
+            VIRTUAL_SCREEN,
+            default_monitor,
+        )
+
+        assert default_monitor(False) == VIRTUAL_SCREEN
+        assert default_monitor(False, pack_screens=True) == PACKED_SCREEN
+        assert default_monitor(True, pack_screens=True) == PRIMARY_MONITOR
+
+
+class TestQuantizeRadius:
+    """模糊半径量化测试"""
+
+    @pytest.mark.parametrize(
+        ("radius", "step", "expected"),
+        [
+            (3.2, 0, 3.2),
+            (3.2, 0.5, 3.5),
+            (3.5, 0.5, 3.5),
+            (0.3, 0.1, 0.30000000000000004),
+            (10.1, 5, 15),
+            (0, 2, 0),
+            (-1, 0, 0),
+            (1e308, 0, 10000),
+            (1e308, 0.5, 10000),
+            (1e308, 3, 10002),
+            (5, 1e-320, 5),
+        ],
+    )
+    def test_rounds_up_to_step(self, radius, step, expected):
+        from peekapi.screenshot import quantize_radius
+
+        assert quantize_radius(radius, step) == expected
+
+    def test_nearby_radii_share_bucket(self):
+        from peekapi.screenshot import quantize_radius
+
+        assert len({quantize_radius(4 + i / 100, 1) for i in range(1, 100)}) == 1
+
+
+class TestFastBlur:
+    """快速模糊测试"""
+
+    # 与 GaussianBlur 的逐像素差异上限（0-255 灰度级）
+    MEAN_DIFF_BOUND = 1.0
+    MAX_DIFF_BOUND = 8
+
+    @pytest.fixture
+    def desktop_image(self):
+        """类桌面测试图：渐变背景、噪声照片区域和文字"""
+        rng = np.random.default_rng(0)
+        width, height = 640, 360
+        arr = np.zeros((height, width, 3), dtype=np.uint8)
+        arr[:] = np.linspace(0, 255, width, dtype=np.uint8)[None, :, None]
+        arr[40:160, 60:300] = rng.integers(0, 256, (120, 240, 3), dtype=np.uint8)
+        img = Image.fromarray(arr)
+        draw = ImageDraw.Draw(img)
+        for y in range(200, 350, 14):
+            draw.text((10, y), "The quick brown fox jumps 0123456789" * 3, fill=0)
+        return img
+
+    @pytest.mark.parametrize("radius", [5, 8, 12, 20, 40, 80])
+    def test_fast_blur_close_to_gaussian(self, desktop_image, radius):
+        """快速模糊与高斯模糊的视觉差异在上限内"""
+        from peekapi.screenshot import fast_blur
+
+        expected = desktop_image.filter(ImageFilter.GaussianBlur(radius=radius))
+        result = fast_blur(desktop_image, radius)
+
+        diff = np.abs(
+            np.asarray(expected, dtype=np.int16) - np.asarray(result, dtype=np.int16)
+        )
+        assert result.size == desktop_image.size
+        assert diff.mean() < self.MEAN_DIFF_BOUND
+        assert diff.max() <= self.MAX_DIFF_BOUND
+
+    def test_fast_blur_small_radius_uses_gaussian(self, desktop_image):
+        """半径过小无法缩小时直接使用高斯模糊"""
+        from peekapi.screenshot import fast_blur
+
+        result = fast_blur(desktop_image, 3)
+        expected = desktop_image.filter(ImageFilter.GaussianBlur(radius=3))
+
+        assert result.tobytes() == expected.tobytes()
+
+    def test_fast_blur_filters_reduced_image(self, desktop_image):
+        """大半径时在缩小后的图像上做模糊"""
+        from peekapi.screenshot import fast_blur
+
+        filtered_sizes = []
+        original_filter = Image.Image.filter
+
+        def record_filter(img, *args, **kwargs):
+            filtered_sizes.append(img.size)
+            return original_filter(img, *args, **kwargs)
+
+        with patch("PIL.Image.Image.filter", autospec=True, side_effect=record_filter):
+            fast_blur(desktop_image, 20)
+
+        assert filtered_sizes == [(64, 36)]
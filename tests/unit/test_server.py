@@ -1,8 +1,14 @@
 """FastAPI 服务器 API 端点测试"""
 
 import io
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
 from unittest.mock import patch
 
+import numpy as np
 import pytest
 from fastapi.testclient import TestClient
 
@@ -13,8 +19,29 @@ class TestServerRoutes:
     @pytest.fixture
     def app_client(self):
         """创建 FastAPI 测试客户端"""
+        from peekapi.cache import FrameCache
+        from peekapi.delta import DeltaStore
+        from peekapi.history import FrameHistory
+        from peekapi.record import AudioClip
+
+        frame_ids = itertools.count()
+
+        def fake_capture(monitor):
+            # 默认每次截图画面都不同
+            frame_id = next(frame_ids).to_bytes(4, "little")
+            return SimpleNamespace(raw=bytearray(frame_id), size=(1, 1))
+
         # Mock 依赖模块
-        with patch("peekapi.server.recorder") as mock_recorder:
+        with (
+            patch("peekapi.server.screen_cache", FrameCache(max_bytes=1024 * 1024)),
+            patch(
+                "peekapi.server.screen_history", FrameHistory(max_bytes=1024 * 1024)
+            ) as history,
+            patch("peekapi.server.delta_store", DeltaStore(max_bytes=1024 * 1024)),
+            patch("peekapi.server.audio_cache", FrameCache(max_bytes=1024 * 1024)),
+            patch("peekapi.server.capture", side_effect=fake_capture) as mock_capture,
+            patch("peekapi.server.recorder") as mock_recorder,
+        ):
             with patch("peekapi.server.config") as mock_config:
                 # 设置默认配置
                 mock_config.basic.is_public = True
@@ -23,11 +50,21 @@ class TestServerRoutes:
                 mock_config.basic.port = 8000
                 mock_config.screenshot.radius_threshold = 10
                 mock_config.screenshot.main_screen_only = True
+                mock_config.screenshot.pack_screens = False
+                mock_config.screenshot.blur_mode = "gaussian"
+                mock_config.screenshot.format = "jpeg"
+                mock_config.screenshot.quality = 95
+                mock_config.screenshot.subsampling = "420"
+                mock_config.screenshot.max_bytes = 0
+                mock_config.screenshot.radius_step = 0
 
                 # Mock recorder
-                mock_audio = io.BytesIO(b"RIFF" + b"\x00" * 40)  # 简化的 WAV
-                mock_audio.seek(0)
-                mock_recorder.get_audio.return_value = mock_audio
+                mock_config.record.format = "wav"
+                mock_config.record.compression_level = 0.5
+                mock_recorder.rate = 44100
+                mock_recorder.clip.return_value = AudioClip(
+                    np.arange(1000, dtype=np.int16), start=0, generation=1
+                )
 
                 from peekapi.server import app
 
@@ -37,6 +74,8 @@ class TestServerRoutes:
                     "client": client,
                     "config": mock_config,
                     "recorder": mock_recorder,
+                    "capture": mock_capture,
+                    "history": history,
                 }
 
     # ============ /check 端点测试 ============
@@ -61,17 +100,381 @@ class TestServerRoutes:
         """公开模式下 /screen 返回图片"""
         mock_img_data = b"\xff\xd8\xff" + b"\x00" * 100  # JPEG 魔数
 
-        with patch("peekapi.server.screenshot", return_value=mock_img_data):
+        with patch("peekapi.server.render", return_value=mock_img_data):
             response = app_client["client"].get("/screen")
 
         assert response.status_code == 200
         assert response.headers["content-type"] == "image/jpeg"
 
+    def test_screen_concurrent_requests_share_one_capture(self, app_client):
+        """参数相同的并发截图请求只截图编码一次"""
+        from peekapi.screenshot import EncodeOptions
+        from peekapi.server import screen_flight
+
+        mock_img_data = b"\xff\xd8\xff" + b"\x00" * 100
+        release = threading.Event()
+        calls = []
+
+        def slow_render(frame, radius, *_args):
+            calls.append(radius)
+            release.wait(timeout=5)
+            return mock_img_data
+
+        with (
+            patch("peekapi.server.render", side_effect=slow_render),
+            ThreadPoolExecutor(max_workers=4) as pool,
+        ):
+            futures = [
+                pool.submit(app_client["client"].get, "/screen?r=15") for _ in range(4)
+            ]
+            deadline = time.monotonic() + 5
+            while screen_flight.waiters((15.0, 1, None, EncodeOptions())) < 3:
+                assert time.monotonic() < deadline, "并发请求未被合并"
+                time.sleep(0.001)
+            release.set()
+            responses = [future.result(timeout=5) for future in futures]
+
+        assert calls == [15.0]
+        assert all(response.status_code == 200 for response in responses)
+        assert all(response.content == mock_img_data for response in responses)
+
+    def test_screen_different_radius_not_shared(self, app_client):
+        """不同模糊半径的请求分别截图"""
+        mock_img_data = b"\xff\xd8\xff" + b"\x00" * 100
+
+        with patch(
+            "peekapi.server.render", return_value=mock_img_data
+        ) as mock_screenshot:
+            app_client["client"].get("/screen?r=15")
+            app_client["client"].get("/screen?r=20")
+
+        assert [c.args[1] for c in mock_screenshot.call_args_list] == [15.0, 20.0]
+
+    def test_screen_max_age_serves_cached_frame(self, app_client):
+        """max_age_ms 内的重复请求直接返回缓存帧"""
+        mock_img_data = b"\xff\xd8\xff" + b"\x00" * 100
+
+        with patch(
+            "peekapi.server.render", return_value=mock_img_data
+        ) as mock_screenshot:
+            first = app_client["client"].get("/screen?r=15")
+            second = app_client["client"].get("/screen?r=15&max_age_ms=60000")
+
+        assert mock_screenshot.call_count == 1
+        assert second.status_code == 200
+        assert second.headers["content-type"] == "image/jpeg"
+        assert second.content == first.content
+
+    def test_screen_without_max_age_always_captures(self, app_client):
+        """未指定 max_age_ms 时每次都重新截图"""
+        mock_img_data = b"\xff\xd8\xff" + b"\x00" * 100
+
+        with patch(
+            "peekapi.server.render", return_value=mock_img_data
+        ) as mock_screenshot:
+            app_client["client"].get("/screen?r=15")
+            app_client["client"].get("/screen?r=15")
+
+        assert mock_screenshot.call_count == 2
+
+    def test_screen_max_age_zero_captures_again(self, app_client):
+        """max_age_ms=0 不接受任何已有缓存"""
+        mock_img_data = b"\xff\xd8\xff" + b"\x00" * 100
+
+        with patch(
+            "peekapi.server.render", return_value=mock_img_data
+        ) as mock_screenshot:
+            app_client["client"].get("/screen?r=15")
+            time.sleep(0.01)
+            app_client["client"].get("/screen?r=15&max_age_ms=0")
+
+        assert mock_screenshot.call_count == 2
+
+    def test_screen_cache_keyed_by_radius(self, app_client):
+        """不同模糊半径不共享缓存"""
+        mock_img_data = b"\xff\xd8\xff" + b"\x00" * 100
+
+        with patch(
+            "peekapi.server.render", return_value=mock_img_data
+        ) as mock_screenshot:
+            app_client["client"].get("/screen?r=15")
+            app_client["client"].get("/screen?r=20&max_age_ms=60000")
+
+        assert mock_screenshot.call_count == 2
+
+    def test_screen_negative_max_age_rejected(self, app_client):
+        """负数 max_age_ms 返回 422"""
+        response = app_client["client"].get("/screen?max_age_ms=-1")
+
+        assert response.status_code == 422
+
+    def test_screen_cache_not_served_in_private_mode(self, app_client):
+        """私密模式下即使有缓存也拒绝请求"""
+        mock_img_data = b"\xff\xd8\xff" + b"\x00" * 100
+
+        with patch("peekapi.server.render", return_value=mock_img_data):
+            app_client["client"].get("/screen?r=15")
+        app_client["config"].basic.is_public = False
+
+        response = app_client["client"].get("/screen?r=15&max_age_ms=60000")
+
+        assert response.status_code == 403
+
+    def test_screen_cache_still_requires_api_key(self, app_client):
+        """缓存命中前仍校验高清图密钥"""
+        app_client["config"].basic.api_key = "secret123"
+        mock_img_data = b"\xff\xd8\xff" + b"\x00" * 100
+
+        with patch("peekapi.server.render", return_value=mock_img_data):
+            app_client["client"].get("/screen?r=5&k=secret123")
+
+        response = app_client["client"].get("/screen?r=5&max_age_ms=60000")
+
+        assert response.status_code == 401
+
+    def test_screen_output_size_params(self, app_client):
+        """验证输出尺寸参数传递"""
+        from peekapi.screenshot import OutputSize
+
+        mock_img_data = b"\xff\xd8\xff" + b"\x00" * 100
+
+        with patch(
+            "peekapi.server.render", return_value=mock_img_data
+        ) as mock_screenshot:
+            response = app_client["client"].get("/screen?r=15&max_side=320&w=200")
+
+        assert response.status_code == 200
+        assert mock_screenshot.call_args[0][3] == OutputSize(max_side=320, width=200)
+
+    def test_screen_without_size_params_full_resolution(self, app_client):
+        """未指定尺寸参数时输出原始分辨率"""
+        mock_img_data = b"\xff\xd8\xff" + b"\x00" * 100
+
+        with patch(
+            "peekapi.server.render", return_value=mock_img_data
+        ) as mock_screenshot:
+            app_client["client"].get("/screen?r=15")
+
+        assert mock_screenshot.call_args[0][3] is None
+
+    def test_screen_cache_keyed_by_output_size(self, app_client):
+        """不同输出尺寸不共享缓存"""
+        mock_img_data = b"\xff\xd8\xff" + b"\x00" * 100
+
+        with patch(
+            "peekapi.server.render", return_value=mock_img_data
+        ) as mock_screenshot:
+            app_client["client"].get("/screen?r=15&max_side=320")
+            app_client["client"].get("/screen?r=15&max_side=640&max_age_ms=60000")
+            app_client["client"].get("/screen?r=15&max_side=320&max_age_ms=60000")
+
+        assert mock_screenshot.call_count == 2
+
+    @pytest.mark.parametrize("param", ["max_side", "w", "h"])
+    def test_screen_invalid_output_size_rejected(self, app_client, param):
+        """非正数输出尺寸返回 422"""
+        response = app_client["client"].get(f"/screen?{param}=0")
+
+        assert response.status_code == 422
+
+    def test_screen_defaults_to_configured_jpeg(self, app_client):
+        """默认使用配置的 JPEG 编码参数"""
+        from peekapi.screenshot import EncodeOptions
+
+        mock_img_data = b"\xff\xd8\xff" + b"\x00" * 100
+
+        with patch(
+            "peekapi.server.render", return_value=mock_img_data
+        ) as mock_screenshot:
+            response = app_client["client"].get("/screen?r=15")
+
+        assert mock_screenshot.call_args[0][4] == EncodeOptions("jpeg", 95, "420")
+        assert response.headers["vary"] == "Accept"
+
+    def test_screen_max_bytes_param(self, app_client):
+        """max_bytes 参数写入编码参数，未指定时使用配置"""
+        with patch("peekapi.server.render", return_value=b"\xff\xd8") as mock_render:
+            app_client["client"].get("/screen?r=15&max_bytes=200000")
+            assert mock_render.call_args[0][4].max_bytes == 200000
+
+            app_client["config"].screenshot.max_bytes = 50000
+            app_client["client"].get("/screen?r=15&fmt=webp")
+            assert mock_render.call_args[0][4].max_bytes == 50000
+
+    def test_screen_radius_quantized_after_auth(self, app_client):
+        """半径按 radius_step 向上取整后渲染，鉴权仍按请求值判断"""
+        app_client["config"].basic.api_key = "secret123"
+        app_client["config"].screenshot.radius_step = 4
+
+        with patch("peekapi.server.render", return_value=b"\xff\xd8") as mock_render:
+            denied = app_client["client"].get("/screen?r=9")
+            app_client["client"].get("/screen?r=10.5")
+
+        assert denied.status_code == 401
+        assert mock_render.call_count == 1
+        assert mock_render.call_args[0][1] == 12
+
+    def test_screen_invalid_max_bytes_rejected(self, app_client):
+        response = app_client["client"].get("/screen?max_bytes=0")
+
+        assert response.status_code == 422
+
+    def test_screen_fmt_param_sets_content_type(self, app_client):
+        """fmt 参数决定输出格式和 Content-Type"""
+        with patch(
+            "peekapi.server.render", return_value=b"RIFF....WEBP"
+        ) as mock_screenshot:
+            response = app_client["client"].get("/screen?r=15&fmt=webp&q=70")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/webp"
+        encoding = mock_screenshot.call_args[0][4]
+        assert encoding.format == "webp"
+        assert encoding.quality == 70
+
+    def test_screen_accept_header_negotiates_format(self, app_client):
+        """未指定 fmt 时按 Accept 请求头协商格式"""
+        with patch("peekapi.server.render", return_value=b"\x89PNG"):
+            response = app_client["client"].get(
+                "/screen?r=15",
+                headers={"Accept": "image/webp;q=0.8, image/png, */*;q=0.1"},
+            )
+
+        assert response.headers["content-type"] == "image/png"
+
+    def test_screen_fmt_param_overrides_accept(self, app_client):
+        """fmt 参数优先于 Accept 请求头"""
+        with patch("peekapi.server.render", return_value=b"\xff\xd8\xff"):
+            response = app_client["client"].get(
+                "/screen?r=15&fmt=jpeg", headers={"Accept": "image/webp"}
+            )
+
+        assert response.headers["content-type"] == "image/jpeg"
+
+    def test_screen_subsampling_param(self, app_client):
+        """subsampling 参数传递给编码参数"""
+        with patch(
+            "peekapi.server.render", return_value=b"\xff\xd8\xff"
+        ) as mock_screenshot:
+            app_client["client"].get("/screen?r=15&subsampling=444")
+
+        assert mock_screenshot.call_args[0][4].subsampling == "444"
+
+    @pytest.mark.parametrize("query", ["fmt=gif", "q=0", "q=101", "subsampling=411"])
+    def test_screen_invalid_encoding_params_rejected(self, app_client, query):
+        """非法编码参数返回 422"""
+        response = app_client["client"].get(f"/screen?{query}")
+
+        assert response.status_code == 422
+
+    def test_screen_cache_keyed_by_format(self, app_client):
+        """不同输出格式不共享缓存"""
+        with patch(
+            "peekapi.server.render", return_value=b"\xff\xd8\xff"
+        ) as mock_screenshot:
+            app_client["client"].get("/screen?r=15&fmt=jpeg")
+            response = app_client["client"].get(
+                "/screen?r=15&fmt=webp&max_age_ms=60000"
+            )
+
+        assert mock_screenshot.call_count == 2
+        assert response.headers["content-type"] == "image/webp"
+
+    def test_screen_returns_etag(self, app_client):
+        """截图响应携带 ETag"""
+        with patch("peekapi.server.render", return_value=b"\xff\xd8\xff"):
+            response = app_client["client"].get("/screen?r=15")
+
+        assert response.status_code == 200
+        assert response.headers["etag"].startswith('"')
+
+    def test_screen_unchanged_frame_returns_304_without_encoding(self, app_client):
+        """画面未变化时 If-None-Match 返回 304，不再模糊编码"""
+        frame = SimpleNamespace(raw=bytearray(b"idle"), size=(1, 1))
+        app_client["capture"].side_effect = None
+        app_client["capture"].return_value = frame
+
+        with patch(
+            "peekapi.server.render", return_value=b"\xff\xd8\xff"
+        ) as mock_render:
+            etag = app_client["client"].get("/screen?r=15").headers["etag"]
+            response = app_client["client"].get(
+                "/screen?r=15", headers={"If-None-Match": etag}
+            )
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        assert mock_render.call_count == 1
+        assert app_client["capture"].call_count == 2
+
+    def test_screen_changed_frame_returns_new_image(self, app_client):
+        """画面变化后 If-None-Match 不命中，返回新图"""
+        with patch("peekapi.server.render", return_value=b"\xff\xd8\xff"):
+            etag = app_client["client"].get("/screen?r=15").headers["etag"]
+            response = app_client["client"].get(
+                "/screen?r=15", headers={"If-None-Match": etag}
+            )
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+    def test_screen_etag_depends_on_render_params(self, app_client):
+        """同一画面不同渲染参数的 ETag 不同"""
+        frame = SimpleNamespace(raw=bytearray(b"idle"), size=(1, 1))
+        app_client["capture"].side_effect = None
+        app_client["capture"].return_value = frame
+
+        with patch("peekapi.server.render", return_value=b"\xff\xd8\xff"):
+            etag = app_client["client"].get("/screen?r=15").headers["etag"]
+            response = app_client["client"].get(
+                "/screen?r=20", headers={"If-None-Match": etag}
+            )
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+    def test_screen_unchanged_frame_reuses_cached_encoding(self, app_client):
+        """画面未变化时即使没有 If-None-Match 也复用已编码结果"""
+        frame = SimpleNamespace(raw=bytearray(b"idle"), size=(1, 1))
+        app_client["capture"].side_effect = None
+        app_client["capture"].return_value = frame
+
+        with patch(
+            "peekapi.server.render", return_value=b"\xff\xd8\xff"
+        ) as mock_render:
+            first = app_client["client"].get("/screen?r=15")
+            second = app_client["client"].get("/screen?r=15")
+
+        assert mock_render.call_count == 1
+        assert second.content == first.content
+        assert second.headers["etag"] == first.headers["etag"]
+
+    def test_screen_cached_frame_honours_if_none_match(self, app_client):
+        """max_age_ms 命中缓存时同样支持 304"""
+        with patch("peekapi.server.render", return_value=b"\xff\xd8\xff"):
+            etag = app_client["client"].get("/screen?r=15").headers["etag"]
+        response = app_client["client"].get(
+            "/screen?r=15&max_age_ms=60000", headers={"If-None-Match": f"W/{etag}"}
+        )
+
+        assert response.status_code == 304
+        assert app_client["capture"].call_count == 1
+
+    def test_screen_if_none_match_private_mode_returns_403(self, app_client):
+        """私密模式下 If-None-Match 同样返回 403"""
+        app_client["config"].basic.is_public = False
+
+        response = app_client["client"].get("/screen", headers={"If-None-Match": "*"})
+
+        assert response.status_code == 403
+        app_client["capture"].assert_not_called()
+
     def test_screen_private_mode_returns_403(self, app_client):
         """私密模式下 /screen 返回 403"""
         app_client["config"].basic.is_public = False
 
-        with patch("peekapi.server.screenshot", return_value=b"test"):
+        with patch("peekapi.server.render", return_value=b"test"):
             response = app_client["client"].get("/screen")
 
         assert response.status_code == 403
@@ -82,19 +485,19 @@ class TestServerRoutes:
         mock_img_data = b"\xff\xd8\xff" + b"\x00" * 100
 
         with patch(
-            "peekapi.server.screenshot", return_value=mock_img_data
+            "peekapi.server.render", return_value=mock_img_data
         ) as mock_screenshot:
             app_client["client"].get("/screen?r=15")
 
             mock_screenshot.assert_called_once()
-            # 第一个参数是 radius
-            assert mock_screenshot.call_args[0][0] == 15.0
+            # 第二个参数是 radius
+            assert mock_screenshot.call_args[0][1] == 15.0
 
     def test_screen_invalid_radius_uses_default(self, app_client):
         """无效的模糊半径使用默认值 0"""
         mock_img_data = b"\xff\xd8\xff" + b"\x00" * 100
 
-        with patch("peekapi.server.screenshot", return_value=mock_img_data):
+        with patch("peekapi.server.render", return_value=mock_img_data):
             # FastAPI 会拒绝无效的 float，需要测试 422 或使用有效值
             response = app_client["client"].get("/screen?r=invalid")
 
@@ -118,7 +521,7 @@ class TestServerRoutes:
         app_client["config"].screenshot.radius_threshold = 10
         mock_img_data = b"\xff\xd8\xff" + b"\x00" * 100
 
-        with patch("peekapi.server.screenshot", return_value=mock_img_data):
+        with patch("peekapi.server.render", return_value=mock_img_data):
             response = app_client["client"].get("/screen?r=5&k=secret123")
 
         assert response.status_code == 200
@@ -129,7 +532,7 @@ class TestServerRoutes:
         app_client["config"].screenshot.radius_threshold = 10
         mock_img_data = b"\xff\xd8\xff" + b"\x00" * 100
 
-        with patch("peekapi.server.screenshot", return_value=mock_img_data):
+        with patch("peekapi.server.render", return_value=mock_img_data):
             # r=15 超过阈值，不需要 key
             response = app_client["client"].get("/screen?r=15")
 
@@ -137,7 +540,7 @@ class TestServerRoutes:
 
     def test_screen_failure_returns_500(self, app_client):
         """截图失败返回 500"""
-        with patch("peekapi.server.screenshot", return_value=None):
+        with patch("peekapi.server.render", return_value=None):
             response = app_client["client"].get("/screen")
 
         assert response.status_code == 500
@@ -148,25 +551,268 @@ class TestServerRoutes:
         mock_img_data = b"\xff\xd8\xff" + b"\x00" * 100
         app_client["config"].screenshot.main_screen_only = True
 
-        with patch(
-            "peekapi.server.screenshot", return_value=mock_img_data
-        ) as mock_screenshot:
+        with patch("peekapi.server.render", return_value=mock_img_data):
             app_client["client"].get("/screen")
 
-            # 第二个参数是 main_screen_only
-            assert mock_screenshot.call_args[0][1] is True
+            assert app_client["capture"].call_args[0][0] == 1
 
     def test_screen_main_screen_only_false(self, app_client):
         """验证 main_screen_only=False 参数传递"""
         mock_img_data = b"\xff\xd8\xff" + b"\x00" * 100
         app_client["config"].screenshot.main_screen_only = False
 
-        with patch(
-            "peekapi.server.screenshot", return_value=mock_img_data
-        ) as mock_screenshot:
+        with patch("peekapi.server.render", return_value=mock_img_data):
             app_client["client"].get("/screen")
 
-            assert mock_screenshot.call_args[0][1] is False
+            assert app_client["capture"].call_args[0][0] == 0
+
+    def test_screen_monitor_param_selects_monitor(self, app_client):
+        """m 参数选择单个显示器，优先于 main_screen_only"""
+        with patch("peekapi.server.render", return_value=b"\xff\xd8\xff"):
+            response = app_client["client"].get("/screen?r=15&m=2")
+
+        assert response.status_code == 200
+        assert app_client["capture"].call_args[0][0] == 2
+
+    def test_screen_packed_monitor_param(self, app_client):
+        """m=packed 截取紧凑拼接的全部显示器"""
+        from peekapi.screenshot import PACKED_SCREEN
+
+        with patch("peekapi.server.render", return_value=b"\xff\xd8\xff"):
+            response = app_client["client"].get("/screen?r=15&m=packed")
+
+        assert response.status_code == 200
+        assert app_client["capture"].call_args[0][0] == PACKED_SCREEN
+
+    def test_screen_pack_screens_config_default(self, app_client):
+        """pack_screens 开启且截取全部显示器时默认紧凑拼接"""
+        from peekapi.screenshot import PACKED_SCREEN
+
+        app_client["config"].screenshot.main_screen_only = False
+        app_client["config"].screenshot.pack_screens = True
+
+        with patch("peekapi.server.render", return_value=b"\xff\xd8\xff"):
+            app_client["client"].get("/screen?r=15")
+
+        assert app_client["capture"].call_args[0][0] == PACKED_SCREEN
+
+    def test_screen_unknown_monitor_returns_404(self, app_client):
+        """不存在的显示器返回 404"""
+        app_client["capture"].side_effect = IndexError("list index out of range")
+
+        response = app_client["client"].get("/screen?r=15&m=9")
+
+        assert response.status_code == 404
+        assert "显示器不存在" in response.content.decode("utf-8")
+
+    def test_screen_roi_param_captures_region(self, app_client):
+        """roi 参数只截取虚拟桌面上的指定区域"""
+        with patch("peekapi.server.render", return_value=b"\xff\xd8\xff"):
+            response = app_client["client"].get("/screen?r=15&roi=-100,20,640,480")
+
+        assert response.status_code == 200
+        assert app_client["capture"].call_args[0][0] == (-100, 20, 640, 480)
+
+    @pytest.mark.parametrize(
+        "query", ["roi=0,0,0,100", "roi=0,0,100", "roi=a,0,10,10", "roi=0,0,10,10&m=1"]
+    )
+    def test_screen_invalid_roi_rejected(self, app_client, query):
+        """非法区域或与 m 同时指定时返回 422"""
+        response = app_client["client"].get(f"/screen?r=15&{query}")
+
+        assert response.status_code == 422
+
+    def test_screen_roi_outside_desktop_returns_404(self, app_client):
+        """区域不在桌面范围内返回 404"""
+        app_client["capture"].side_effect = IndexError("截图区域不在桌面范围内")
+
+        response = app_client["client"].get("/screen?r=15&roi=99999,0,10,10")
+
+        assert response.status_code == 404
+        assert "截图区域不在桌面范围内" in response.content.decode("utf-8")
+
+    @pytest.mark.parametrize("m", ["-1", "main", "1.5"])
+    def test_screen_invalid_monitor_param_rejected(self, app_client, m):
+        """非法 m 参数返回 422"""
+        response = app_client["client"].get(f"/screen?m={m}")
+
+        assert response.status_code == 422
+
+    def test_screen_all_monitors_multipart(self, app_client):
+        """m=all 逐个显示器截图，以 multipart/mixed 返回"""
+        monitors = [{"left": 0, "top": 0, "width": 300, "height": 100}] * 3
+        barrier = threading.Barrier(2, timeout=5)
+
+        def parallel_render(frame, radius, *_args):
+            # 两个显示器的编码必须同时进行才能通过屏障
+            barrier.wait()
+            return b"img" + bytes(frame.raw)
+
+        with (
+            patch("peekapi.server.capture_worker") as mock_worker,
+            patch("peekapi.server.render", side_effect=parallel_render),
+        ):
+            mock_worker.monitors.return_value = monitors
+            response = app_client["client"].get("/screen?r=15&m=all")
+
+        assert response.status_code == 200
+        content_type = response.headers["content-type"]
+        assert content_type.startswith("multipart/mixed; boundary=")
+        boundary = content_type.split("boundary=")[1]
+        parts = response.content.split(f"--{boundary}".encode())[1:-1]
+        assert len(parts) == 2
+        assert b'name="monitor-1"' in parts[0]
+        assert b'name="monitor-2"' in parts[1]
+        assert all(b"Content-Type: image/jpeg" in part for part in parts)
+        assert sorted(c.args[0] for c in app_client["capture"].call_args_list) == [
+            1,
+            2,
+        ]
+
+    def test_screen_all_monitors_failure_returns_500(self, app_client):
+        """m=all 任一显示器失败返回 500"""
+        monitors = [{"left": 0, "top": 0, "width": 300, "height": 100}] * 3
+
+        with (
+            patch("peekapi.server.capture_worker") as mock_worker,
+            patch("peekapi.server.render", side_effect=[b"img", b""]),
+        ):
+            mock_worker.monitors.return_value = monitors
+            response = app_client["client"].get("/screen?r=15&m=all")
+
+        assert response.status_code == 500
+
+    def test_screen_all_monitors_requires_api_key(self, app_client):
+        """m=all 同样校验高清图密钥"""
+        app_client["config"].basic.api_key = "secret123"
+
+        response = app_client["client"].get("/screen?r=0&m=all")
+
+        assert response.status_code == 401
+        app_client["capture"].assert_not_called()
+
+    # ============ /screen/monitors 端点测试 ============
+
+    # ============ /screen/delta 端点测试 ============
+
+    @staticmethod
+    def delta_tiles(response):
+        """解析增量截图响应中各区域的坐标"""
+        return [
+            tuple(int(v) for v in line.split(b": ")[1].split(b","))
+            for line in response.content.split(b"\r\n")
+            if line.startswith(b"X-Tile: ")
+        ]
+
+    def test_screen_delta_without_since_returns_full_frame(self, app_client):
+        """未指定 since 时返回覆盖整个画面的单个区域"""
+        response = app_client["client"].get("/screen/delta?r=15")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("multipart/mixed")
+        assert response.headers["x-frame-id"]
+        assert response.headers["x-frame-size"] == "1x1"
+        assert "x-delta-base" not in response.headers
+        assert self.delta_tiles(response) == [(0, 0, 1, 1)]
+
+    def test_screen_delta_since_returns_changed_tiles(self, app_client):
+        """携带已持有的帧号时返回相对该帧的增量"""
+        from peekapi.screenshot import MEDIA_TYPES
+
+        first = app_client["client"].get("/screen/delta?r=15")
+        frame_id = first.headers["x-frame-id"]
+
+        response = app_client["client"].get(f"/screen/delta?r=15&since={frame_id}")
+
+        assert response.status_code == 200
+        assert response.headers["x-delta-base"] == frame_id
+        assert int(response.headers["x-frame-id"]) > int(frame_id)
+        assert self.delta_tiles(response) == [(0, 0, 1, 1)]
+        assert MEDIA_TYPES["jpeg"].encode() in response.content
+
+    def test_screen_delta_unchanged_returns_304(self, app_client):
+        """画面与 since 帧相同时返回 304"""
+        app_client["capture"].side_effect = lambda monitor: SimpleNamespace(
+            raw=bytearray(4), size=(1, 1)
+        )
+        first = app_client["client"].get("/screen/delta?r=15")
+        frame_id = first.headers["x-frame-id"]
+
+        response = app_client["client"].get(f"/screen/delta?r=15&since={frame_id}")
+
+        assert response.status_code == 304
+        assert response.headers["x-frame-id"] == frame_id
+
+    def test_screen_delta_unknown_since_returns_full_frame(self, app_client):
+        response = app_client["client"].get("/screen/delta?r=15&since=999999")
+
+        assert response.status_code == 200
+        assert "x-delta-base" not in response.headers
+        assert self.delta_tiles(response) == [(0, 0, 1, 1)]
+
+    def test_screen_delta_other_monitor_returns_full_frame(self, app_client):
+        """since 属于其他显示器时不做增量"""
+        first = app_client["client"].get("/screen/delta?r=15&m=1")
+        frame_id = first.headers["x-frame-id"]
+
+        response = app_client["client"].get(f"/screen/delta?r=15&m=2&since={frame_id}")
+
+        assert "x-delta-base" not in response.headers
+
+    def test_screen_delta_private_mode_returns_403(self, app_client):
+        app_client["config"].basic.is_public = False
+
+        response = app_client["client"].get("/screen/delta?r=15")
+
+        assert response.status_code == 403
+
+    def test_screen_delta_requires_key_for_low_radius(self, app_client):
+        app_client["config"].basic.api_key = "secret"
+
+        response = app_client["client"].get("/screen/delta?r=1")
+
+        assert response.status_code == 401
+
+    def test_screen_delta_unknown_monitor_returns_404(self, app_client):
+        app_client["capture"].side_effect = IndexError("list index out of range")
+
+        response = app_client["client"].get("/screen/delta?r=15&m=9")
+
+        assert response.status_code == 404
+
+    def test_screen_monitors_lists_layout(self, app_client):
+        """/screen/monitors 返回显示器布局"""
+        monitors = [
+            {"left": 0, "top": 0, "width": 3840, "height": 1080},
+            {"left": 0, "top": 0, "width": 1920, "height": 1080},
+            {"left": 1920, "top": 0, "width": 1920, "height": 1080},
+        ]
+        with patch("peekapi.server.capture_worker") as mock_worker:
+            mock_worker.monitors.return_value = monitors
+            response = app_client["client"].get("/screen/monitors")
+
+        assert response.status_code == 200
+        data = response.json()["monitors"]
+        assert [m["index"] for m in data] == [0, 1, 2]
+        assert [m["primary"] for m in data] == [False, True, False]
+        assert data[2] == {
+            "index": 2,
+            "left": 1920,
+            "top": 0,
+            "width": 1920,
+            "height": 1080,
+            "primary": False,
+        }
+
+    def test_screen_monitors_private_mode_returns_403(self, app_client):
+        """私密模式下 /screen/monitors 返回 403"""
+        app_client["config"].basic.is_public = False
+
+        with patch("peekapi.server.capture_worker") as mock_worker:
+            response = app_client["client"].get("/screen/monitors")
+
+        assert response.status_code == 403
+        mock_worker.monitors.assert_not_called()
 
     def test_screen_no_api_key_configured(self, app_client):
         """未配置 API Key 时，低模糊也不需要验证"""
@@ -174,7 +820,7 @@ class TestServerRoutes:
         app_client["config"].screenshot.radius_threshold = 10
         mock_img_data = b"\xff\xd8\xff" + b"\x00" * 100
 
-        with patch("peekapi.server.screenshot", return_value=mock_img_data):
+        with patch("peekapi.server.render", return_value=mock_img_data):
             # r=0 低于阈值，但无 API Key 配置
             response = app_client["client"].get("/screen?r=0")
 
@@ -186,7 +832,7 @@ class TestServerRoutes:
         app_client["config"].screenshot.radius_threshold = 10
         mock_img_data = b"\xff\xd8\xff" + b"\x00" * 100
 
-        with patch("peekapi.server.screenshot", return_value=mock_img_data):
+        with patch("peekapi.server.render", return_value=mock_img_data):
             # r=10 等于阈值，不需要 key（只有 r < threshold 才需要）
             response = app_client["client"].get("/screen?r=10")
 
@@ -216,7 +862,7 @@ class TestServerRoutes:
         app_client["config"].basic.api_key = "secret123"
         app_client["config"].screenshot.radius_threshold = 10
 
-        with patch("peekapi.server.screenshot", return_value=b"test") as mock_ss:
+        with patch("peekapi.server.render", return_value=b"test") as mock_ss:
             response = app_client["client"].get("/screen?r=nan")
 
             assert response.status_code == 401
@@ -226,7 +872,7 @@ class TestServerRoutes:
         """Inf radius 返回 422"""
         app_client["config"].basic.api_key = "secret123"
 
-        with patch("peekapi.server.screenshot", return_value=b"test") as mock_ss:
+        with patch("peekapi.server.render", return_value=b"test") as mock_ss:
             response = app_client["client"].get("/screen?r=inf")
 
             assert response.status_code == 401
@@ -236,12 +882,260 @@ class TestServerRoutes:
         """-Inf radius 返回 422"""
         app_client["config"].basic.api_key = "secret123"
 
-        with patch("peekapi.server.screenshot", return_value=b"test") as mock_ss:
+        with patch("peekapi.server.render", return_value=b"test") as mock_ss:
             response = app_client["client"].get("/screen?r=-inf")
 
             assert response.status_code == 401
             mock_ss.assert_not_called()
 
+    # ============ /screen/stream 端点测试 ============
+
+    @pytest.fixture
+    def stream_client(self, app_client):
+        """使用独立推流器的测试客户端，第 3 次渲染时切换到私密模式结束推流"""
+        from peekapi.stream import ScreenBroadcaster
+
+        broadcaster = ScreenBroadcaster(max_fps=100)
+        renders = []
+
+        def fake_encode(img, encoding):
+            renders.append((*img, encoding))
+            if len(renders) >= 3:
+                app_client["config"].basic.is_public = False
+            return b"\xff\xd8frame"
+
+        with (
+            patch("peekapi.server.screen_broadcaster", broadcaster),
+            patch("peekapi.stream.capture", return_value=object()) as mock_capture,
+            patch(
+                "peekapi.stream.prepare",
+                side_effect=lambda frame, radius, blur_mode, size: (radius, size),
+            ),
+            patch("peekapi.stream.encode_image", side_effect=fake_encode),
+        ):
+            yield {
+                **app_client,
+                "broadcaster": broadcaster,
+                "capture": mock_capture,
+                "renders": renders,
+            }
+        broadcaster.close_all()
+
+    def test_screen_stream_returns_multipart_jpeg(self, stream_client):
+        """/screen/stream 返回 MJPEG 分段流，私密模式后结束"""
+        from peekapi.screenshot import EncodeOptions, OutputSize
+
+        response = stream_client["client"].get("/screen/stream?r=12&max_side=640&q=70")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith(
+            "multipart/x-mixed-replace; boundary="
+        )
+        assert b"Content-Type: image/jpeg\r\n" in response.content
+        assert b"\xff\xd8frame" in response.content
+        radius, size, encoding = stream_client["renders"][0]
+        assert radius == 12
+        assert size == OutputSize(max_side=640)
+        assert encoding == EncodeOptions(format="jpeg", quality=70)
+
+    def test_screen_stream_unsubscribes_when_finished(self, stream_client):
+        """推流结束后观看者被移除"""
+        stream_client["client"].get("/screen/stream")
+
+        assert stream_client["broadcaster"].viewers == 0
+
+    def test_screen_stream_private_mode_returns_403(self, stream_client):
+        """私密模式下 /screen/stream 返回 403 且不启动采集"""
+        stream_client["config"].basic.is_public = False
+
+        response = stream_client["client"].get("/screen/stream")
+
+        assert response.status_code == 403
+        assert not stream_client["broadcaster"].is_running
+        stream_client["capture"].assert_not_called()
+
+    def test_screen_stream_api_key_required_for_clear_image(self, stream_client):
+        """/screen/stream 同样要求高清图密钥"""
+        stream_client["config"].basic.api_key = "secret123"
+
+        response = stream_client["client"].get("/screen/stream?r=0")
+
+        assert response.status_code == 401
+        stream_client["capture"].assert_not_called()
+
+    def test_screen_stream_nan_radius_rejected(self, stream_client):
+        """/screen/stream 拒绝非有限半径"""
+        response = stream_client["client"].get("/screen/stream?r=nan")
+
+        assert response.status_code == 401
+
+    # ============ /screen/ws 端点测试 ============
+
+    def test_screen_ws_pushes_changed_frames(self, stream_client):
+        """/screen/ws 以二进制消息推送帧，私密模式后关闭连接"""
+        from peekapi.screenshot import EncodeOptions
+
+        with (
+            patch("peekapi.stream.frame_fingerprint", side_effect=itertools.count()),
+            stream_client["client"].websocket_connect(
+                "/screen/ws?r=12&fmt=webp&q=60"
+            ) as websocket,
+        ):
+            while (message := websocket.receive())["type"] == "websocket.send":
+                assert message["bytes"] == b"\xff\xd8frame"
+
+        assert message["type"] == "websocket.close"
+
+        _, _, encoding = stream_client["renders"][0]
+        assert encoding == EncodeOptions(format="webp", quality=60)
+        assert stream_client["broadcaster"].viewers == 0
+
+    def test_screen_ws_skips_unchanged_frames(self, stream_client):
+        """画面不变时只编码和推送一次"""
+        with (
+            patch("peekapi.stream.frame_fingerprint", return_value=1),
+            stream_client["client"].websocket_connect("/screen/ws") as websocket,
+        ):
+            assert websocket.receive_bytes() == b"\xff\xd8frame"
+            deadline = time.monotonic() + 2
+            while stream_client["capture"].call_count < 5:
+                assert time.monotonic() < deadline
+                time.sleep(0.01)
+
+        assert len(stream_client["renders"]) == 1
+
+    def test_screen_ws_private_mode_rejected(self, stream_client):
+        """私密模式下以策略违规关闭连接且不启动采集"""
+        from starlette.websockets import WebSocketDisconnect
+
+        stream_client["config"].basic.is_public = False
+
+        with (
+            pytest.raises(WebSocketDisconnect) as exc_info,
+            stream_client["client"].websocket_connect("/screen/ws"),
+        ):
+            pass
+
+        assert exc_info.value.code == 1008
+        stream_client["capture"].assert_not_called()
+
+    # ============ /screen/stats 端点测试 ============
+
+    def test_screen_stats_reports_capture_and_pipeline(self, app_client):
+        """/screen/stats 返回采集统计和推流流水线各阶段统计"""
+        response = app_client["client"].get("/screen/stats")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert set(data["capture"]) >= {"avg_grab_ms", "grabs"}
+        assert [stage["name"] for stage in data["stream"]] == [
+            "capture",
+            "blur",
+            "encode",
+        ]
+        assert [stage["name"] for stage in data["history"]] == ["capture", "encode"]
+        assert set(data["stream"][0]) >= {"queue_depth", "queue_size", "avg_ms"}
+
+    def test_screen_stats_private_mode_returns_403(self, app_client):
+        """私密模式下 /screen/stats 返回 403"""
+        app_client["config"].basic.is_public = False
+
+        response = app_client["client"].get("/screen/stats")
+
+        assert response.status_code == 403
+
+    # ============ /screen/history 端点测试 ============
+
+    @staticmethod
+    def _add_history(app_client, first_seen, data=b"\xff\xd8old", last_seen=None):
+        from peekapi.history import HistoryFrame
+        from peekapi.screenshot import EncodeOptions
+
+        history = app_client["history"]
+        history.append(
+            HistoryFrame(
+                data=data,
+                encoding=EncodeOptions(),
+                fingerprint=int(first_seen),
+                first_seen=first_seen,
+                last_seen=first_seen if last_seen is None else last_seen,
+            ),
+            history.generation,
+        )
+
+    def test_screen_history_returns_frame_at_time(self, app_client):
+        """/screen/history 返回该时刻之前最近的历史帧"""
+        self._add_history(app_client, 100.0, b"\xff\xd8first", last_seen=110.0)
+        self._add_history(app_client, 120.0, b"\xff\xd8second")
+
+        with patch(
+            "peekapi.server.render_history_frame", side_effect=lambda f, r, m: f.data
+        ) as mock_render:
+            response = app_client["client"].get("/screen/history?t=115&r=15")
+
+        assert response.status_code == 200
+        assert response.content == b"\xff\xd8first"
+        assert response.headers["content-type"] == "image/jpeg"
+        assert response.headers["x-frame-first-seen"] == "100.000"
+        assert response.headers["x-frame-last-seen"] == "110.000"
+        assert mock_render.call_args[0][1] == 15.0
+
+    def test_screen_history_before_first_frame_returns_404(self, app_client):
+        """早于全部历史的时刻返回 404"""
+        self._add_history(app_client, 100.0)
+
+        response = app_client["client"].get("/screen/history?t=50&r=15")
+
+        assert response.status_code == 404
+
+    def test_screen_history_requires_timestamp(self, app_client):
+        """缺少 t 参数返回 422"""
+        response = app_client["client"].get("/screen/history")
+
+        assert response.status_code == 422
+
+    def test_screen_history_api_key_required_for_clear_image(self, app_client):
+        """低模糊历史截图同样需要密钥"""
+        app_client["config"].basic.api_key = "secret123"
+        self._add_history(app_client, 100.0)
+
+        response = app_client["client"].get("/screen/history?t=100&r=0")
+
+        assert response.status_code == 401
+
+    def test_screen_history_private_mode_returns_403(self, app_client):
+        """私密模式下 /screen/history 返回 403"""
+        self._add_history(app_client, 100.0)
+        app_client["config"].basic.is_public = False
+
+        response = app_client["client"].get("/screen/history?t=100&r=15")
+
+        assert response.status_code == 403
+
+    def test_screen_history_index(self, app_client):
+        """/screen/history/index 列出历史帧"""
+        self._add_history(app_client, 100.0, b"12345", last_seen=110.0)
+        self._add_history(app_client, 120.0, b"123")
+
+        response = app_client["client"].get("/screen/history/index")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["frames"] == [
+            {"first_seen": 100.0, "last_seen": 110.0, "size": 5},
+            {"first_seen": 120.0, "last_seen": 120.0, "size": 3},
+        ]
+        assert data["size_bytes"] == 8
+        assert data["max_bytes"] == 1024 * 1024
+
+    def test_screen_history_index_private_mode_returns_403(self, app_client):
+        """私密模式下 /screen/history/index 返回 403"""
+        app_client["config"].basic.is_public = False
+
+        response = app_client["client"].get("/screen/history/index")
+
+        assert response.status_code == 403
+
     # ============ /record 端点测试 ============
 
     def test_record_public_mode_returns_audio(self, app_client):
@@ -260,15 +1154,6 @@ class TestServerRoutes:
         assert response.status_code == 403
         assert "瑟瑟中" in response.content.decode("utf-8")
 
-    def test_record_failure_returns_500(self, app_client):
-        """录音获取失败返回 500"""
-        app_client["recorder"].get_audio.return_value = None
-
-        response = app_client["client"].get("/record")
-
-        assert response.status_code == 500
-        assert "录音获取失败" in response.content.decode("utf-8")
-
     def test_record_returns_wav_format(self, app_client):
         """验证返回数据是 WAV 格式"""
         response = app_client["client"].get("/record")
@@ -277,14 +1162,100 @@ class TestServerRoutes:
         # WAV 文件以 RIFF 开头
         assert response.content[:4] == b"RIFF"
 
+    def test_record_streams_snapshot_samples(self, app_client):
+        """流式返回的 WAV 包含录音快照的全部样本并给出长度"""
+        import soundfile as sf
+
+        response = app_client["client"].get("/record")
+
+        assert response.headers["content-length"] == str(44 + 2000)
+        data, rate = sf.read(io.BytesIO(response.content), dtype="int16")
+        assert rate == 44100
+        assert data.tolist() == list(range(1000))
+
+    def test_record_window_params(self, app_client):
+        """seconds 和 since 传给录音快照"""
+        app_client["client"].get("/record?seconds=3.5&since=1700000000")
+
+        app_client["recorder"].clip.assert_called_once_with(3.5, 1700000000.0)
+
+    @pytest.mark.parametrize("query", ["seconds=0", "seconds=-1", "seconds=inf"])
+    def test_record_invalid_seconds_rejected(self, app_client, query):
+        response = app_client["client"].get(f"/record?{query}")
+
+        assert response.status_code == 422
+
+    @pytest.mark.parametrize(
+        ("query", "accept", "media_type"),
+        [
+            ("fmt=flac", None, "audio/flac"),
+            ("", "audio/ogg", "audio/ogg"),
+            ("", "audio/opus;q=0.9, audio/flac;q=0.5", "audio/ogg; codecs=opus"),
+            ("fmt=wav", "audio/flac", "audio/wav"),
+        ],
+    )
+    def test_record_format_negotiation(self, app_client, query, accept, media_type):
+        """fmt 优先于 Accept 选择录音格式，压缩结果可被解码"""
+        import soundfile as sf
+
+        headers = {"Accept": accept} if accept else {}
+        response = app_client["client"].get(f"/record?{query}", headers=headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == media_type
+        assert response.headers["vary"] == "Accept"
+        assert sf.info(io.BytesIO(response.content)).frames > 0
+
+    def test_record_empty_window_returns_empty_wav(self, app_client):
+        """窗口内没有样本时压缩格式退回空 WAV，且不写入缓存"""
+        import soundfile as sf
+
+        from peekapi.record import AudioClip
+
+        app_client["recorder"].clip.return_value = AudioClip(
+            np.array([], dtype=np.int16), start=0, generation=1
+        )
+
+        with patch("peekapi.server.audio_cache") as mock_cache:
+            response = app_client["client"].get("/record?fmt=flac&since=9999999999")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "audio/wav"
+        assert len(sf.read(io.BytesIO(response.content))[0]) == 0
+        mock_cache.put.assert_not_called()
+
+    def test_record_config_default_format(self, app_client):
+        app_client["config"].record.format = "flac"
+
+        response = app_client["client"].get("/record")
+
+        assert response.headers["content-type"] == "audio/flac"
+
+    def test_record_compressed_clip_encoded_once(self, app_client):
+        """同一段录音重复拉取时复用编码结果，录音变化后重新编码"""
+        from peekapi.record import AudioClip, encode_audio
+
+        with patch("peekapi.server.encode_audio", wraps=encode_audio) as mock_encode:
+            first = app_client["client"].get("/record?fmt=flac")
+            second = app_client["client"].get("/record?fmt=flac")
+            assert mock_encode.call_count == 1
+
+            app_client["recorder"].clip.return_value = AudioClip(
+                np.arange(1000, dtype=np.int16), start=100, generation=1
+            )
+            app_client["client"].get("/record?fmt=flac")
+
+        assert first.content == second.content
+        assert mock_encode.call_count == 2
+
     def test_record_check_public_first(self, app_client):
         """验证 /record 在私密模式下先检查 is_public 而不获取音频"""
         app_client["config"].basic.is_public = False
 
         response = app_client["client"].get("/record")
 
-        # is_public=False 时，先拒绝请求，不会调用 get_audio
-        app_client["recorder"].get_audio.assert_not_called()
+        # is_public=False 时，先拒绝请求，不会读取录音
+        app_client["recorder"].clip.assert_not_called()
         assert response.status_code == 403
 
     # ============ /idle 端点测试 ============
@@ -406,7 +1377,7 @@ class TestServerRoutes:
         mock_img_data = b"\xff\xd8\xff" + b"\x00" * 100
 
         with (
-            patch("peekapi.server.screenshot", return_value=mock_img_data),
+            patch("peekapi.server.render", return_value=mock_img_data),
             patch("peekapi.server.get_foreground_application") as get_application,
         ):
             response = app_client["client"].get("/screen")
@@ -446,3 +1417,50 @@ class TestServerConfiguration:
 
                 assert app is not None
                 assert app.title == "PeekAPI"
+
+
+class TestNegotiateImageFormat:
+    """Accept 请求头格式协商测试"""
+
+    @pytest.mark.parametrize(
+        ("accept", "expected"),
+        [
+            (None, None),
+            ("", None),
+            ("*/*", None),
+            ("image/*", None),
+            ("image/avif", None),
+            ("image/webp", "webp"),
+            ("image/avif,image/webp,image/apng,*/*;q=0.8", "webp"),
+            ("image/jpeg;q=0.5, image/png;q=0.9", "png"),
+            ("image/png, image/webp", "png"),
+            ("IMAGE/WEBP", "webp"),
+            ("image/webp;q=0", None),
+            ("image/webp;q=abc, image/jpeg;q=0.1", "jpeg"),
+        ],
+    )
+    def test_negotiate(self, accept, expected):
+        from peekapi.server import _negotiate_image_format
+
+        assert _negotiate_image_format(accept) == expected
+
+
+class TestEtagMatches:
+    """If-None-Match 匹配测试"""
+
+    @pytest.mark.parametrize(
+        ("header", "expected"),
+        [
+            (None, False),
+            ("", False),
+            ('"abc"', True),
+            ('W/"abc"', True),
+            ('"x", "abc"', True),
+            ("*", True),
+            ('"abd"', False),
+        ],
+    )
+    def test_matches(self, header, expected):
+        from peekapi.server import _etag_matches
+
+        assert _etag_matches(header, '"abc"') is expected
@@ -0,0 +1,91 @@
+"""并发请求合并模块测试"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from peekapi.singleflight import SingleFlight
+
+
+def _wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "等待条件超时"
+        time.sleep(0.001)
+
+
+class TestSingleFlight:
+    """SingleFlight 测试"""
+
+    def test_single_call_returns_result(self):
+        """单个调用直接返回结果"""
+        flight = SingleFlight()
+
+        assert flight.do("k", lambda: 42) == 42
+        assert flight.in_flight() == 0
+        assert flight.waiters("k") == 0
+
+    def test_concurrent_same_key_executes_once(self):
+        """相同键的并发调用只执行一次并共享结果"""
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def work():
+            calls.append(1)
+            release.wait(timeout=5)
+            return b"frame"
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            futures = [pool.submit(flight.do, "k", work) for _ in range(8)]
+            # 等待其余调用方全部合并到首个调用后再放行
+            _wait_until(lambda: flight.waiters("k") == 7)
+            release.set()
+            results = [f.result(timeout=5) for f in futures]
+
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+
+    def test_different_keys_execute_separately(self):
+        """不同键的调用互不合并"""
+        flight = SingleFlight()
+
+        assert flight.do("a", lambda: 1) == 1
+        assert flight.do("b", lambda: 2) == 2
+
+    def test_sequential_calls_execute_again(self):
+        """调用结束后键被释放，后续调用重新执行"""
+        flight = SingleFlight()
+        calls = []
+
+        for _ in range(3):
+            flight.do("k", lambda: calls.append(1))
+
+        assert len(calls) == 3
+
+    def test_exception_shared_with_waiters(self):
+        """首个调用的异常传递给所有等待者"""
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+
+        def fail():
+            started.set()
+            release.wait(timeout=5)
+            raise RuntimeError("grab failed")
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            leader = pool.submit(flight.do, "k", fail)
+            started.wait(timeout=5)
+            waiter = pool.submit(flight.do, "k", lambda: "unused")
+            _wait_until(lambda: flight.waiters("k") == 1)
+            release.set()
+
+            with pytest.raises(RuntimeError, match="grab failed"):
+                leader.result(timeout=5)
+            with pytest.raises(RuntimeError, match="grab failed"):
+                waiter.result(timeout=5)
+
+        assert flight.in_flight() == 0
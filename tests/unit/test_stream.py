@@ -0,0 +1,204 @@
+"""屏幕推流模块测试"""
+
+import asyncio
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from peekapi import stream
+from peekapi.screenshot import EncodeOptions
+
+KEY = (15.0, 1, None, EncodeOptions())
+OTHER_KEY = (5.0, 1, None, EncodeOptions())
+
+
+def wait_until(predicate, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "等待超时"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def broadcaster(monkeypatch):
+    """高帧率推流器，截图和渲染均被替换"""
+    monkeypatch.setattr(stream.config.basic, "is_public", True)
+    capture = MagicMock(return_value=object())
+    # 模糊阶段输出半径，编码阶段据此生成帧内容
+    prepare = MagicMock(side_effect=lambda frame, radius, *args: radius)
+    encode = MagicMock(side_effect=lambda img, encoding: f"r={img}".encode())
+    monkeypatch.setattr(stream, "capture", capture)
+    monkeypatch.setattr(stream, "prepare", prepare)
+    monkeypatch.setattr(stream, "encode_image", encode)
+    instance = stream.ScreenBroadcaster(max_fps=100)
+    yield instance, capture, prepare
+    instance.close_all()
+    wait_until(lambda: not instance.is_running)
+
+
+class TestSubscription:
+    """Subscription 测试"""
+
+    def test_keeps_only_latest_frame(self):
+        async def run():
+            subscription = stream.Subscription(KEY, asyncio.get_running_loop())
+            subscription.publish(b"first")
+            subscription.publish(b"second")
+            return await subscription.next_frame()
+
+        assert asyncio.run(run()) == b"second"
+
+    def test_close_wakes_waiter(self):
+        async def run():
+            subscription = stream.Subscription(KEY, asyncio.get_running_loop())
+            waiter = asyncio.create_task(subscription.next_frame())
+            await asyncio.sleep(0)
+            subscription.close()
+            return await asyncio.wait_for(waiter, timeout=1)
+
+        assert asyncio.run(run()) is None
+
+    def test_publish_after_close_is_ignored(self):
+        async def run():
+            subscription = stream.Subscription(KEY, asyncio.get_running_loop())
+            subscription.close()
+            subscription.publish(b"late")
+            return await subscription.next_frame()
+
+        assert asyncio.run(run()) is None
+
+    def test_on_change_skips_same_fingerprint(self):
+        async def run():
+            subscription = stream.Subscription(
+                KEY, asyncio.get_running_loop(), on_change=True
+            )
+            subscription.publish(b"first", 1)
+            first = await subscription.next_frame()
+            subscription.publish(b"same", 1)
+            subscription.publish(b"changed", 2)
+            return first, await subscription.next_frame()
+
+        assert asyncio.run(run()) == (b"first", b"changed")
+
+    def test_max_fps_drops_intermediate_frames(self):
+        """限速等待期间到达的帧只保留最新一帧"""
+
+        async def run():
+            subscription = stream.Subscription(
+                KEY, asyncio.get_running_loop(), max_fps=10
+            )
+            subscription.publish(b"first")
+            await subscription.next_frame()
+            start = time.monotonic()
+            waiter = asyncio.create_task(subscription.next_frame())
+            for frame in (b"a", b"b", b"c"):
+                subscription.publish(frame)
+                await asyncio.sleep(0.01)
+            return await waiter, time.monotonic() - start
+
+        frame, elapsed = asyncio.run(run())
+
+        assert frame == b"c"
+        assert elapsed >= 0.09
+
+
+class TestScreenBroadcaster:
+    """ScreenBroadcaster 测试"""
+
+    def test_viewers_share_one_capture_per_tick(self, broadcaster):
+        instance, capture, prepare = broadcaster
+
+        async def run():
+            subscriptions = [
+                instance.subscribe(KEY),
+                instance.subscribe(KEY),
+                instance.subscribe(OTHER_KEY),
+            ]
+            return await asyncio.gather(*(s.next_frame() for s in subscriptions))
+
+        frames = asyncio.run(run())
+
+        assert frames[0] == frames[1] == b"r=15.0"
+        assert frames[2] == b"r=5.0"
+        # 每个周期截图一次，每种参数各编码一次
+        assert prepare.call_count <= 2 * capture.call_count
+
+    def test_loop_stops_without_viewers(self, broadcaster):
+        instance, _, _ = broadcaster
+
+        async def run():
+            subscription = instance.subscribe(KEY)
+            await subscription.next_frame()
+            instance.unsubscribe(subscription)
+
+        asyncio.run(run())
+
+        wait_until(lambda: not instance.is_running)
+        assert instance.viewers == 0
+
+    def test_private_mode_closes_all(self, broadcaster, monkeypatch):
+        instance, capture, _ = broadcaster
+
+        async def run():
+            subscription = instance.subscribe(KEY)
+            monkeypatch.setattr(stream.config.basic, "is_public", False)
+            return await asyncio.wait_for(subscription.next_frame(), timeout=1)
+
+        capture.side_effect = lambda main_screen_only: time.sleep(0.05)
+        assert asyncio.run(run()) is None
+        wait_until(lambda: not instance.is_running)
+
+    def test_close_all_ends_subscriptions(self, broadcaster):
+        instance, _, _ = broadcaster
+
+        async def run():
+            subscription = instance.subscribe(KEY)
+            await subscription.next_frame()
+            instance.close_all()
+            while (frame := await subscription.next_frame()) is not None:
+                assert frame
+            return subscription.closed
+
+        assert asyncio.run(run()) is True
+        assert instance.viewers == 0
+
+    def test_capture_error_keeps_loop_running(self, broadcaster):
+        instance, capture, _ = broadcaster
+        capture.side_effect = [RuntimeError("boom"), object(), object(), object()]
+
+        async def run():
+            subscription = instance.subscribe(KEY)
+            return await asyncio.wait_for(subscription.next_frame(), timeout=1)
+
+        assert asyncio.run(run()) == b"r=15.0"
+
+    def test_on_change_skips_unchanged_frames(self, broadcaster, monkeypatch):
+        """画面不变时只推送一次，也不再模糊和编码"""
+        instance, capture, prepare = broadcaster
+        fingerprint = MagicMock(return_value=1)
+        monkeypatch.setattr(stream, "frame_fingerprint", fingerprint)
+
+        async def run():
+            subscription = instance.subscribe(KEY, on_change=True)
+            first = await subscription.next_frame()
+            wait_until(lambda: capture.call_count >= 5)
+            assert prepare.call_count == 1
+            fingerprint.return_value = 2
+            return first, await asyncio.wait_for(subscription.next_frame(), timeout=1)
+
+        assert asyncio.run(run()) == (b"r=15.0", b"r=15.0")
+        assert prepare.call_count == 2
+
+    def test_fingerprint_only_for_on_change_viewers(self, broadcaster, monkeypatch):
+        instance, _, _ = broadcaster
+        fingerprint = MagicMock(return_value=1)
+        monkeypatch.setattr(stream, "frame_fingerprint", fingerprint)
+
+        async def run():
+            subscription = instance.subscribe(KEY)
+            await subscription.next_frame()
+
+        asyncio.run(run())
+
+        fingerprint.assert_not_called()
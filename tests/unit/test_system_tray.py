@@ -53,3 +53,24 @@ def test_checked_query_failure_returns_false(monkeypatch):
     monkeypatch.setattr(system_tray.logger, "warning", MagicMock())
 
     assert system_tray._is_autostart_checked(None) is False
+
+
+def test_set_private_purges_screen_data(monkeypatch):
+    monkeypatch.setattr(system_tray.config.basic, "is_public", True)
+    purge = MagicMock()
+    monkeypatch.setattr(system_tray, "purge_screen_data", purge)
+
+    system_tray.set_private(None, None)
+
+    assert system_tray.config.basic.is_public is False
+    purge.assert_called_once()
+
+
+def test_set_private_when_already_private_does_not_purge(monkeypatch):
+    monkeypatch.setattr(system_tray.config.basic, "is_public", False)
+    purge = MagicMock()
+    monkeypatch.setattr(system_tray, "purge_screen_data", purge)
+
+    system_tray.set_private(None, None)
+
+    purge.assert_not_called()